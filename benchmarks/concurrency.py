@@ -0,0 +1,86 @@
+"""
+Throughput of a running server for a number of concurrent clients, every
+client sends GET requests over one keep-alive connection. Start the server
+to compare, e.g. the sync WSGI workers
+
+    gunicorn test_your_language.wsgi:application -w 4
+    python -m benchmarks.concurrency http://127.0.0.1:8000/api/tests/1/
+
+and the ASGI workers with the async read views
+
+    ASYNC_VIEWS=True uvicorn test_your_language.asgi:application --workers 4
+    python -m benchmarks.concurrency http://127.0.0.1:8000/api/tests/1/
+"""
+import argparse
+import http.client
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from urllib.parse import urlsplit
+
+from .utils import format_time
+
+
+CLIENTS = (1, 10, 50, 100)
+DURATION = 10.0  # (seconds)
+
+
+def run_client(url: str, deadline: float) -> tuple[list[float], int]:
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    connection = http.client.HTTPConnection(parts.netloc, timeout=30)
+    timings, errors = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            errors += 1
+            continue
+        if response.status >= 400:
+            errors += 1
+        timings.append(time.perf_counter() - start)
+    connection.close()
+
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--clients', type=int, nargs='+', default=CLIENTS)
+    parser.add_argument('--duration', type=float, default=DURATION)
+    args = parser.parse_args()
+
+    print(
+        f'{"url":>40} | {"clients":>7} | {"requests/s":>10} | '
+        f'{"p50":>8} | {"p99":>8} | {"errors":>6}'
+    )
+    for url in args.urls:
+        for clients in args.clients:
+            deadline = time.perf_counter() + args.duration
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                results = list(
+                    executor.map(
+                        lambda _: run_client(url, deadline),
+                        range(clients)
+                    )
+                )
+            timings = [timing for result in results for timing in result[0]]
+            errors = sum(result[1] for result in results)
+            percentiles = (
+                quantiles(timings, n=100) if len(timings) > 1 else [0.0] * 99
+            )
+            print(
+                f'{url[-40:]:>40} | {clients:>7} | '
+                f'{len(timings) / args.duration:>10.0f} | '
+                f'{format_time(percentiles[49]):>8} | '
+                f'{format_time(percentiles[98]):>8} | {errors:>6}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Connection overhead of a request with the stock postgresql backend and
+``CONN_MAX_AGE = 0`` compared with the pooled backend. Every request runs one
+``SELECT 1`` and closes the connection, as the request_finished handler does.
+
+    python -m benchmarks.connections
+"""
+from .utils import format_time, measure_latency, setup_django
+
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.db.utils import ConnectionHandler  # noqa: E402
+
+
+ENGINES = (
+    'django.db.backends.postgresql',
+    'test_your_language.postgresql_pool',
+)
+REQUESTS = 500
+
+
+def main():
+    if connection.vendor != 'postgresql':
+        raise SystemExit('The benchmark needs DB_ENGINE of postgresql.')
+
+    query_time = None
+    for engine in ENGINES:
+        connections = ConnectionHandler({
+            'default': {
+                **connection.settings_dict,
+                'ENGINE': engine,
+                'CONN_MAX_AGE': 0,
+            }
+        })
+        database = connections['default']
+
+        def request():
+            with database.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            database.close()
+
+        request_time = measure_latency(request, repeat=REQUESTS)
+        if query_time is None:
+            # the round trip of the query itself, without connecting
+            with database.cursor() as cursor:
+                query_time = measure_latency(
+                    lambda: cursor.execute('SELECT 1'),
+                    repeat=REQUESTS
+                )
+            database.close()
+        print(
+            f'{engine:>36} | request {format_time(request_time):>8} | '
+            f'connect overhead {format_time(request_time - query_time):>8}'
+        )
+        if hasattr(database, 'pool'):
+            stats = database.pool.get_stats()
+            print(
+                f'{"":>36} | checkouts {stats["checkouts"]}, '
+                f'created {stats["created_connections"]}, '
+                f'wait max {format_time(stats["wait_seconds_max"])}'
+            )
+            database.pool.close_idle()
+
+
+if __name__ == '__main__':
+    main()
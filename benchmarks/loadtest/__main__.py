@@ -0,0 +1,6 @@
+# the spawned client processes import this module too, they must not set up
+# django
+if __name__ == '__main__':
+    from .harness import main
+
+    main()
@@ -0,0 +1,132 @@
+"""
+The clients of the load test, they only use the standard library, so the
+client processes don't set up django.
+"""
+import http.client
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from random import Random
+
+
+# the share of every scenario in the requests of a client
+SCENARIOS = {
+    'catalog': 30,
+    'test_anonymous': 25,
+    'test_authenticated': 20,
+    'result': 15,
+    'stats': 5,
+    'leaderboard': 5,
+}
+SCENARIO_HEADER = 'X-Load-Test-Scenario'
+QUESTIONS_PER_RESULT = 10
+
+
+class Client:
+    """
+    Sends the requests of random scenarios over one keep-alive connection
+    as one of the seeded users.
+    """
+
+    def __init__(self, host: str, port: int, plan: dict, number: int):
+        self.host = host
+        self.port = port
+        self.plan = plan
+        self.rng = Random(number)
+        self.user_id, self.token = plan['users'][number % len(plan['users'])]
+        self.connection = None
+
+    def run(self, deadline: float) -> list[tuple[str, float, float, int]]:
+        """
+        Returns the scenario, the start time, the latency and the status of
+        every request, the status of a failed connection is 0.
+        """
+        scenarios = list(self.plan['scenarios'])
+        weights = list(self.plan['scenarios'].values())
+        results = []
+        while (start := time.time()) < deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            method, path, body, authenticated = getattr(self, scenario)()
+            headers = {SCENARIO_HEADER: scenario, 'Accept': 'application/json'}
+            if authenticated:
+                headers['Authorization'] = f'Token {self.token}'
+            if body is not None:
+                headers['Content-Type'] = 'application/json'
+                body = json.dumps(body)
+
+            status = self.request(method, path, body, headers)
+            results.append((scenario, start, time.time() - start, status))
+        self.close()
+
+        return results
+
+    def request(self, method: str, path: str, body, headers: dict) -> int:
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(
+                self.host,
+                self.port,
+                timeout=30
+            )
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return 0
+
+        return response.status
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def get_test_type(self) -> str:
+        return self.rng.choice(list(self.plan['test_types']))
+
+    def catalog(self) -> tuple:
+        return 'GET', '/api/tests/', None, False
+
+    def test_anonymous(self) -> tuple:
+        return 'GET', f'/api/tests/{self.get_test_type()}/', None, False
+
+    def test_authenticated(self) -> tuple:
+        return 'GET', f'/api/tests/{self.get_test_type()}/', None, True
+
+    def result(self) -> tuple:
+        questions = self.plan['test_types'][self.get_test_type()]
+        questions = self.rng.sample(
+            questions,
+            min(QUESTIONS_PER_RESULT, len(questions))
+        )
+        body = {
+            'user_id': self.user_id,
+            'user_answers': [
+                {'question_id': question_id, 'answer_id': self.rng.choice(answer_ids)}
+                for question_id, answer_ids in questions
+            ],
+        }
+        return 'POST', '/api/tests/result/', body, True
+
+    def stats(self) -> tuple:
+        return 'GET', '/api/tests/stats/', None, True
+
+    def leaderboard(self) -> tuple:
+        return 'GET', f'/api/tests/{self.get_test_type()}/leaderboard/', None, True
+
+
+def run_clients(
+        host: str,
+        port: int,
+        plan: dict,
+        numbers: range,
+        deadline: float
+) -> list[tuple[str, float, float, int]]:
+    # runs in a client process, one thread per client
+    with ThreadPoolExecutor(max_workers=len(numbers)) as executor:
+        results = executor.map(
+            lambda number: Client(host, port, plan, number).run(deadline),
+            numbers
+        )
+        return [result for client_results in results for result in client_results]
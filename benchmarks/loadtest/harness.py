@@ -0,0 +1,307 @@
+"""
+Load test of the language_tests endpoints. Creates a test database with the
+fixtures of the tests and the load test users, serves the app from this
+process and drives it from separate client processes with a mix of catalog
+GETs, anonymous and authenticated test GETs, result POSTs, statistics and
+leaderboard GETs. Reports the latency percentiles, the throughput and the
+database queries of every scenario.
+
+    python -m benchmarks.loadtest [--clients N] [--duration S]
+    python -m benchmarks.loadtest --save-baseline benchmarks/loadtest/baseline.json
+    python -m benchmarks.loadtest --baseline benchmarks/loadtest/baseline.json
+
+With ``--baseline`` the results are compared with the saved ones and the
+exit code is 1 when a scenario regressed. The latencies depend on the
+machine, so compare with a baseline saved on the same one. SQLite
+serializes the writes, the result POSTs fail with it under load.
+"""
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from statistics import mean, quantiles
+
+from ..utils import format_time, setup_django
+from .client import SCENARIO_HEADER, SCENARIOS, run_clients
+
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.core.servers.basehttp import (  # noqa: E402
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+    get_internal_wsgi_application
+)
+from django.db import connections  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment
+)
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from language_tests.models import QuestionAnswer  # noqa: E402
+
+
+FIXTURES = ('language_test_types', 'questions', 'answers', 'question_answers')
+USERS = 100
+CLIENTS = 20
+PROCESSES = 2
+DURATION = 20.0  # (seconds)
+WARMUP = 3.0  # (seconds)
+# a relative change of the latency or the throughput which is a regression
+TOLERANCE = 0.2
+# the same for the mean number of queries, the caches which are filled
+# during the run add a fraction of a query
+QUERIES_TOLERANCE = 0.5
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LoadTestServer(ThreadedWSGIServer):
+    request_queue_size = 256
+
+
+class QueryCounter:
+    """
+    Counts the database queries of every request by the scenario header of
+    the clients.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.queries: list[tuple[str, float, int]] = []
+
+    def __call__(self, environ, start_response):
+        start = time.time()
+        number_queries = 0
+
+        def count(execute, *args):
+            nonlocal number_queries
+            number_queries += 1
+            return execute(*args)
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count))
+            response = self.application(environ, start_response)
+
+        scenario = environ.get(
+            'HTTP_' + SCENARIO_HEADER.upper().replace('-', '_'),
+            ''
+        )
+        self.queries.append((scenario, start, number_queries))
+
+        return response
+
+
+def seed(number_users: int) -> dict:
+    call_command('loaddata', *FIXTURES, verbosity=0)
+    User = get_user_model()
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f'load_test_user_{i}',
+                email=f'load_test_user_{i}@example.com'
+            )
+            for i in range(number_users)
+        ]
+    )
+    if not users[0].pk:
+        users = User.objects.filter(username__startswith='load_test_user_')
+    tokens = Token.objects.bulk_create(
+        [Token(user=user, key=Token.generate_key()) for user in users]
+    )
+
+    test_types = {}
+    for question_id, test_type_id, answer_id in QuestionAnswer.objects.filter(
+        question__is_published=True,
+        question__test_type__is_published=True
+    ).order_by(
+        'question_id'
+    ).values_list(
+        'question_id',
+        'question__test_type_id',
+        'answer_id'
+    ):
+        questions = test_types.setdefault(test_type_id, {})
+        questions.setdefault(question_id, []).append(answer_id)
+
+    return {
+        'scenarios': SCENARIOS,
+        'users': [(token.user_id, token.key) for token in tokens],
+        'test_types': {
+            test_type_id: list(questions.items())
+            for test_type_id, questions in test_types.items()
+        },
+    }
+
+
+def run(plan: dict, clients: int, processes: int, duration: float, warmup: float):
+    application = QueryCounter(get_internal_wsgi_application())
+    server = LoadTestServer(('127.0.0.1', 0), QuietRequestHandler)
+    server.set_app(application)
+    host, port = server.server_address
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    start = time.time()
+    deadline = start + warmup + duration
+    processes = min(processes, clients)
+    try:
+        # spawned, so the clients don't share the interpreter of the server
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            futures = [
+                executor.submit(
+                    run_clients,
+                    host,
+                    port,
+                    plan,
+                    range(number, clients, processes),
+                    deadline
+                )
+                for number in range(processes)
+            ]
+            requests = [result for future in futures for result in future.result()]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    measured_from = start + warmup
+    return get_report(
+        [request for request in requests if request[1] >= measured_from],
+        [query for query in application.queries if query[1] >= measured_from],
+        duration
+    )
+
+
+def get_report(requests: list, queries: list, duration: float) -> dict:
+    report = {}
+    for scenario in SCENARIOS:
+        latencies = [i[2] for i in requests if i[0] == scenario]
+        if not latencies:
+            continue
+        percentiles = (
+            quantiles(latencies, n=100) if len(latencies) > 1
+            else latencies * 99
+        )
+        scenario_queries = [i[2] for i in queries if i[0] == scenario]
+        report[scenario] = {
+            'requests': len(latencies),
+            'requests_per_second': len(latencies) / duration,
+            'p50': percentiles[49],
+            'p95': percentiles[94],
+            'p99': percentiles[98],
+            'queries': mean(scenario_queries) if scenario_queries else 0.0,
+            'errors': sum(not 200 <= i[3] < 400 for i in requests if i[0] == scenario),
+        }
+
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> dict[str, list[str]]:
+    changes = {}
+    for scenario, result in report.items():
+        base = baseline.get(scenario)
+        if base is None:
+            continue
+        scenario_changes = []
+        if result['p95'] > base['p95'] * (1 + tolerance):
+            scenario_changes.append(
+                f'p95 {format_time(base["p95"])} -> {format_time(result["p95"])}'
+            )
+        if result['requests_per_second'] < base['requests_per_second'] * (1 - tolerance):
+            scenario_changes.append(
+                f'requests/s {base["requests_per_second"]:.0f} -> '
+                f'{result["requests_per_second"]:.0f}'
+            )
+        # the number of queries doesn't depend on the machine
+        if result['queries'] > base['queries'] + QUERIES_TOLERANCE:
+            scenario_changes.append(
+                f'queries {base["queries"]:.1f} -> {result["queries"]:.1f}'
+            )
+        if result['errors'] > base['errors']:
+            scenario_changes.append(f'errors {base["errors"]} -> {result["errors"]}')
+        if scenario_changes:
+            changes[scenario] = scenario_changes
+
+    return changes
+
+
+def print_report(report: dict) -> None:
+    print(
+        f'{"scenario":>18} | {"requests":>8} | {"requests/s":>10} | '
+        f'{"p50":>8} | {"p95":>8} | {"p99":>8} | {"queries":>7} | {"errors":>6}'
+    )
+    for scenario, result in report.items():
+        print(
+            f'{scenario:>18} | {result["requests"]:>8} | '
+            f'{result["requests_per_second"]:>10.0f} | '
+            f'{format_time(result["p50"]):>8} | '
+            f'{format_time(result["p95"]):>8} | '
+            f'{format_time(result["p99"]):>8} | '
+            f'{result["queries"]:>7.1f} | {result["errors"]:>6}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=USERS)
+    parser.add_argument('--clients', type=int, default=CLIENTS)
+    parser.add_argument('--processes', type=int, default=PROCESSES)
+    parser.add_argument('--duration', type=float, default=DURATION)
+    parser.add_argument('--warmup', type=float, default=WARMUP)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--save-baseline', type=Path)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, '127.0.0.1']
+    # all the clients share an ip address and a few users
+    settings.THROTTLING = {**settings.THROTTLING, 'RATES': {}}
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        plan = seed(args.users)
+        report = run(
+            plan,
+            args.clients,
+            args.processes,
+            args.duration,
+            args.warmup
+        )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+    print_report(report)
+    if args.save_baseline is not None:
+        args.save_baseline.write_text(
+            json.dumps(report, indent=2, sort_keys=True) + '\n',
+            encoding='utf-8'
+        )
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        changes = compare(report, baseline, args.tolerance)
+        for scenario, scenario_changes in changes.items():
+            print(f'Regression of {scenario}: {", ".join(scenario_changes)}')
+        if changes:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
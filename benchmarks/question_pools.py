@@ -0,0 +1,72 @@
+"""
+Memory and latency of the per-process question id pools compared with the
+list of ``{'id': ...}`` rows the questions generation used to materialise
+on every request.
+
+    python -m benchmarks.question_pools
+"""
+from random import randint
+
+from .utils import (
+    format_size,
+    format_time,
+    measure_latency,
+    measure_memory,
+    setup_django
+)
+
+
+setup_django()
+
+from language_tests.pools import QuestionPool  # noqa: E402
+from language_tests.sampling import sample_ids  # noqa: E402
+
+from .sampling import rejection_sample  # noqa: E402
+
+
+POOL_SIZES = (1_000, 100_000, 1_000_000)
+QUESTIONS_LIMIT = 10
+
+
+def main():
+    print(
+        f'{"questions":>10} | {"rows memory":>12} | {"pool memory":>12} | '
+        f'{"pool build":>10} | {"rows request":>12} | {"pool request":>12}'
+    )
+    for size in POOL_SIZES:
+        with measure_memory() as rows_memory:
+            rows = [{'id': i} for i in range(1, size + 1)]
+
+        with measure_memory() as pool_memory:
+            pool = QuestionPool.from_ids(1, 1, range(1, size + 1))
+
+        build_time = measure_latency(
+            lambda: QuestionPool.from_ids(1, 1, range(1, size + 1)),
+            repeat=5
+        )
+        rows_request_time = measure_latency(
+            lambda: rejection_sample([row['id'] for row in rows], QUESTIONS_LIMIT),
+            repeat=max(5, 100_000 // size)
+        )
+        pool_request_time = measure_latency(
+            lambda: (
+                pool.version == 1,
+                sample_ids(pool.ids, QUESTIONS_LIMIT),
+                randint(1, size) in pool
+            )
+        )
+        print(
+            f'{size:>10} | {format_size(rows_memory["current"]):>12} | '
+            f'{format_size(pool_memory["current"]):>12} | '
+            f'{format_time(build_time):>10} | '
+            f'{format_time(rows_request_time):>12} | '
+            f'{format_time(pool_request_time):>12}'
+        )
+    print(
+        '\n"rows" times the id extraction and sampling the request used to do '
+        'after fetching the rows; the database round trip is not included.'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Sampling of the question ids: the former rejection sampling, the standard
+library ``random.sample``, ``language_tests.sampling.sample_ids`` and the
+weighted ``sample_weighted_ids`` of the tests of a difficulty band.
+
+    python -m benchmarks.sampling
+"""
+import random
+from typing import Sequence
+
+from .utils import format_time, measure_latency, setup_django
+
+
+setup_django()
+
+from language_tests.sampling import (  # noqa: E402
+    AliasTable,
+    sample_ids,
+    sample_weighted_ids
+)
+
+
+POOL_SIZES = (100, 10_000, 1_000_000)
+LIMITS = (10, 50, 100)
+EXCLUDED_SHARE = 0.5
+
+
+def rejection_sample(ids: Sequence[int], limit: int) -> list[int]:
+    # the sampling generate_questions_list used before sample_ids
+    result = []
+    min_index, max_index = 0, len(ids) - 1
+    while len(result) < min(limit, len(ids)):
+        random_id = ids[random.randint(min_index, max_index)]
+        if random_id not in result:
+            result.append(random_id)
+
+    return result
+
+
+def main():
+    print(
+        f'{"pool":>8} | {"limit":>5} | {"rejection":>10} | '
+        f'{"random.sample":>13} | {"sample_ids":>10} | {"with exclude":>12} | '
+        f'{"weighted":>8} | {"weighted exclude":>16}'
+    )
+    table_times = []
+    for size in POOL_SIZES:
+        ids = range(1, size + 1)
+        exclude = set(range(1, int(size * EXCLUDED_SHARE) + 1))
+        weights = [random.random() for _ in ids]
+        table_times.append(
+            (size, measure_latency(lambda: AliasTable(weights), repeat=3))
+        )
+        table = AliasTable(weights)
+        for limit in LIMITS:
+            limit = min(limit, size)
+            repeat = 200
+            rejection_time = measure_latency(
+                lambda: rejection_sample(ids, limit),
+                repeat=repeat
+            )
+            stdlib_time = measure_latency(
+                lambda: random.sample(ids, limit),
+                repeat=repeat
+            )
+            sample_ids_time = measure_latency(
+                lambda: sample_ids(ids, limit),
+                repeat=repeat
+            )
+            exclude_time = measure_latency(
+                lambda: sample_ids(ids, limit, exclude),
+                repeat=repeat
+            )
+            weighted_time = measure_latency(
+                lambda: sample_weighted_ids(ids, table, limit),
+                repeat=repeat
+            )
+            weighted_exclude_time = measure_latency(
+                lambda: sample_weighted_ids(ids, table, limit, exclude),
+                repeat=repeat
+            )
+            print(
+                f'{size:>8} | {limit:>5} | {format_time(rejection_time):>10} | '
+                f'{format_time(stdlib_time):>13} | '
+                f'{format_time(sample_ids_time):>10} | '
+                f'{format_time(exclude_time):>12} | '
+                f'{format_time(weighted_time):>8} | '
+                f'{format_time(weighted_exclude_time):>16}'
+            )
+    print(
+        f'\n"with exclude" skips the first {EXCLUDED_SHARE:.0%} of the pool '
+        f'as already answered questions.'
+    )
+    for size, table_time in table_times:
+        print(f'AliasTable of {size} questions: {format_time(table_time)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Rendering of tests: the serializers of DRF over model instances with
+prefetched answers and JSONRenderer compared with
+``FastRepresentationMixin.to_fast_representation`` over ``.values()`` dicts
+and ``FastJSONRenderer``. The output of both is checked to be the same.
+
+    python -m benchmarks.serialization
+"""
+from .utils import format_time, measure_latency, setup_django
+
+
+setup_django()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from language_tests.models import Answer, Question  # noqa: E402
+from language_tests.renderers import FastJSONRenderer  # noqa: E402
+from language_tests.serializers import LanguageTestSerializer  # noqa: E402
+
+
+QUESTIONS_NUMBERS = (10, 100, 1000)
+ANSWERS_PER_QUESTION = 4
+
+
+def create_language_test(number_questions: int) -> tuple[dict, dict]:
+    # the same test as instances and as values, without a database
+    questions = []
+    question_values = []
+    for question_id in range(1, number_questions + 1):
+        answers = [
+            Answer(id=answer_id, answer=f'answer {answer_id}')
+            for answer_id in range(
+                question_id * ANSWERS_PER_QUESTION,
+                (question_id + 1) * ANSWERS_PER_QUESTION
+            )
+        ]
+        question = Question(id=question_id, question=f'question ___ {question_id}')
+        # what prefetch_related('answers') leaves for the serializers
+        question._prefetched_objects_cache = {'answers': answers}
+        questions.append(question)
+        question_values.append(
+            {
+                'id': question_id,
+                'question': question.question,
+                'answers': [
+                    {'id': answer.id, 'answer': answer.answer}
+                    for answer in answers
+                ],
+            }
+        )
+
+    return (
+        {'id': 1, 'name': 'English', 'questions': questions},
+        {'id': 1, 'name': 'English', 'questions': question_values},
+    )
+
+
+def render(language_test: dict) -> bytes:
+    return JSONRenderer().render(LanguageTestSerializer(language_test).data)
+
+
+def render_fast(language_test: dict) -> bytes:
+    return FastJSONRenderer().render(
+        LanguageTestSerializer.to_fast_representation(language_test)
+    )
+
+
+def main():
+    print(
+        f'{"questions":>9} | {"serializers":>11} | {"fast":>8} | '
+        f'{"JSONRenderer":>12} | {"FastJSONRenderer":>16} | '
+        f'{"total":>10} | {"fast total":>10}'
+    )
+    for number_questions in QUESTIONS_NUMBERS:
+        language_test, language_test_values = create_language_test(number_questions)
+        assert render(language_test) == render_fast(language_test_values)
+
+        repeat = max(10, 10_000 // number_questions)
+        data = LanguageTestSerializer(language_test).data
+        serializers_time = measure_latency(
+            lambda: LanguageTestSerializer(language_test).data,
+            repeat=repeat
+        )
+        fast_time = measure_latency(
+            lambda: LanguageTestSerializer.to_fast_representation(
+                language_test_values
+            ),
+            repeat=repeat
+        )
+        renderer_time = measure_latency(
+            lambda: JSONRenderer().render(data),
+            repeat=repeat
+        )
+        fast_renderer_time = measure_latency(
+            lambda: FastJSONRenderer().render(data),
+            repeat=repeat
+        )
+        total_time = measure_latency(lambda: render(language_test), repeat=repeat)
+        fast_total_time = measure_latency(
+            lambda: render_fast(language_test_values),
+            repeat=repeat
+        )
+        print(
+            f'{number_questions:>9} | {format_time(serializers_time):>11} | '
+            f'{format_time(fast_time):>8} | {format_time(renderer_time):>12} | '
+            f'{format_time(fast_renderer_time):>16} | '
+            f'{format_time(total_time):>10} | {format_time(fast_total_time):>10}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from statistics import median
+from typing import Callable, Iterator
+
+
+def setup_django() -> None:
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_your_language.settings')
+    django.setup()
+
+
+def measure_latency(func: Callable, repeat: int = 1000) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return median(timings)
+
+
+@contextmanager
+def measure_memory() -> Iterator[dict]:
+    result = {}
+    tracemalloc.start()
+    try:
+        yield result
+    finally:
+        result['current'], result['peak'] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.1f}{unit}'
+        size /= 1024
+
+    return f'{size:.1f}GB'
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f}us'
+    if seconds < 1:
+        return f'{seconds * 1e3:.1f}ms'
+
+    return f'{seconds:.2f}s'
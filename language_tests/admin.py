@@ -6,7 +6,9 @@ from .models import (
     LanguageTestType,
     Question,
     QuestionAnswer,
-    TestResult
+    QuestionStats,
+    TestResult,
+    UserTestTypeStats
 )
 
 
@@ -23,6 +25,13 @@ class LanguageTestTypeAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+class QuestionStatsAdmin(admin.ModelAdmin):
+    list_display = ('question', 'attempted', 'correct',)
+    list_display_links = ('question',)
+    list_filter = ('question__test_type',)
+    search_fields = ('question__question',)
+
+
 class TestResultAdmin(admin.ModelAdmin):
     list_display = ('user', 'question', 'answer', 'solution_date',)
     list_display_links = ('user', 'question',)
@@ -30,6 +39,13 @@ class TestResultAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'question__question',)
 
 
+class UserTestTypeStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'test_type', 'attempted', 'correct', 'last_activity',)
+    list_display_links = ('user', 'test_type',)
+    list_filter = ('test_type',)
+    search_fields = ('user__username', 'test_type__name',)
+
+
 class QuestionAnswerAdmin(admin.ModelAdmin):
     list_display = ('question', 'answer', 'is_right_answer',)
     list_display_links = ('question',)
@@ -59,3 +75,5 @@ admin.site.register(LanguageTestType, LanguageTestTypeAdmin)
 admin.site.register(TestResult, TestResultAdmin)
 admin.site.register(QuestionAnswer, QuestionAnswerAdmin)
 admin.site.register(Question, QuestionAdmin)
+admin.site.register(QuestionStats, QuestionStatsAdmin)
+admin.site.register(UserTestTypeStats, UserTestTypeStatsAdmin)
@@ -0,0 +1,109 @@
+from threading import Lock
+from typing import Iterable, NamedTuple, Optional
+
+from django.core.cache import cache
+
+from .models import QuestionAnswer
+from .versions import bump_version, get_version
+
+
+INDEX_KEY_PREFIX = 'language_tests:question_answers'
+INDEX_VERSION_NAME = 'question_answers'
+INDEX_TIMEOUT = 60 * 60 * 24
+# the local index is dropped once it grows bigger
+MAX_LOCAL_ENTRIES = 100_000
+
+
+class QuestionAnswers(NamedTuple):
+    answer_ids: frozenset[int]
+    right_answer_id: Optional[int]
+
+
+_index: dict[int, QuestionAnswers] = {}
+_index_version = None
+_index_lock = Lock()
+
+
+def get_question_answers(
+        question_ids: Iterable[int]
+) -> dict[int, QuestionAnswers]:
+    """
+    Returns the answer ids and the right answer id of the questions, unknown
+    questions are omitted.
+
+    Answers are looked up in the process index, then in the django cache and
+    only then in the database.
+    """
+    global _index, _index_version
+
+    version = get_version(INDEX_VERSION_NAME)
+    with _index_lock:
+        if _index_version != version or len(_index) > MAX_LOCAL_ENTRIES:
+            _index, _index_version = {}, version
+        index = _index
+
+    question_ids = set(question_ids)
+    result = {
+        question_id: index[question_id]
+        for question_id in question_ids
+        if question_id in index
+    }
+    missing_ids = question_ids - result.keys()
+    if missing_ids:
+        cached = cache.get_many(
+            [_get_index_key(version, question_id) for question_id in missing_ids]
+        )
+        shared = {
+            question_id: cached[key]
+            for question_id in missing_ids
+            if (key := _get_index_key(version, question_id)) in cached
+        }
+        loaded = _load_question_answers(missing_ids - shared.keys())
+        cache.set_many(
+            {
+                _get_index_key(version, question_id): question_answers
+                for question_id, question_answers in loaded.items()
+            },
+            timeout=INDEX_TIMEOUT
+        )
+        result.update(shared)
+        result.update(loaded)
+        index.update(shared)
+        index.update(loaded)
+
+    return result
+
+
+def invalidate_question_answer_index() -> None:
+    bump_version(INDEX_VERSION_NAME)
+
+
+def _load_question_answers(
+        question_ids: set[int]
+) -> dict[int, QuestionAnswers]:
+    if not question_ids:
+        return {}
+
+    answer_ids, right_answer_ids = {}, {}
+    for question_id, answer_id, is_right_answer in QuestionAnswer.objects.filter(
+        question_id__in=question_ids
+    ).order_by().values_list(
+        'question_id',
+        'answer_id',
+        'is_right_answer'
+    ):
+        answer_ids.setdefault(question_id, set()).add(answer_id)
+        if is_right_answer:
+            right_answer_ids[question_id] = answer_id
+
+    return {
+        question_id: QuestionAnswers(
+            frozenset(question_answer_ids),
+            right_answer_ids.get(question_id)
+        )
+        for question_id, question_answer_ids in answer_ids.items()
+    }
+
+
+def _get_index_key(version: int, question_id: int) -> str:
+    return f'{INDEX_KEY_PREFIX}:{version}:{question_id}'
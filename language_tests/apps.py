@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LanguageTestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'language_tests'
+
+    def ready(self):
+        from . import signals  # noqa: F401
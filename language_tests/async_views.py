@@ -0,0 +1,62 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from threading import Lock
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = Lock()
+
+
+def run_in_thread_pool(view: Callable) -> Callable:
+    """
+    Turns a synchronous view into an async one, which runs the view and
+    renders its response in a bounded pool of threads with their own
+    database connections, so the event loop is never blocked by the ORM.
+    """
+
+    @wraps(view)
+    async def async_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        loop = asyncio.get_running_loop()
+        # the context carries the metrics of the request to the thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            get_executor(),
+            partial(context.run, _call_view, view, request, *args, **kwargs)
+        )
+
+    return async_view
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_VIEWS['MAX_THREADS'],
+                    thread_name_prefix='language_tests_views'
+                )
+
+    return _executor
+
+
+def _call_view(view: Callable, request: HttpRequest, *args, **kwargs):
+    # request_started and request_finished are handled by the threads of
+    # asgiref, the connections of the pool threads are managed here
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+    finally:
+        close_old_connections()
+
+    return response
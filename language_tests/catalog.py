@@ -0,0 +1,59 @@
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest
+
+from .compression import get_encoded_contents
+from .versions import bump_version, get_version
+
+
+CATALOG_VERSION_NAME = 'test_type_catalog'
+LAST_MODIFIED_KEY = 'language_tests:test_type_catalog:last_modified'
+CONTENTS_KEY_PREFIX = 'language_tests:test_type_catalog:contents'
+# the contents are cached by version, the timeout only drops the old ones
+CONTENTS_TIMEOUT = 60 * 60 * 24
+
+
+def get_catalog_etag(request: HttpRequest, *args, **kwargs) -> str:
+    return f'"test-types-{get_version(CATALOG_VERSION_NAME)}"'
+
+
+def get_catalog_last_modified(
+        request: HttpRequest,
+        *args,
+        **kwargs
+) -> datetime:
+    last_modified = cache.get(LAST_MODIFIED_KEY)
+    if last_modified is None:
+        # an unknown modification time is treated as a modification now
+        cache.add(LAST_MODIFIED_KEY, time.time(), timeout=None)
+        last_modified = cache.get(LAST_MODIFIED_KEY)
+
+    return datetime.fromtimestamp(last_modified, tz=timezone.utc)
+
+
+def get_catalog_contents(render: Callable[[], bytes]) -> dict[str, bytes]:
+    """
+    Returns the rendered catalog with every supported encoding, it is
+    rendered and compressed once per version.
+    """
+    key = f'{CONTENTS_KEY_PREFIX}:{get_version(CATALOG_VERSION_NAME)}'
+    contents = cache.get(key)
+    if contents is None:
+        contents = get_encoded_contents(render())
+        cache.set(key, contents, timeout=CONTENTS_TIMEOUT)
+
+    return contents
+
+
+def invalidate_catalog() -> None:
+    _touch_last_modified()
+    transaction.on_commit(_touch_last_modified)
+    bump_version(CATALOG_VERSION_NAME)
+
+
+def _touch_last_modified() -> None:
+    cache.set(LAST_MODIFIED_KEY, time.time(), timeout=None)
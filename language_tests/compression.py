@@ -0,0 +1,112 @@
+import gzip
+from typing import Iterable, Mapping, Optional
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# the preferred encodings first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    options = settings.RESPONSE_COMPRESSION
+    if encoding == 'br':
+        return brotli.compress(content, quality=options['BROTLI_QUALITY'])
+    # mtime=0, so the same content always gives the same bytes
+    return gzip.compress(content, compresslevel=options['GZIP_LEVEL'], mtime=0)
+
+
+def get_encoded_contents(content: bytes) -> dict[str, bytes]:
+    """
+    Returns the content with every supported encoding, for responses which
+    are cached already compressed.
+    """
+    encoded_contents = {'identity': content}
+    if len(content) >= settings.RESPONSE_COMPRESSION['MIN_SIZE']:
+        for encoding in ENCODINGS:
+            encoded_contents[encoding] = compress(content, encoding)
+
+    return encoded_contents
+
+
+def get_content_encoding(
+        request: HttpRequest,
+        encodings: Iterable[str] = ENCODINGS
+) -> Optional[str]:
+    """
+    Returns the encoding of the Accept-Encoding header of the request with
+    the highest quality, the first one of the encodings on a tie.
+    """
+    qualities = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = (i.strip() for i in item.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+
+    best_encoding, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+
+    return best_encoding
+
+
+def encode_response(
+        request: HttpRequest,
+        response: HttpResponse,
+        encoded_contents: Optional[Mapping[str, bytes]] = None
+) -> HttpResponse:
+    """
+    Replaces the content of a successful response with the accepted encoding
+    of it, from ``encoded_contents`` when the response is cached already
+    encoded, otherwise it is compressed now.
+    """
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if (
+            response.status_code != 200
+            or response.streaming
+            or response.has_header('Content-Encoding')
+    ):
+        return response
+
+    if encoded_contents is not None:
+        encoding = get_content_encoding(
+            request,
+            [i for i in ENCODINGS if i in encoded_contents]
+        )
+        if encoding is None:
+            return response
+        content = encoded_contents[encoding]
+    else:
+        if len(response.content) < settings.RESPONSE_COMPRESSION['MIN_SIZE']:
+            return response
+        encoding = get_content_encoding(request)
+        if encoding is None:
+            return response
+        content = compress(response.content, encoding)
+
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    # the etag is shared by all the encodings, as in GZipMiddleware
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+    return response
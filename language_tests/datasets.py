@@ -0,0 +1,360 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+from random import Random
+from typing import Callable, Iterable, Iterator, Optional
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.models import Max
+
+from .catalog import invalidate_catalog
+from .loaders import copy_rows
+from .models import Answer, LanguageTestType, Question, QuestionAnswer, TestResult
+from .partitions import add_months, ensure_partition, get_month, is_partitioned
+from .pools import invalidate_question_pools
+from .stats import rebuild_question_stats, rebuild_user_stats
+
+
+WORDS = (
+    'apple', 'bread', 'cloud', 'dance', 'early', 'field', 'glass', 'happy',
+    'index', 'jolly', 'knife', 'lemon', 'music', 'night', 'ocean', 'paper',
+    'quiet', 'river', 'stone', 'table', 'under', 'voice', 'water', 'youth',
+    'zebra', 'about', 'before', 'garden', 'window', 'letter', 'market',
+    'summer', 'winter', 'travel', 'family', 'friend', 'school', 'doctor',
+)
+LANGUAGES = (
+    'English', 'German', 'French', 'Spanish', 'Italian', 'Portuguese',
+    'Dutch', 'Polish', 'Czech', 'Swedish', 'Finnish', 'Turkish', 'Greek',
+)
+PUBLISHED_TEST_TYPES_SHARE = 0.8
+PUBLISHED_QUESTIONS_SHARE = 0.9
+QUESTIONS_PER_TEST = 10
+# exponents of the zipf distributions of the activity of the users and of
+# the popularity of the test types
+USER_ACTIVITY_SKEW = 1.1
+TEST_TYPE_POPULARITY_SKEW = 0.8
+STATS_BATCH_SIZE = 1000
+
+
+class DatasetGenerator:
+    """
+    Generates test types, answers, questions with 4 answers, users and the
+    test results of the users, a few users answer most of the tests, some
+    test types are much more popular than others and every user has their
+    own share of right answers.
+
+    The tables are loaded in chunks with COPY on postgres and with plain
+    INSERTs on other databases. The dataset only depends on the seed, the
+    end date and the ids already used in the tables.
+    """
+
+    def __init__(
+            self,
+            test_types: int = 10,
+            questions: int = 10_000,
+            answers: int = 5_000,
+            users: int = 1_000,
+            results: int = 100_000,
+            months: int = 12,
+            seed: int = 0,
+            end_date: Optional[datetime] = None,
+            chunk_size: int = 100_000
+    ):
+        self.test_types = test_types
+        self.questions = questions
+        self.answers = answers
+        self.users = users
+        self.results = results
+        self.months = months
+        self.seed = seed
+        self.end_date = end_date or datetime.now(tz=timezone.utc)
+        self.chunk_size = chunk_size
+        self.rng = Random(seed)
+
+    def generate(self, report: Optional[Callable[[str, int], None]] = None) -> dict:
+        report = report or (lambda table, number_rows: None)
+        User = get_user_model()
+        with transaction.atomic():
+            first_test_type_id = _get_next_id(LanguageTestType)
+            first_answer_id = _get_next_id(Answer)
+            first_question_id = _get_next_id(Question)
+            first_user_id = _get_next_id(User)
+            test_type_ids = range(
+                first_test_type_id,
+                first_test_type_id + self.test_types
+            )
+            answer_ids = range(first_answer_id, first_answer_id + self.answers)
+            question_ids = range(
+                first_question_id,
+                first_question_id + self.questions
+            )
+            user_ids = range(first_user_id, first_user_id + self.users)
+
+            published_test_type_ids = self._load_test_types(test_type_ids)
+            report('test types', len(test_type_ids))
+            self._load_answers(answer_ids)
+            report('answers', len(answer_ids))
+            question_answer_ids, published_question_ids = self._load_questions(
+                question_ids,
+                test_type_ids,
+                published_test_type_ids,
+                answer_ids
+            )
+            report('questions', len(question_ids))
+            self._load_users(user_ids)
+            report('users', len(user_ids))
+            number_results = self._load_results(
+                user_ids,
+                first_question_id,
+                published_question_ids,
+                question_answer_ids
+            )
+            report('test results', number_results)
+
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(),
+                    [LanguageTestType, Answer, Question, QuestionAnswer, User]
+                ):
+                    cursor.execute(sql)
+
+        for i in range(0, len(user_ids), STATS_BATCH_SIZE):
+            rebuild_user_stats(user_ids[i:i + STATS_BATCH_SIZE])
+        for i in range(0, len(question_ids), STATS_BATCH_SIZE):
+            rebuild_question_stats(question_ids[i:i + STATS_BATCH_SIZE])
+        invalidate_catalog()
+        invalidate_question_pools(*test_type_ids)
+
+        return {
+            'test_types': len(test_type_ids),
+            'answers': len(answer_ids),
+            'questions': len(question_ids),
+            'users': len(user_ids),
+            'test_results': number_results,
+        }
+
+    def _load_test_types(self, test_type_ids: range) -> set[int]:
+        published_test_type_ids = {
+            test_type_id
+            for number, test_type_id in enumerate(test_type_ids)
+            if number == 0 or self.rng.random() < PUBLISHED_TEST_TYPES_SHARE
+        }
+        self._load(
+            LanguageTestType,
+            ('id', 'name', 'is_published'),
+            (
+                (
+                    test_type_id,
+                    f'{self.rng.choice(LANGUAGES)} {test_type_id}',
+                    test_type_id in published_test_type_ids,
+                )
+                for test_type_id in test_type_ids
+            )
+        )
+        return published_test_type_ids
+
+    def _load_answers(self, answer_ids: range) -> None:
+        self._load(
+            Answer,
+            ('id', 'answer'),
+            (
+                (answer_id, f'{self.rng.choice(WORDS)} {answer_id}')
+                for answer_id in answer_ids
+            )
+        )
+
+    def _load_questions(
+            self,
+            question_ids: range,
+            test_type_ids: range,
+            published_test_type_ids: set[int],
+            answer_ids: range
+    ) -> tuple[array, dict[int, array]]:
+        # 4 answer ids of every question, the right one first
+        question_answer_ids = array('q')
+        published_question_ids = {}
+
+        def generate_questions() -> Iterator[tuple]:
+            for question_id in question_ids:
+                test_type_id = self.rng.choice(test_type_ids)
+                is_published = self.rng.random() < PUBLISHED_QUESTIONS_SHARE
+                if is_published and test_type_id in published_test_type_ids:
+                    published_question_ids.setdefault(
+                        test_type_id,
+                        array('q')
+                    ).append(question_id)
+                question_answer_ids.extend(self.rng.sample(answer_ids, 4))
+                words = self.rng.sample(WORDS, 3)
+                yield (
+                    question_id,
+                    f'{words[0]} {words[1]} ___ {words[2]} {question_id}',
+                    is_published,
+                    test_type_id,
+                )
+
+        self._load(
+            Question,
+            ('id', 'question', 'is_published', 'test_type_id'),
+            generate_questions()
+        )
+        self._load(
+            QuestionAnswer,
+            ('question_id', 'answer_id', 'is_right_answer'),
+            (
+                (question_id, question_answer_ids[4 * number + i], i == 0)
+                for number, question_id in enumerate(question_ids)
+                for i in range(4)
+            )
+        )
+
+        return question_answer_ids, published_question_ids
+
+    def _load_users(self, user_ids: range) -> None:
+        self._load(
+            get_user_model(),
+            (
+                'id',
+                'username',
+                'email',
+                'password',
+                'first_name',
+                'last_name',
+                'is_superuser',
+                'is_staff',
+                'is_active',
+                'date_joined',
+            ),
+            (
+                (
+                    user_id,
+                    f'user_{user_id}',
+                    f'user_{user_id}@example.com',
+                    # an unusable password
+                    '!',
+                    self.rng.choice(WORDS).title(),
+                    self.rng.choice(WORDS).title(),
+                    False,
+                    False,
+                    True,
+                    self._get_date(),
+                )
+                for user_id in user_ids
+            )
+        )
+
+    def _load_results(
+            self,
+            user_ids: range,
+            first_question_id: int,
+            published_question_ids: dict[int, array],
+            question_answer_ids: array
+    ) -> int:
+        if not user_ids or not published_question_ids:
+            return 0
+
+        if is_partitioned():
+            month = get_month(self.end_date - timedelta(days=30 * self.months))
+            while month <= get_month(self.end_date):
+                ensure_partition(
+                    datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+                )
+                month = add_months(month, 1)
+
+        user_weights = list(
+            accumulate(
+                1 / number ** USER_ACTIVITY_SKEW
+                for number in range(1, len(user_ids) + 1)
+            )
+        )
+        test_type_ids = sorted(published_question_ids.keys())
+        self.rng.shuffle(test_type_ids)
+        test_type_weights = list(
+            accumulate(
+                1 / number ** TEST_TYPE_POPULARITY_SKEW
+                for number in range(1, len(test_type_ids) + 1)
+            )
+        )
+        # the share of the right answers of every user
+        skills = array('d', (self.rng.betavariate(4, 2) for _ in user_ids))
+
+        def generate_results() -> Iterator[tuple]:
+            number_results = 0
+            while number_results < self.results:
+                number = self.rng.choices(
+                    range(len(user_ids)),
+                    cum_weights=user_weights
+                )[0]
+                test_type_id = self.rng.choices(
+                    test_type_ids,
+                    cum_weights=test_type_weights
+                )[0]
+                question_ids = published_question_ids[test_type_id]
+                solution_date = self._get_date()
+                number_questions = min(
+                    QUESTIONS_PER_TEST,
+                    len(question_ids),
+                    self.results - number_results
+                )
+                for question_id in self.rng.sample(question_ids, number_questions):
+                    offset = 4 * (question_id - first_question_id)
+                    if self.rng.random() >= skills[number]:
+                        # one of the 3 wrong answers
+                        offset += self.rng.randint(1, 3)
+                    answer_id = question_answer_ids[offset]
+                    number_results += 1
+                    yield user_ids[number], question_id, answer_id, solution_date
+
+        return self._load(
+            TestResult,
+            ('user_id', 'question_id', 'answer_id', 'solution_date'),
+            generate_results()
+        )
+
+    def _load(
+            self,
+            model: type[models.Model],
+            field_names: tuple[str, ...],
+            rows: Iterable[tuple]
+    ) -> int:
+        rows = iter(rows)
+        columns = [model._meta.get_field(name).column for name in field_names]
+        number_rows = 0
+        while chunk := list(islice(rows, self.chunk_size)):
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    copy_rows(cursor, model._meta.db_table, columns, chunk)
+                else:
+                    # not bulk_create, it would overwrite the auto_now_add
+                    # solution dates
+                    _insert_rows(cursor, model._meta.db_table, columns, chunk)
+            number_rows += len(chunk)
+
+        return number_rows
+
+    def _get_date(self) -> datetime:
+        # the recent months are more active
+        days = 30 * self.months * self.rng.random() ** 2
+        return self.end_date - timedelta(days=days)
+
+
+def _insert_rows(cursor, table: str, columns: list[str], rows: list[tuple]) -> None:
+    quote_name = connection.ops.quote_name
+    cursor.executemany(
+        f'INSERT INTO {quote_name(table)} '
+        f'({", ".join(quote_name(column) for column in columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))})',
+        [
+            [
+                connection.ops.adapt_datetimefield_value(value)
+                if isinstance(value, datetime) else value
+                for value in row
+            ]
+            for row in rows
+        ]
+    )
+
+
+def _get_next_id(model: type[models.Model]) -> int:
+    return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
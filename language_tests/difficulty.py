@@ -0,0 +1,169 @@
+import logging
+import math
+import time
+from array import array
+from threading import Lock, Thread
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+from .models import QuestionStats
+from .pools import QuestionPool
+from .sampling import AliasTable
+
+
+# the share of the right answers of a question is counted as if it had these
+# answers more, so a question without answers is of medium difficulty
+PRIOR_ATTEMPTED = 2
+PRIOR_CORRECT = 1
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionDifficulty:
+    """
+    Shares of the right answers of the questions of a pool by their
+    positions in the pool, with the alias tables of the difficulty bands.
+    """
+    __slots__ = ('test_type_id', 'version', 'loaded_at', 'rates', '_tables')
+
+    def __init__(
+            self,
+            test_type_id: int,
+            version: int,
+            rates: array,
+            loaded_at: float
+    ):
+        self.test_type_id = test_type_id
+        self.version = version
+        self.loaded_at = loaded_at
+        self.rates = rates
+        self._tables: dict[str, AliasTable] = {}
+
+    def get_alias_table(self, band: str) -> AliasTable:
+        table = self._tables.get(band)
+        if table is None:
+            # a table built twice by concurrent requests is the same table
+            table = self._tables[band] = AliasTable(self.get_weights(band))
+
+        return table
+
+    def get_weights(self, band: str) -> list[float]:
+        """
+        The questions of the band have the weight 1, the weights of the other
+        ones fall with the distance of their share of the right answers to
+        the band.
+        """
+        options = settings.QUESTION_DIFFICULTY
+        low, high = options['BANDS'][band]
+        spread = options['SPREAD']
+        weights = []
+        for rate in self.rates:
+            distance = low - rate if rate < low else max(rate - high, 0.0)
+            weights.append(math.exp(-(distance / spread) ** 2))
+
+        return weights
+
+
+_difficulties: dict[int, QuestionDifficulty] = {}
+# the versions of the pools whose difficulty is being loaded and the start
+# times of the loads by the test type ids
+_loads: dict[int, tuple[int, float]] = {}
+_locks: dict[int, Lock] = {}
+
+
+def get_question_difficulty(pool: QuestionPool) -> Optional[QuestionDifficulty]:
+    """
+    Returns the difficulty of the questions of a materialized pool, or None
+    until it is loaded. The difficulty of a new version of the pool is loaded
+    in the background, and reloaded every
+    ``QUESTION_DIFFICULTY['REFRESH_INTERVAL']`` seconds while the loaded one
+    is served.
+    """
+    difficulty = _difficulties.get(pool.test_type_id)
+    if difficulty is None or difficulty.version != pool.version:
+        _start_load(pool)
+        return None
+
+    if _is_expired(difficulty.loaded_at):
+        _start_load(pool)
+    return difficulty
+
+
+def load_question_difficulty(pool: QuestionPool) -> QuestionDifficulty:
+    """
+    Loads the difficulty of the questions of a materialized pool with the
+    alias tables of all the bands, the requests get it once it is loaded.
+    """
+    loaded_at = time.monotonic()
+    stats = {
+        question_id: (attempted, correct)
+        for question_id, attempted, correct in QuestionStats.objects.filter(
+            question__test_type_id=pool.test_type_id,
+            question__is_published=True
+        ).order_by().values_list(
+            'question_id',
+            'attempted',
+            'correct'
+        )
+    }
+    no_stats = (0, 0)
+    rates = array(
+        'd',
+        (
+            (correct + PRIOR_CORRECT) / (attempted + PRIOR_ATTEMPTED)
+            for attempted, correct in (
+                stats.get(question_id, no_stats) for question_id in pool.ids
+            )
+        )
+    )
+    difficulty = QuestionDifficulty(pool.test_type_id, pool.version, rates, loaded_at)
+    for band in settings.QUESTION_DIFFICULTY['BANDS']:
+        difficulty.get_alias_table(band)
+
+    with _get_lock(pool.test_type_id):
+        # a load of an older version is replaced by the next request
+        _difficulties[pool.test_type_id] = difficulty
+        if _loads.get(pool.test_type_id, (None,))[0] == pool.version:
+            del _loads[pool.test_type_id]
+
+    return difficulty
+
+
+def _start_load(pool: QuestionPool) -> None:
+    with _get_lock(pool.test_type_id):
+        load = _loads.get(pool.test_type_id)
+        # a failed load is retried after the refresh interval
+        if load is not None and load[0] == pool.version and not _is_expired(load[1]):
+            return
+        _loads[pool.test_type_id] = (pool.version, time.monotonic())
+
+    Thread(
+        target=_load_in_background,
+        args=(pool,),
+        name=f'question-difficulty-{pool.test_type_id}',
+        daemon=True
+    ).start()
+
+
+def _load_in_background(pool: QuestionPool) -> None:
+    try:
+        load_question_difficulty(pool)
+    except Exception:
+        logger.exception('Question difficulty load failed.')
+    finally:
+        connection.close()
+
+
+def _get_lock(test_type_id: int) -> Lock:
+    lock = _locks.get(test_type_id)
+    if lock is None:
+        # setdefault() keeps the lock created first
+        lock = _locks.setdefault(test_type_id, Lock())
+    return lock
+
+
+def _is_expired(loaded_at: float) -> bool:
+    refresh_interval = settings.QUESTION_DIFFICULTY['REFRESH_INTERVAL']
+    return time.monotonic() - loaded_at > refresh_interval
@@ -0,0 +1,162 @@
+import locale
+import logging
+from typing import Any, Callable, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import LanguageTestType, Question, QuestionAnswer
+from .routers import pin_reads_to_primary
+from .serializers import QuestionReadOnlySerializer
+
+
+QUESTION_FRAGMENT_KEY_PREFIX = 'language_tests:question'
+TEST_TYPE_FRAGMENT_KEY_PREFIX = 'language_tests:test_type'
+# fragments are invalidated on edit, the timeout only bounds the staleness
+# of a fragment rendered concurrently with an edit
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+logger = logging.getLogger(__name__)
+
+
+def get_question_fragments(question_ids: Iterable[int]) -> list[dict]:
+    keys = {
+        _get_question_fragment_key(question_id): question_id
+        for question_id in question_ids
+    }
+    fragments = cache.get_many(keys.keys())
+    missing_ids = [
+        question_id
+        for key, question_id in keys.items()
+        if key not in fragments
+    ]
+    if missing_ids:
+        missing_fragments = {
+            _get_question_fragment_key(fragment['id']): fragment
+            for fragment in _render_question_fragments(missing_ids)
+        }
+        cache.set_many(missing_fragments, timeout=FRAGMENT_TIMEOUT)
+        fragments.update(missing_fragments)
+
+    # sorted as ORDER BY question, id of the database
+    sort_key = _get_sort_key()
+    return sorted(
+        fragments.values(),
+        key=lambda x: (sort_key(x['question']), x['question'], x['id'])
+    )
+
+
+def get_test_type_fragment(test_type_id: int) -> Optional[dict]:
+    key = _get_test_type_fragment_key(test_type_id)
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment = LanguageTestType.objects.filter(
+            pk=test_type_id,
+            is_published=True
+        ).values(
+            'id',
+            'name'
+        ).first()
+        # missing test types are cached too, as an empty fragment
+        fragment = fragment or {}
+        cache.set(key, fragment, timeout=FRAGMENT_TIMEOUT)
+
+    return fragment or None
+
+
+def invalidate_question_fragments(*question_ids: int) -> None:
+    keys = [_get_question_fragment_key(question_id) for question_id in question_ids]
+    # deleted again after the commit, see versions.bump_version
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+    pin_reads_to_primary()
+
+
+def invalidate_test_type_fragment(test_type_id: int) -> None:
+    key = _get_test_type_fragment_key(test_type_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    pin_reads_to_primary()
+
+
+def _render_question_fragments(question_ids: list[int]) -> list[dict]:
+    # the answers are sorted here, as Meta.ordering of Answer sorted them, so
+    # both queries go without an ORDER BY
+    answers = {}
+    for question_id, answer_id, answer in QuestionAnswer.objects.filter(
+        question_id__in=question_ids
+    ).order_by().values_list(
+        'question_id',
+        'answer_id',
+        'answer__answer'
+    ):
+        answers.setdefault(question_id, []).append(
+            {'id': answer_id, 'answer': answer}
+        )
+    questions = Question.objects.filter(
+        id__in=question_ids
+    ).order_by().values(
+        'id',
+        'question'
+    )
+
+    sort_key = _get_sort_key()
+    return [
+        QuestionReadOnlySerializer.to_fast_representation(
+            {
+                **question,
+                'answers': sorted(
+                    answers.get(question['id'], ()),
+                    key=lambda x: (sort_key(x['answer']), x['answer'], x['id'])
+                ),
+            }
+        )
+        for question in questions
+    ]
+
+
+def load_sort_key(connection) -> None:
+    """
+    Sets the key which sorts the texts as the collation of the database: by
+    the code points on sqlite and with the C collation of Postgres, by the
+    locale of the collation otherwise. Runs once, on the first connection.
+    """
+    global _sort_key
+    if _sort_key is not None or connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT datcollate FROM pg_database '
+            'WHERE datname = current_database()'
+        )
+        collation = cursor.fetchone()[0]
+
+    sort_key = str
+    if collation not in ('C', 'POSIX'):
+        try:
+            # the only use of LC_COLLATE in the process
+            locale.setlocale(locale.LC_COLLATE, collation)
+            sort_key = locale.strxfrm
+        except locale.Error:
+            logger.warning(
+                'Locale %s of the database collation is not available, '
+                'the questions are sorted by the code points.',
+                collation
+            )
+    _sort_key = sort_key
+
+
+_sort_key: Optional[Callable[[str], Any]] = None
+
+
+def _get_sort_key() -> Callable[[str], Any]:
+    return _sort_key or str
+
+
+def _get_question_fragment_key(question_id: int) -> str:
+    return f'{QUESTION_FRAGMENT_KEY_PREFIX}:{question_id}'
+
+
+def _get_test_type_fragment_key(test_type_id: int) -> str:
+    return f'{TEST_TYPE_FRAGMENT_KEY_PREFIX}:{test_type_id}'
@@ -0,0 +1,135 @@
+import time
+from bisect import bisect_left, insort
+from threading import Lock
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from .models import UserTestTypeStats
+from .versions import bump_version, get_version
+
+
+LEADERBOARD_VERSION_NAME = 'leaderboards'
+
+
+class Leaderboard:
+    """
+    Numbers of the right answers of the users of one test type sorted from
+    the best, users with the same score share the rank.
+    """
+    __slots__ = (
+        'test_type_id',
+        'version',
+        'loaded_at',
+        '_keys',
+        '_scores',
+        '_lock',
+    )
+
+    def __init__(
+            self,
+            test_type_id: int,
+            version: int,
+            scores: dict[int, int],
+            loaded_at: float
+    ):
+        self.test_type_id = test_type_id
+        self.version = version
+        self.loaded_at = loaded_at
+        self._scores = scores
+        self._keys = sorted((-score, user_id) for user_id, score in scores.items())
+        self._lock = Lock()
+
+    def set_score(self, user_id: int, score: int) -> None:
+        with self._lock:
+            old_score = self._scores.get(user_id)
+            if old_score == score:
+                return
+            if old_score is not None:
+                del self._keys[bisect_left(self._keys, (-old_score, user_id))]
+            insort(self._keys, (-score, user_id))
+            self._scores[user_id] = score
+
+    def get_top(self, limit: int) -> list[tuple[int, int, int]]:
+        """
+        Returns the rank, the user id and the score of the best users.
+        """
+        with self._lock:
+            keys = self._keys[:limit]
+
+        top = []
+        for index, (score, user_id) in enumerate(keys):
+            rank = top[-1][0] if top and -score == top[-1][2] else index + 1
+            top.append((rank, user_id, -score))
+
+        return top
+
+    def get_rank(self, user_id: int) -> Optional[tuple[int, int]]:
+        """
+        Returns the rank and the score of the user.
+        """
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            # the number of the users with a higher score
+            return bisect_left(self._keys, (-score,)) + 1, score
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+_leaderboards: dict[int, Leaderboard] = {}
+_leaderboards_lock = Lock()
+
+
+def get_leaderboard(test_type_id: int) -> Leaderboard:
+    version = get_version(LEADERBOARD_VERSION_NAME)
+    leaderboard = _leaderboards.get(test_type_id)
+    if leaderboard is not None and not _is_expired(leaderboard, version):
+        return leaderboard
+
+    with _leaderboards_lock:
+        leaderboard = _leaderboards.get(test_type_id)
+        if leaderboard is None or _is_expired(leaderboard, version):
+            leaderboard = _load_leaderboard(test_type_id, version)
+            _leaderboards[test_type_id] = leaderboard
+
+    return leaderboard
+
+
+def update_leaderboards(scores: Iterable[tuple[int, int, int]]) -> None:
+    # the scores saved by this process are visible to it at once, the
+    # leaderboards which are not loaded get them with the other scores
+    for user_id, test_type_id, score in scores:
+        leaderboard = _leaderboards.get(test_type_id)
+        if leaderboard is not None:
+            leaderboard.set_score(user_id, score)
+
+
+def invalidate_leaderboards() -> None:
+    # reloads the leaderboards of all the processes, the scores saved by
+    # them normally get to the others after the refresh interval
+    bump_version(LEADERBOARD_VERSION_NAME)
+
+
+def _load_leaderboard(test_type_id: int, version: int) -> Leaderboard:
+    loaded_at = time.monotonic()
+    scores = dict(
+        UserTestTypeStats.objects.filter(
+            test_type_id=test_type_id
+        ).order_by().values_list(
+            'user_id',
+            'correct'
+        )
+    )
+
+    return Leaderboard(test_type_id, version, scores, loaded_at)
+
+
+def _is_expired(leaderboard: Leaderboard, version: int) -> bool:
+    refresh_interval = settings.LEADERBOARD['REFRESH_INTERVAL']
+    return (
+        leaderboard.version != version
+        or time.monotonic() - leaderboard.loaded_at > refresh_interval
+    )
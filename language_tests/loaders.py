@@ -0,0 +1,329 @@
+import csv
+import io
+from typing import Iterable, Sequence
+
+from django.db import connection, models, transaction
+
+from .models import Answer, Question, QuestionAnswer
+from .pools import invalidate_question_pools
+
+
+# keeps the number of parameters of one upsert far below the postgres limit
+UPSERT_BATCH_SIZE = 1000
+
+
+def save_questions(questions: Sequence[dict]) -> list[int]:
+    """
+    Saves new questions in one transaction with three statements on
+    postgres, answers shared with other questions are reused.
+    """
+    with transaction.atomic():
+        answer_ids = upsert_answers(
+            answer
+            for question in questions
+            for answer in question['answers'].keys()
+        )
+        new_questions = Question.objects.bulk_create(
+            [
+                Question(
+                    question=question['question'],
+                    is_published=question['is_published'],
+                    test_type_id=question['test_type_id']
+                )
+                for question in questions
+            ]
+        )
+        if not connection.features.can_return_rows_from_bulk_insert:
+            question_ids = dict(
+                Question.objects.filter(
+                    question__in=[question.question for question in new_questions]
+                ).values_list(
+                    'question',
+                    'id'
+                )
+            )
+            for question in new_questions:
+                question.pk = question_ids[question.question]
+
+        QuestionAnswer.objects.bulk_create(
+            [
+                QuestionAnswer(
+                    question_id=new_question.pk,
+                    answer_id=answer_ids[answer],
+                    is_right_answer=is_right_answer
+                )
+                for question, new_question in zip(questions, new_questions)
+                for answer, is_right_answer in question['answers'].items()
+            ],
+            ignore_conflicts=True
+        )
+    invalidate_question_pools(*(question.test_type_id for question in new_questions))
+
+    return [question.pk for question in new_questions]
+
+
+def upsert_answers(answers: Iterable[str]) -> dict[str, int]:
+    # sorted, so concurrent writers wait for the new answers in the same order
+    answers = sorted(set(answers))
+    if connection.vendor != 'postgresql':
+        Answer.objects.bulk_create(
+            [Answer(answer=answer) for answer in answers],
+            ignore_conflicts=True
+        )
+        return dict(
+            Answer.objects.filter(
+                answer__in=answers
+            ).values_list(
+                'answer',
+                'id'
+            )
+        )
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(Answer._meta.db_table)
+    pk_column = quote_name(Answer._meta.pk.column)
+    answer_column = quote_name(Answer._meta.get_field('answer').column)
+    answer_ids = {}
+    with connection.cursor() as cursor:
+        for i in range(0, len(answers), UPSERT_BATCH_SIZE):
+            batch = answers[i:i + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} ({answer_column}) '
+                f'VALUES {", ".join(["(%s)"] * len(batch))} '
+                f'ON CONFLICT ({answer_column}) DO NOTHING '
+                f'RETURNING {answer_column}, {pk_column}',
+                batch
+            )
+            answer_ids.update(cursor.fetchall())
+            # the existing answers are only read, so the writers do not lock
+            # the rows of the answers shared by many questions
+            existing_answers = [i for i in batch if i not in answer_ids]
+            if existing_answers:
+                cursor.execute(
+                    f'SELECT {answer_column}, {pk_column} FROM {table} '
+                    f'WHERE {answer_column} = ANY(%s)',
+                    [existing_answers]
+                )
+                answer_ids.update(cursor.fetchall())
+
+    return answer_ids
+
+
+def copy_rows(
+        cursor,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Sequence]
+) -> None:
+    # loads ``rows`` with a single postgres COPY, the buffer holds one chunk
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+    buffer.seek(0)
+
+    quote_name = connection.ops.quote_name
+    sql = (
+        f'COPY {quote_name(table)} '
+        f'({", ".join(quote_name(column) for column in columns)}) '
+        f'FROM STDIN WITH (FORMAT csv)'
+    )
+    cursor.copy_expert(sql, buffer)
+
+
+class QuestionLoader:
+    """
+    Saves chunks of validated questions:
+    ``{'question': str, 'test_type_id': int, 'is_published': bool,
+    'answers': {answer: is_right_answer}}``.
+
+    Questions which already exist are skipped.
+    """
+
+    def load(self, questions: Sequence[dict]) -> int:
+        with transaction.atomic():
+            created = self._load(questions)
+        invalidate_question_pools(*created.keys())
+
+        return sum(created.values())
+
+    def _load(self, questions: Sequence[dict]) -> dict[int, int]:
+        answer_ids = upsert_answers(
+            answer
+            for question in questions
+            for answer in question['answers'].keys()
+        )
+
+        existing_questions = set(
+            Question.objects.filter(
+                question__in=[question['question'] for question in questions]
+            ).values_list(
+                'question',
+                flat=True
+            )
+        )
+        new_questions = [
+            question
+            for question in questions
+            if question['question'] not in existing_questions
+        ]
+        Question.objects.bulk_create(
+            [
+                Question(
+                    question=question['question'],
+                    is_published=question['is_published'],
+                    test_type_id=question['test_type_id']
+                )
+                for question in new_questions
+            ]
+        )
+        question_ids = dict(
+            Question.objects.filter(
+                question__in=[question['question'] for question in new_questions]
+            ).values_list(
+                'question',
+                'id'
+            )
+        )
+
+        QuestionAnswer.objects.bulk_create(
+            [
+                QuestionAnswer(
+                    question_id=question_ids[question['question']],
+                    answer_id=answer_ids[answer],
+                    is_right_answer=is_right_answer
+                )
+                for question in new_questions
+                for answer, is_right_answer in question['answers'].items()
+            ]
+        )
+
+        created = {}
+        for question in new_questions:
+            test_type_id = question['test_type_id']
+            created[test_type_id] = created.get(test_type_id, 0) + 1
+
+        return created
+
+
+class PostgresQuestionLoader(QuestionLoader):
+    """
+    Loads the chunks into a temporary table with COPY and moves them to the
+    questions, answers and question answers with three statements.
+    """
+    staging_table = 'language_tests_question_import'
+    staging_columns = (
+        'question',
+        'test_type_id',
+        'is_published',
+        'answer',
+        'is_right_answer',
+    )
+
+    def _load(self, questions: Sequence[dict]) -> dict[int, int]:
+        with connection.cursor() as cursor:
+            self._create_staging_table(cursor)
+            copy_rows(
+                cursor,
+                self.staging_table,
+                self.staging_columns,
+                (
+                    (
+                        question['question'],
+                        question['test_type_id'],
+                        question['is_published'],
+                        answer,
+                        is_right_answer,
+                    )
+                    for question in questions
+                    for answer, is_right_answer in question['answers'].items()
+                )
+            )
+            cursor.execute(self._get_answers_sql())
+            cursor.execute(self._get_questions_sql())
+            created = dict(cursor.fetchall())
+            cursor.execute(f'TRUNCATE {self._quote(self.staging_table)}')
+
+        return created
+
+    def _create_staging_table(self, cursor) -> None:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS '
+            f'{self._quote(self.staging_table)} ('
+            f'question varchar(256) NOT NULL, '
+            f'test_type_id bigint NOT NULL, '
+            f'is_published boolean NOT NULL, '
+            f'answer varchar(64) NOT NULL, '
+            f'is_right_answer boolean NOT NULL'
+            f')'
+        )
+
+    def _get_answers_sql(self) -> str:
+        answer_table = self._quote(Answer._meta.db_table)
+        answer_column = self._get_column(Answer, 'answer')
+
+        return (
+            f'INSERT INTO {answer_table} ({answer_column}) '
+            f'SELECT DISTINCT answer FROM {self._quote(self.staging_table)} '
+            f'ON CONFLICT ({answer_column}) DO NOTHING'
+        )
+
+    def _get_questions_sql(self) -> str:
+        staging_table = self._quote(self.staging_table)
+        question_table = self._quote(Question._meta.db_table)
+        answer_table = self._quote(Answer._meta.db_table)
+        question_answer_table = self._quote(QuestionAnswer._meta.db_table)
+        question_pk_column = self._quote(Question._meta.pk.column)
+        question_column = self._get_column(Question, 'question')
+        test_type_column = self._get_column(Question, 'test_type')
+        is_published_column = self._get_column(Question, 'is_published')
+        answer_pk_column = self._quote(Answer._meta.pk.column)
+        answer_column = self._get_column(Answer, 'answer')
+        question_id_column = self._get_column(QuestionAnswer, 'question')
+        answer_id_column = self._get_column(QuestionAnswer, 'answer')
+        is_right_answer_column = self._get_column(
+            QuestionAnswer,
+            'is_right_answer'
+        )
+
+        # the questions and their answers are inserted by one statement, so
+        # the ids of the new questions never leave the database
+        return (
+            f'WITH new_question AS ('
+            f'INSERT INTO {question_table} '
+            f'({question_column}, {test_type_column}, {is_published_column}) '
+            f'SELECT DISTINCT ON (question) '
+            f'question, test_type_id, is_published FROM {staging_table} '
+            f'ON CONFLICT ({question_column}) DO NOTHING '
+            f'RETURNING {question_pk_column} AS id, '
+            f'{question_column} AS question, '
+            f'{test_type_column} AS test_type_id'
+            f'), new_question_answer AS ('
+            f'INSERT INTO {question_answer_table} '
+            f'({question_id_column}, {answer_id_column}, '
+            f'{is_right_answer_column}) '
+            f'SELECT new_question.id, answer.{answer_pk_column}, '
+            f'staging.is_right_answer '
+            f'FROM new_question '
+            f'JOIN {staging_table} staging '
+            f'ON staging.question = new_question.question '
+            f'JOIN {answer_table} answer '
+            f'ON answer.{answer_column} = staging.answer'
+            f') '
+            f'SELECT test_type_id, count(*) FROM new_question '
+            f'GROUP BY test_type_id'
+        )
+
+    def _get_column(self, model: type[models.Model], field_name: str) -> str:
+        return self._quote(model._meta.get_field(field_name).column)
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return connection.ops.quote_name(name)
+
+
+def get_question_loader() -> QuestionLoader:
+    if connection.vendor == 'postgresql':
+        return PostgresQuestionLoader()
+
+    return QuestionLoader()
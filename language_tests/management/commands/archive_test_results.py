@@ -0,0 +1,38 @@
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...partitions import archive_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        'Detaches the monthly partitions of the test results older than '
+        '--before. With --output-dir they are saved there as gzipped CSV '
+        'files and dropped, otherwise they are kept as standalone tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help='YYYY-MM')
+        parser.add_argument('--output-dir')
+
+    def handle(self, *args, **options):
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError('--before must have the format YYYY-MM.') from None
+        output_dir = options['output_dir'] and Path(options['output_dir'])
+        if output_dir is not None and not output_dir.is_dir():
+            raise CommandError(f'{output_dir} is not a directory.')
+        if not is_partitioned():
+            raise CommandError('The test results table is not partitioned.')
+
+        archived_partitions = archive_partitions(before, output_dir)
+        for partition, number_rows in archived_partitions:
+            self.stdout.write(f'Archived {partition} ({number_rows} rows)')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Archived {len(archived_partitions)} partitions.'
+            )
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...partitions import MONTHS_AHEAD, create_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates the monthly partitions of the test results for the current '
+        'month and the following ones, run it at least once a month.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=MONTHS_AHEAD)
+
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0:
+            raise CommandError('--months-ahead must not be negative.')
+        if not is_partitioned():
+            raise CommandError('The test results table is not partitioned.')
+
+        created_partitions = create_partitions(options['months_ahead'])
+        for partition in created_partitions:
+            self.stdout.write(f'Created {partition}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {len(created_partitions)} partitions.')
+        )
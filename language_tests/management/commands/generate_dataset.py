@@ -0,0 +1,84 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ...datasets import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a synthetic dataset for benchmarks: test types, questions '
+        'with 4 answers, users and their test results. The same seed and end '
+        'date give the same dataset in an empty database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test-types', type=int, default=10)
+        parser.add_argument('--questions', type=int, default=10_000)
+        parser.add_argument('--answers', type=int, default=5_000)
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--results', type=int, default=100_000)
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=12,
+            help='The test results are spread over the months before the end date.'
+        )
+        parser.add_argument('--end-date', help='YYYY-MM-DD, today by default.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        for name in ('test_types', 'questions', 'users', 'months', 'chunk_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be positive.')
+        if options['answers'] < 4:
+            raise CommandError('--answers must be at least 4.')
+        if options['results'] < 0:
+            raise CommandError('--results must not be negative.')
+        end_date = None
+        if options['end_date']:
+            try:
+                end_date = datetime.strptime(
+                    options['end_date'],
+                    '%Y-%m-%d'
+                ).replace(tzinfo=timezone.utc)
+            except ValueError:
+                raise CommandError(
+                    '--end-date must have the format YYYY-MM-DD.'
+                ) from None
+        if connection.vendor != 'postgresql':
+            self.stdout.write(
+                self.style.WARNING(
+                    'The tables are loaded with INSERTs, use postgres for '
+                    'big datasets.'
+                )
+            )
+
+        generator = DatasetGenerator(
+            test_types=options['test_types'],
+            questions=options['questions'],
+            answers=options['answers'],
+            users=options['users'],
+            results=options['results'],
+            months=options['months'],
+            seed=options['seed'],
+            end_date=end_date,
+            chunk_size=options['chunk_size']
+        )
+        start_time = time.perf_counter()
+        counts = generator.generate(
+            lambda table, number_rows: self.stdout.write(
+                f'Loaded {number_rows} {table} '
+                f'({time.perf_counter() - start_time:.1f}s)'
+            )
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated {counts["questions"]} questions and '
+                f'{counts["test_results"]} test results in '
+                f'{time.perf_counter() - start_time:.1f}s.'
+            )
+        )
@@ -0,0 +1,38 @@
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from test_your_language.yasg import SCHEMA_RENDERERS, get_schema
+from ...compression import compress
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes the OpenAPI schema of the API to swagger.json and swagger.yaml '
+        'of the output directory, with gzipped copies, to be served by nginx.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir')
+
+    def handle(self, *args, **options):
+        output_dir = Path(options['output_dir'])
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            raise CommandError(f'Can not create {output_dir}: {e}') from None
+
+        for format in SCHEMA_RENDERERS:
+            content = get_schema(format)
+            for path, path_content in (
+                    (output_dir / f'swagger{format}', content),
+                    (output_dir / f'swagger{format}.gz', compress(content, 'gzip')),
+            ):
+                # nginx never serves a partly written file
+                tmp_path = path.with_name(f'.{path.name}.tmp')
+                tmp_path.write_bytes(path_content)
+                os.replace(tmp_path, path)
+            self.stdout.write(f'Wrote {output_dir / f"swagger{format}"}')
+
+        self.stdout.write(self.style.SUCCESS('Generated the schema.'))
@@ -0,0 +1,183 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, TextIO
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...loaders import get_question_loader
+from ...models import Answer, LanguageTestType, Question
+from ...validators import validate_question, validate_question_answers
+
+
+CSV_ANSWER_COLUMNS = ('answer_1', 'answer_2', 'answer_3', 'answer_4',)
+FORMATS = ('csv', 'jsonl',)
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on',)
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'off',)
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports questions from a CSV file (question, test_type, '
+        'is_published, answer_1, ..., answer_4, right_answer) or a JSON Lines '
+        'file with the objects accepted by the question API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File path, "-" reads stdin.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path, chunk_size = options['path'], options['chunk_size']
+        file_format = options['format'] or Path(path).suffix.lstrip('.')
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Unknown format "{file_format}", use --format.'
+            )
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        if path == '-':
+            self._import(sys.stdin, file_format, chunk_size)
+        else:
+            with open(path, newline='', encoding='utf-8') as file:
+                self._import(file, file_format, chunk_size)
+
+    def _import(self, file: TextIO, file_format: str, chunk_size: int) -> None:
+        loader = get_question_loader()
+        test_type_ids = set(
+            LanguageTestType.objects.values_list('id', flat=True)
+        )
+        read_rows = _read_csv_rows if file_format == 'csv' else _read_jsonl_rows
+
+        start_time = time.perf_counter()
+        number_rows, number_invalid_rows, number_created = 0, 0, 0
+        chunk = {}
+        for line_number, row in read_rows(file):
+            number_rows += 1
+            try:
+                question = _parse_question(row, file_format, test_type_ids)
+            except ValidationError as exc:
+                number_invalid_rows += 1
+                self.stderr.write(f'Line {line_number}: {"; ".join(exc.messages)}')
+                continue
+
+            chunk.setdefault(question['question'], question)
+            if len(chunk) >= chunk_size:
+                number_created += loader.load(list(chunk.values()))
+                chunk.clear()
+                self._report(number_rows, number_created, start_time)
+        if chunk:
+            number_created += loader.load(list(chunk.values()))
+
+        self._report(number_rows, number_created, start_time)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {number_created} questions, '
+                f'{number_invalid_rows} invalid rows, '
+                f'{number_rows - number_invalid_rows - number_created} '
+                f'duplicate questions skipped.'
+            )
+        )
+
+    def _report(
+            self,
+            number_rows: int,
+            number_created: int,
+            start_time: float
+    ) -> None:
+        elapsed_time = time.perf_counter() - start_time
+        rate = number_rows / elapsed_time if elapsed_time else 0
+        self.stdout.write(
+            f'{number_rows} rows read, {number_created} questions created, '
+            f'{rate:.0f} rows/s'
+        )
+
+
+def _read_csv_rows(file: TextIO) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _read_jsonl_rows(file: TextIO) -> Iterator[tuple[int, dict]]:
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+        yield line_number, row
+
+
+def _parse_question(row, file_format: str, test_type_ids: set[int]) -> dict:
+    if not isinstance(row, dict):
+        raise ValidationError('Invalid row.')
+
+    if file_format == 'csv':
+        right_answer = _parse_int(row.get('right_answer'), 'right_answer')
+        answers = {}
+        for number, column in enumerate(CSV_ANSWER_COLUMNS, start=1):
+            answers[row.get(column) or ''] = number == right_answer
+    else:
+        answers = {}
+        for answer in row.get('answers') or ():
+            if not isinstance(answer, dict):
+                raise ValidationError('Invalid answers.')
+            answers[str(answer.get('answer') or '')] = _parse_bool(
+                answer.get('is_right_answer'),
+                'is_right_answer'
+            )
+
+    question = str(row.get('question') or '')
+    _validate_length(question, Question, 'question')
+    validate_question(question)
+    for answer in answers.keys():
+        _validate_length(answer, Answer, 'answer')
+    validate_question_answers(answers)
+
+    test_type_id = _parse_int(row.get('test_type'), 'test_type')
+    if test_type_id not in test_type_ids:
+        raise ValidationError(f'Unknown test type {test_type_id}.')
+
+    is_published = row.get('is_published')
+    if is_published in (None, ''):
+        is_published = True
+
+    return {
+        'question': question,
+        'test_type_id': test_type_id,
+        'is_published': _parse_bool(is_published, 'is_published'),
+        'answers': answers,
+    }
+
+
+def _parse_bool(value, name: str) -> bool:
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in TRUE_VALUES:
+        return True
+    if str(value).strip().lower() in FALSE_VALUES:
+        return False
+
+    raise ValidationError(f'Invalid {name} "{value}".')
+
+
+def _parse_int(value, name: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f'Invalid {name} "{value}".') from None
+
+
+def _validate_length(value: str, model, field_name: str) -> None:
+    max_length = model._meta.get_field(field_name).max_length
+    if not 0 < len(value) <= max_length:
+        raise ValidationError(
+            f'{field_name} must be 1 to {max_length} characters long.'
+        )
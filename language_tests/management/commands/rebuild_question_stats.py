@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Question
+from ...stats import rebuild_question_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the numbers of the answers of the questions from the test '
+        'results in batches of questions, can run while the results are '
+        'being saved.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        questions = Question.objects.order_by('pk').values_list('pk', flat=True)
+        last_question_id = None
+        number_questions = number_rows = 0
+        while True:
+            batch = questions if last_question_id is None else questions.filter(
+                pk__gt=last_question_id
+            )
+            question_ids = list(batch[:batch_size])
+            if not question_ids:
+                break
+
+            number_rows += rebuild_question_stats(question_ids)
+            number_questions += len(question_ids)
+            last_question_id = question_ids[-1]
+            self.stdout.write(
+                f'Rebuilt the statistics of {number_questions} questions'
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt the statistics of {number_rows} answered questions '
+                f'of {number_questions} questions.'
+            )
+        )
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the statistics of the users from their test results in '
+        'batches of users, can run while the results are being saved.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        users = get_user_model().objects.order_by('pk').values_list(
+            'pk',
+            flat=True
+        )
+        last_user_id = None
+        number_users = number_rows = 0
+        while True:
+            batch = users if last_user_id is None else users.filter(
+                pk__gt=last_user_id
+            )
+            user_ids = list(batch[:batch_size])
+            if not user_ids:
+                break
+
+            number_rows += rebuild_user_stats(user_ids)
+            number_users += len(user_ids)
+            last_user_id = user_ids[-1]
+            self.stdout.write(f'Rebuilt the statistics of {number_users} users')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {number_rows} statistics of {number_users} users.'
+            )
+        )
@@ -0,0 +1,439 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Iterator, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+from .write_behind import get_test_result_writer
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# name: (type, help, buckets of the histograms)
+HTTP_METRICS = {
+    'http_requests_total': (
+        'counter',
+        'Requests by view, method and status.',
+        None,
+    ),
+    'http_throttled_requests_total': (
+        'counter',
+        'Requests rejected by the throttles, by view and throttle scope.',
+        None,
+    ),
+    'http_request_duration_seconds': (
+        'histogram',
+        'Request latency.',
+        DURATION_BUCKETS,
+    ),
+    'http_request_db_queries': (
+        'histogram',
+        'Database queries of a request.',
+        QUERIES_BUCKETS,
+    ),
+    'http_request_db_duration_seconds': (
+        'histogram',
+        'Time of the database queries of a request.',
+        DURATION_BUCKETS,
+    ),
+    'http_response_size_bytes': (
+        'histogram',
+        'Size of the response body.',
+        SIZE_BUCKETS,
+    ),
+}
+# statistics of the connection pools and of the test result writer which
+# are not counters, the ones ending with "_max" are merged with max()
+PROCESS_GAUGES = {'size', 'idle', 'max_size', 'buffered_results'}
+UNRESOLVED_VIEW = 'unresolved'
+
+
+class RequestMetrics:
+    """
+    Database queries of one request, they are added by record_query().
+    """
+    __slots__ = ('queries', 'db_duration')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start_time = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_duration += time.perf_counter() - start_time
+
+
+_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar(
+    'request_metrics',
+    default=None
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of all the connections, adds the query to the metrics of
+    the current request. The context of the request is carried to the
+    threads which run its ORM work (asgiref's and the pool of the views).
+    """
+    request_metrics = _request_metrics.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    return request_metrics(execute, sql, params, many, context)
+
+
+class MetricsRegistry:
+    """
+    Metrics of one process. With a directory they are written to a file of
+    the process at most every ``flush_interval`` seconds, so the metrics of
+    all the workers can be merged by any of them.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5.0):
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        # a pid may be reused by a later worker
+        self.path = (
+            self.directory / f'{self.pid}_{uuid4().hex}.json'
+            if self.directory else None
+        )
+        self._counters: dict[tuple, float] = {}
+        # (name, labels): [count of every bucket..., count above them, sum]
+        self._histograms: dict[tuple, list] = {}
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._flushed_at = time.monotonic()
+
+    def observe_request(
+            self,
+            view: str,
+            method: str,
+            status: int,
+            duration: float,
+            queries: int,
+            db_duration: float,
+            size: Optional[int]
+    ) -> None:
+        labels = (('view', view), ('method', method))
+        now = time.monotonic()
+        with self._lock:
+            key = ('http_requests_total', (*labels, ('status', str(status))))
+            self._counters[key] = self._counters.get(key, 0) + 1
+            self._observe('http_request_duration_seconds', labels, duration)
+            self._observe('http_request_db_queries', labels, queries)
+            self._observe('http_request_db_duration_seconds', labels, db_duration)
+            if size is not None:
+                self._observe('http_response_size_bytes', labels, size)
+            flush = (
+                self.path is not None
+                and now - self._flushed_at >= self.flush_interval
+            )
+            if flush:
+                self._flushed_at = now
+
+        if flush:
+            self.flush()
+
+    def observe_throttled(self, view: str, scope: str) -> None:
+        # flushed with the rejected request by observe_request
+        key = ('http_throttled_requests_total', (('view', view), ('scope', scope)))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def get_snapshot(self) -> dict:
+        with self._lock:
+            counters = [
+                [name, labels, value]
+                for (name, labels), value in self._counters.items()
+            ]
+            histograms = [
+                [name, labels, values.copy()]
+                for (name, labels), values in self._histograms.items()
+            ]
+
+        gauges = []
+        for metric_type, name, labels, value in _get_process_stats():
+            metrics = counters if metric_type == 'counter' else gauges
+            metrics.append([name, labels, value])
+
+        return {
+            'pid': self.pid,
+            'counters': counters,
+            'histograms': histograms,
+            'gauges': gauges,
+        }
+
+    def flush(self) -> None:
+        # the file is replaced at once, so it is never read half written
+        temporary_path = self.path.with_suffix('.tmp')
+        with self._flush_lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                temporary_path.write_text(json.dumps(self.get_snapshot()))
+                os.replace(temporary_path, self.path)
+            except OSError:
+                logger.exception('Metrics flush failed.')
+
+    def collect(self) -> list[dict]:
+        """
+        Returns the snapshots of all the processes, the own one is fresh.
+        """
+        snapshots = [self.get_snapshot()]
+        if self.directory is None:
+            return snapshots
+
+        for path in self.directory.glob('*.json'):
+            if path == self.path:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # the file of an exited process may be removed meanwhile
+                continue
+
+        return snapshots
+
+    def _observe(self, name: str, labels: tuple, value: float) -> None:
+        buckets = HTTP_METRICS[name][2]
+        values = self._histograms.get((name, labels))
+        if values is None:
+            values = self._histograms[(name, labels)] = [0] * (len(buckets) + 2)
+        for index, bucket in enumerate(buckets):
+            if value <= bucket:
+                values[index] += 1
+                break
+        else:
+            values[len(buckets)] += 1
+        values[-1] += value
+
+
+def _get_process_stats() -> Iterator[tuple[str, str, tuple, float]]:
+    # the type, the name, the labels and the value of every statistic
+    stats = [
+        ('db_pool_', (('database', connection.alias),), connection.pool.get_stats())
+        for connection in connections.all()
+        # the test_your_language.postgresql_pool engine
+        if hasattr(connection, 'pool')
+    ]
+    writer = get_test_result_writer()
+    if writer is not None:
+        stats.append(('test_results_writer_', (), writer.get_stats()))
+
+    for prefix, labels, values in stats:
+        for name, value in values.items():
+            if name in PROCESS_GAUGES or name.endswith('_max'):
+                yield 'gauge', f'{prefix}{name}', labels, value
+            elif name.endswith('_sum'):
+                yield 'counter', f'{prefix}{name[:-len("_sum")]}_total', labels, value
+            else:
+                yield 'counter', f'{prefix}{name}_total', labels, value
+
+
+def render_metrics(snapshots: list[dict]) -> str:
+    """
+    Merges the snapshots of the processes into the prometheus text format.
+    The counters and the histograms of the exited processes are kept, their
+    gauges are dropped.
+    """
+    counters = {}
+    histograms = {}
+    gauges = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, _to_labels(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, _to_labels(labels))
+            merged_values = histograms.get(key)
+            histograms[key] = (
+                [i + j for i, j in zip(merged_values, values)]
+                if merged_values else values
+            )
+        if not _is_alive(snapshot['pid']):
+            continue
+        for name, labels, value in snapshot['gauges']:
+            key = (name, _to_labels(labels))
+            if key not in gauges:
+                gauges[key] = value
+            elif name.endswith('_max'):
+                gauges[key] = max(gauges[key], value)
+            else:
+                gauges[key] += value
+
+    lines = []
+    for name, metric_type, samples in _group_by_name(
+            (counters, 'counter'),
+            (histograms, 'histogram'),
+            (gauges, 'gauge')
+    ):
+        if name in HTTP_METRICS:
+            lines.append(f'# HELP {name} {HTTP_METRICS[name][1]}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in samples:
+            if metric_type != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+
+            cumulative_count = 0
+            for bucket, count in zip((*HTTP_METRICS[name][2], '+Inf'), value):
+                cumulative_count += count
+                bucket_labels = (*labels, ('le', _format_value(bucket)))
+                lines.append(
+                    f'{name}_bucket{_format_labels(bucket_labels)} {cumulative_count}'
+                )
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative_count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _group_by_name(*metrics: tuple[dict, str]) -> Iterator[tuple[str, str, list]]:
+    for values, metric_type in metrics:
+        samples = {}
+        for (name, labels), value in sorted(values.items()):
+            samples.setdefault(name, []).append((labels, value))
+        for name, name_samples in samples.items():
+            yield name, metric_type, name_samples
+
+
+def _to_labels(labels: list) -> tuple:
+    # json turns the tuples into lists
+    return tuple((name, value) for name, value in labels)
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped_labels = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped_labels) + '}'
+
+
+def _format_value(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return f'{value:.1f}'
+    return repr(value)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # a process of another user
+        pass
+
+    return True
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    global _registry
+
+    registry = _registry
+    if registry is not None and registry.pid == os.getpid():
+        return registry
+
+    with _registry_lock:
+        if _registry is None or _registry.pid != os.getpid():
+            options = settings.METRICS
+            _registry = MetricsRegistry(
+                directory=options['DIRECTORY'],
+                flush_interval=options['FLUSH_INTERVAL']
+            )
+            if _registry.path is not None:
+                atexit.register(_registry.flush)
+
+    return _registry
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, the database queries and the response size of every
+    request by the name of its url, must be the first middleware.
+    """
+    # under ASGI a sync only middleware would run every request in the single
+    # thread of asgiref for the sync code, one request at a time
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # marks the instance as a coroutine function, as django does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        request_metrics = RequestMetrics()
+        token = _request_metrics.set(request_metrics)
+        start_time = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        duration = time.perf_counter() - start_time
+        self._observe(request, response, request_metrics, duration)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        request_metrics = RequestMetrics()
+        token = _request_metrics.set(request_metrics)
+        start_time = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        duration = time.perf_counter() - start_time
+        self._observe(request, response, request_metrics, duration)
+
+        return response
+
+    @staticmethod
+    def _observe(
+            request: HttpRequest,
+            response: HttpResponse,
+            request_metrics: RequestMetrics,
+            duration: float
+    ) -> None:
+        resolver_match = getattr(request, 'resolver_match', None)
+        get_metrics_registry().observe_request(
+            view=resolver_match.view_name if resolver_match else UNRESOLVED_VIEW,
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            queries=request_metrics.queries,
+            db_duration=request_metrics.db_duration,
+            size=None if response.streaming else len(response.content)
+        )
@@ -0,0 +1,79 @@
+# Generated by Django 3.2 on 2026-10-18 01:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import language_tests.validators
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Answer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer', models.CharField(max_length=64, unique=True, verbose_name='Ответ')),
+            ],
+            options={
+                'verbose_name': 'Ответ',
+                'verbose_name_plural': 'Ответы',
+                'ordering': ['answer'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LanguageTestType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, unique=True, verbose_name='Тип теста')),
+                ('is_published', models.BooleanField(default=True, verbose_name='Опубликован')),
+            ],
+            options={
+                'verbose_name': 'Тип теста',
+                'verbose_name_plural': 'Типы тестов',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.CharField(max_length=256, unique=True, validators=[language_tests.validators.validate_question], verbose_name='Вопрос')),
+                ('is_published', models.BooleanField(default=True, verbose_name='Опубликован')),
+            ],
+            options={
+                'verbose_name': 'Вопрос',
+                'verbose_name_plural': 'Вопросы',
+                'ordering': ['question'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_right_answer', models.BooleanField(default=False, verbose_name='Правильный ответ')),
+            ],
+            options={
+                'verbose_name': 'Ответ на вопрос',
+                'verbose_name_plural': 'Ответы на вопросы',
+                'ordering': ['question'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solution_date', models.DateTimeField(auto_now_add=True)),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='language_tests.answer')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='language_tests.question')),
+            ],
+            options={
+                'verbose_name': 'Результат теста',
+                'verbose_name_plural': 'Результаты тестов',
+            },
+        ),
+    ]
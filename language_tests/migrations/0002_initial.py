@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-18 01:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('language_tests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='questionanswer',
+            name='answer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='language_tests.answer', verbose_name='Ответ на вопрос'),
+        ),
+        migrations.AddField(
+            model_name='questionanswer',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='language_tests.question', verbose_name='Вопрос'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='answers',
+            field=models.ManyToManyField(through='language_tests.QuestionAnswer', to='language_tests.Answer'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='test_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='questions', to='language_tests.languagetesttype', verbose_name='Тип теста'),
+        ),
+        migrations.AddConstraint(
+            model_name='questionanswer',
+            constraint=models.UniqueConstraint(fields=('question', 'answer'), name='language_tests_questionanswer_question_answer_constraint'),
+        ),
+        migrations.AddConstraint(
+            model_name='questionanswer',
+            constraint=models.UniqueConstraint(condition=models.Q(is_right_answer=True), fields=('question',), name='language_tests_questionanswer_question_is_right_answer_constraint'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 01:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('language_tests', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSeenQuestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seen_questions', serialize=False, to='users.customuser')),
+                ('question_ids', models.BinaryField(default=bytes)),
+            ],
+            options={
+                'verbose_name': 'Пройденные вопросы',
+                'verbose_name_plural': 'Пройденные вопросы',
+            },
+        ),
+    ]
@@ -0,0 +1,144 @@
+from datetime import date, datetime, timezone
+
+from django.db import migrations
+
+
+PARTITION_COLUMN = 'solution_date'
+# months after the current one which get their partitions in advance
+MONTHS_AHEAD = 2
+
+
+def _add_months(month: date, number: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + number
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _get_month_bound(month: date) -> str:
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()
+
+
+def _rebuild_table(schema_editor, partitioned: bool) -> None:
+    connection = schema_editor.connection
+    quote_name = schema_editor.quote_name
+    table = 'language_tests_testresult'
+    old_table = f'{table}_old'
+
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, 'id'])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT min({PARTITION_COLUMN}), max({PARTITION_COLUMN}) '
+            f'FROM {quote_name(table)}'
+        )
+        min_date, max_date = cursor.fetchone()
+
+    schema_editor.execute(
+        f'ALTER TABLE {quote_name(table)} RENAME TO {quote_name(old_table)}'
+    )
+    schema_editor.execute(
+        f'CREATE TABLE {quote_name(table)} ('
+        f'LIKE {quote_name(old_table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS'
+        f')' + (
+            f' PARTITION BY RANGE ({quote_name(PARTITION_COLUMN)})'
+            if partitioned else ''
+        )
+    )
+    if partitioned:
+        current_month = datetime.now(tz=timezone.utc).date().replace(day=1)
+        first_month = min(
+            min_date.astimezone(timezone.utc).date().replace(day=1)
+            if min_date else current_month,
+            current_month
+        )
+        last_month = max(
+            max_date.astimezone(timezone.utc).date().replace(day=1)
+            if max_date else current_month,
+            _add_months(current_month, MONTHS_AHEAD)
+        )
+        month = first_month
+        while month <= last_month:
+            next_month = _add_months(month, 1)
+            schema_editor.execute(
+                f'CREATE TABLE {quote_name(f"{table}_p{month:%Y%m}")} '
+                f'PARTITION OF {quote_name(table)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [_get_month_bound(month), _get_month_bound(next_month)]
+            )
+            month = next_month
+        schema_editor.execute(
+            f'CREATE TABLE {quote_name(f"{table}_default")} '
+            f'PARTITION OF {quote_name(table)} DEFAULT'
+        )
+
+    schema_editor.execute(
+        f'INSERT INTO {quote_name(table)} SELECT * FROM {quote_name(old_table)}'
+    )
+    schema_editor.execute(
+        f'ALTER SEQUENCE {sequence} OWNED BY {quote_name(table)}.id'
+    )
+    schema_editor.execute(f'DROP TABLE {quote_name(old_table)}')
+
+    # the constraints and indexes get their names back, unique ones of a
+    # partitioned table have to include the partition column
+    for name, constraint in constraints.items():
+        columns = list(constraint['columns'])
+        if constraint['primary_key'] or constraint['unique']:
+            if partitioned and PARTITION_COLUMN not in columns:
+                columns.append(PARTITION_COLUMN)
+            elif not partitioned and columns[-1:] == [PARTITION_COLUMN]:
+                columns.pop()
+        quoted_columns = ', '.join(quote_name(column) for column in columns)
+
+        if constraint['primary_key']:
+            schema_editor.execute(
+                f'ALTER TABLE {quote_name(table)} ADD CONSTRAINT '
+                f'{quote_name(name)} PRIMARY KEY ({quoted_columns})'
+            )
+        elif constraint['foreign_key']:
+            to_table, to_column = constraint['foreign_key']
+            schema_editor.execute(
+                f'ALTER TABLE {quote_name(table)} ADD CONSTRAINT '
+                f'{quote_name(name)} FOREIGN KEY ({quoted_columns}) '
+                f'REFERENCES {quote_name(to_table)} ({quote_name(to_column)}) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+        elif constraint['unique']:
+            schema_editor.execute(
+                f'ALTER TABLE {quote_name(table)} ADD CONSTRAINT '
+                f'{quote_name(name)} UNIQUE ({quoted_columns})'
+            )
+        elif constraint['index']:
+            # django reports btree indexes as "idx"
+            method = 'btree' if constraint['type'] == 'idx' else constraint['type']
+            orders = constraint.get('orders') or ['ASC'] * len(columns)
+            schema_editor.execute(
+                f'CREATE INDEX {quote_name(name)} ON {quote_name(table)} '
+                f'USING {method} ('
+                + ', '.join(
+                    f'{quote_name(column)} {order}'
+                    for column, order in zip(columns, orders)
+                )
+                + ')'
+            )
+
+
+def partition_test_results(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild_table(schema_editor, partitioned=True)
+
+
+def unpartition_test_results(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('language_tests', '0003_userseenquestions'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_test_results, unpartition_test_results),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-18 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('language_tests', '0004_partition_testresult'),
+    ]
+
+    operations = [
+        # AlterField would also recreate the foreign key, which validates
+        # every row of the test results again
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "language_tests_testresult_user_id_aa643f0d"',
+                    'CREATE INDEX "language_tests_testresult_user_id_aa643f0d" '
+                    'ON "language_tests_testresult" ("user_id")'
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='testresult',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+            ]
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(condition=models.Q(is_published=True), fields=['test_type', 'id'], name='question_pool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['user', 'question'], name='testresult_user_question_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-18 01:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('language_tests', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTestTypeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempted', models.PositiveIntegerField(default=0, verbose_name='Ответов')),
+                ('correct', models.PositiveIntegerField(default=0, verbose_name='Правильных ответов')),
+                ('last_activity', models.DateTimeField(verbose_name='Последний ответ')),
+                ('test_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_stats', to='language_tests.languagetesttype', verbose_name='Тип теста')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='test_type_stats', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usertesttypestats',
+            constraint=models.UniqueConstraint(fields=('user', 'test_type'), name='user_test_type_stats_unique'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 02:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('language_tests', '0006_user_test_type_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='language_tests.question', verbose_name='Вопрос')),
+                ('attempted', models.PositiveIntegerField(default=0, verbose_name='Ответов')),
+                ('correct', models.PositiveIntegerField(default=0, verbose_name='Правильных ответов')),
+            ],
+            options={
+                'verbose_name': 'Статистика вопроса',
+                'verbose_name_plural': 'Статистика вопросов',
+            },
+        ),
+    ]
@@ -64,6 +64,14 @@ class Question(models.Model):
     objects = models.Manager()
 
     class Meta:
+        indexes = (
+            # the question pools of the test types
+            models.Index(
+                fields=('test_type', 'id',),
+                condition=models.Q(is_published=True),
+                name='question_pool_idx'
+            ),
+        )
         verbose_name = 'Вопрос'
         verbose_name_plural = 'Вопросы'
         ordering = ['question', ]
@@ -114,7 +122,8 @@ class QuestionAnswer(models.Model):
 
 
 class TestResult(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # the user lookups use the index of the questions seen by the users
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
     solution_date = models.DateTimeField(auto_now_add=True)
@@ -122,6 +131,12 @@ class TestResult(models.Model):
     objects = models.Manager()
 
     class Meta:
+        indexes = (
+            models.Index(
+                fields=('user', 'question',),
+                name='testresult_user_question_idx'
+            ),
+        )
         verbose_name = 'Результат теста'
         verbose_name_plural = 'Результаты тестов'
 
@@ -130,3 +145,85 @@ class TestResult(models.Model):
             f'Пользователь - "{self.user}"; Вопрос - "{self.question}"; '
             f'Ответ - "{self.answer}"'
         )
+
+
+class UserSeenQuestions(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='seen_questions'
+    )
+    # sorted ids of the answered questions packed as array('q')
+    question_ids = models.BinaryField(default=bytes)
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Пройденные вопросы'
+        verbose_name_plural = 'Пройденные вопросы'
+
+    def __str__(self):
+        return f'Пользователь - "{self.user}"'
+
+
+class UserTestTypeStats(models.Model):
+    # the user lookups use the index of the unique constraint
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        verbose_name='Пользователь',
+        related_name='test_type_stats'
+    )
+    test_type = models.ForeignKey(
+        LanguageTestType,
+        on_delete=models.CASCADE,
+        verbose_name='Тип теста',
+        related_name='user_stats'
+    )
+    attempted = models.PositiveIntegerField(default=0, verbose_name='Ответов')
+    correct = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Правильных ответов'
+    )
+    last_activity = models.DateTimeField(verbose_name='Последний ответ')
+
+    objects = models.Manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'test_type',),
+                name='user_test_type_stats_unique'
+            ),
+        )
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'Пользователь - "{self.user}"; Тип теста - "{self.test_type}"'
+
+
+class QuestionStats(models.Model):
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Вопрос',
+        related_name='stats'
+    )
+    attempted = models.PositiveIntegerField(default=0, verbose_name='Ответов')
+    correct = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Правильных ответов'
+    )
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Статистика вопроса'
+        verbose_name_plural = 'Статистика вопросов'
+
+    def __str__(self):
+        return f'Вопрос - "{self.question}"'
@@ -0,0 +1,198 @@
+import gzip
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import TestResult
+
+
+PARTITION_COLUMN = 'solution_date'
+# months after the current one which get their partitions in advance
+MONTHS_AHEAD = 2
+
+_partition_name_pattern = re.compile(r'_p(\d{4})(\d{2})$')
+_ensured_months: set[tuple[str, date]] = set()
+
+
+def is_partitioned(using: str = DEFAULT_DB_ALIAS) -> bool:
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table '
+            'WHERE partrelid = to_regclass(%s)',
+            [_get_table()]
+        )
+        return cursor.fetchone() is not None
+
+
+def get_partitions(using: str = DEFAULT_DB_ALIAS) -> dict[date, str]:
+    """
+    Returns the monthly partitions attached to the test results table, the
+    default partition is not included.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)',
+            [_get_table()]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = _partition_name_pattern.search(name)
+        if match is not None:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+
+    return dict(sorted(partitions.items()))
+
+
+def create_partitions(
+        months_ahead: int = MONTHS_AHEAD,
+        now: Optional[datetime] = None,
+        using: str = DEFAULT_DB_ALIAS
+) -> list[str]:
+    current_month = get_month(now or datetime.now(tz=timezone.utc))
+    existing_partitions = get_partitions(using)
+
+    created_partitions = []
+    for number in range(months_ahead + 1):
+        month = add_months(current_month, number)
+        if month not in existing_partitions:
+            created_partitions.append(create_partition(month, using))
+
+    return created_partitions
+
+
+def create_partition(month: date, using: str = DEFAULT_DB_ALIAS) -> str:
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    table = quote_name(_get_table())
+    default_partition = quote_name(_get_default_partition_name())
+    partition = _get_partition_name(month)
+    bounds = [_get_month_bound(month), _get_month_bound(add_months(month, 1))]
+    partition_bounds = 'FOR VALUES FROM (%s) TO (%s)'
+    column = quote_name(PARTITION_COLUMN)
+    in_bounds = f'{column} >= %s AND {column} < %s'
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {default_partition} WHERE {in_bounds})',
+            bounds
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f'CREATE TABLE {quote_name(partition)} PARTITION OF {table} '
+                f'{partition_bounds}',
+                bounds
+            )
+            return partition
+
+        # rows of the month which were saved before its partition existed
+        # are moved out of the default partition
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default_partition}')
+        cursor.execute(
+            f'CREATE TABLE {quote_name(partition)} PARTITION OF {table} '
+            f'{partition_bounds}',
+            bounds
+        )
+        cursor.execute(
+            f'WITH moved AS ('
+            f'DELETE FROM {default_partition} WHERE {in_bounds} RETURNING *'
+            f') INSERT INTO {quote_name(partition)} SELECT * FROM moved',
+            bounds
+        )
+        cursor.execute(
+            f'ALTER TABLE {table} ATTACH PARTITION {default_partition} DEFAULT'
+        )
+
+    return partition
+
+
+def ensure_partition(value: datetime, using: str = DEFAULT_DB_ALIAS) -> None:
+    # for offline loads only, the requests rely on the partitions created in
+    # advance by the create_test_result_partitions command
+    month = get_month(value)
+    if (using, month) in _ensured_months:
+        return
+
+    if is_partitioned(using) and month not in get_partitions(using):
+        create_partition(month, using)
+    _ensured_months.add((using, month))
+
+
+def archive_partitions(
+        before: date,
+        output_dir: Optional[Path] = None,
+        using: str = DEFAULT_DB_ALIAS
+) -> list[tuple[str, int]]:
+    """
+    Detaches the partitions of the months before ``before``. With
+    ``output_dir`` every partition is saved there as a gzipped CSV file and
+    dropped, otherwise it is kept as a standalone table.
+
+    Returns the names of the archived partitions with their numbers of rows.
+    """
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    table = quote_name(_get_table())
+
+    archived_partitions = []
+    for month, partition in get_partitions(using).items():
+        if month >= get_month(before):
+            break
+
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            # a table with pending deferred foreign key checks can't be dropped
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(
+                f'ALTER TABLE {table} DETACH PARTITION {quote_name(partition)}'
+            )
+            cursor.execute(f'SELECT count(*) FROM {quote_name(partition)}')
+            number_rows = cursor.fetchone()[0]
+            if output_dir is not None:
+                path = Path(output_dir) / f'{partition}.csv.gz'
+                with gzip.open(path, 'wt', encoding='utf-8') as file:
+                    cursor.copy_expert(
+                        f'COPY {quote_name(partition)} TO STDOUT '
+                        f'WITH (FORMAT csv, HEADER)',
+                        file
+                    )
+                cursor.execute(f'DROP TABLE {quote_name(partition)}')
+        archived_partitions.append((partition, number_rows))
+
+    return archived_partitions
+
+
+def get_month(value) -> date:
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, number: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + number
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _get_table() -> str:
+    return TestResult._meta.db_table
+
+
+def _get_partition_name(month: date) -> str:
+    return f'{_get_table()}_p{month:%Y%m}'
+
+
+def _get_default_partition_name() -> str:
+    return f'{_get_table()}_default'
+
+
+def _get_month_bound(month: date) -> str:
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()
@@ -0,0 +1,104 @@
+from array import array
+from bisect import bisect_left
+from threading import Lock
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from .models import Question
+from .versions import bump_version, get_version
+
+
+class QuestionPool:
+    """
+    Sorted ids of the published questions of one test type.
+
+    Pools bigger than ``settings.QUESTION_POOL_MAX_SIZE`` keep only their
+    size, the questions of such test types are sampled by the database.
+    """
+    __slots__ = ('test_type_id', 'version', 'ids', 'size',)
+
+    def __init__(
+            self,
+            test_type_id: int,
+            version: int,
+            ids: Optional[array],
+            size: Optional[int] = None
+    ):
+        self.test_type_id = test_type_id
+        self.version = version
+        self.ids = ids
+        self.size = len(ids) if size is None else size
+
+    @classmethod
+    def from_ids(
+            cls,
+            test_type_id: int,
+            version: int,
+            ids: Iterable[int]
+    ) -> 'QuestionPool':
+        return cls(test_type_id, version, array('q', sorted(ids)))
+
+    @property
+    def is_materialized(self) -> bool:
+        return self.ids is not None
+
+    def __contains__(self, question_id: int) -> bool:
+        if not self.is_materialized:
+            return _get_pool_queryset(self.test_type_id).filter(
+                id=question_id
+            ).exists()
+        index = bisect_left(self.ids, question_id)
+        return index < len(self.ids) and self.ids[index] == question_id
+
+    def __len__(self) -> int:
+        return self.size
+
+
+_pools: dict[int, QuestionPool] = {}
+_pools_lock = Lock()
+
+
+def get_question_pool(test_type_id: int) -> QuestionPool:
+    version = get_version(_get_pool_version_name(test_type_id))
+    pool = _pools.get(test_type_id)
+    if pool is not None and pool.version == version:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(test_type_id)
+        if pool is None or pool.version != version:
+            pool = _load_question_pool(test_type_id, version)
+            _pools[test_type_id] = pool
+
+    return pool
+
+
+def invalidate_question_pools(*test_type_ids: int) -> None:
+    for test_type_id in set(test_type_ids):
+        if test_type_id is not None:
+            bump_version(_get_pool_version_name(test_type_id))
+
+
+def _load_question_pool(test_type_id: int, version: int) -> QuestionPool:
+    max_size = settings.QUESTION_POOL_MAX_SIZE
+    queryset = _get_pool_queryset(test_type_id)
+    ids = array('q', queryset.values_list('id', flat=True)[:max_size + 1])
+    if len(ids) > max_size:
+        return QuestionPool(test_type_id, version, None, queryset.count())
+
+    return QuestionPool(test_type_id, version, ids)
+
+
+def _get_pool_queryset(test_type_id: int) -> QuerySet:
+    return Question.objects.filter(
+        test_type_id=test_type_id,
+        is_published=True
+    ).order_by(
+        'id'
+    )
+
+
+def _get_pool_version_name(test_type_id: int) -> str:
+    return f'question_pool:{test_type_id}'
@@ -0,0 +1,56 @@
+import orjson
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer which renders with orjson the compact utf-8 JSON of the
+    default settings of DRF, byte for byte the same for everything but
+    floats: orjson gives "1e16" for json's "1e+16" and null for NaN and
+    infinity.
+
+    Datetimes and the types unknown to orjson go through the encoder of
+    DRF, data orjson can not render (not str keys, too big integers, etc.)
+    is rendered by JSONRenderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+                data is None
+                or not api_settings.COMPACT_JSON
+                or not api_settings.UNICODE_JSON
+                or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # the same escaping as in JSONRenderer, for javascript
+        return ret.replace(
+            '\u2028'.encode(),
+            b'\\u2028'
+        ).replace(
+            '\u2029'.encode(),
+            b'\\u2029'
+        )
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode(self.charset) if isinstance(data, str) else data
+
+
+JSON_RENDERER_CLASSES = (FastJSONRenderer, BrowsableAPIRenderer)
@@ -0,0 +1,25 @@
+from itertools import groupby
+from operator import attrgetter
+from typing import Sequence
+
+from django.db import transaction
+
+from .models import TestResult
+from .seen_questions import add_seen_questions
+from .stats import update_question_stats, update_user_stats
+
+
+def save_test_results(test_results: Sequence[TestResult]) -> None:
+    if not test_results:
+        return
+
+    test_results = sorted(test_results, key=attrgetter('user_id'))
+    with transaction.atomic():
+        TestResult.objects.bulk_create(test_results)
+        update_user_stats(test_results)
+        update_question_stats(test_results)
+        for user_id, user_results in groupby(test_results, attrgetter('user_id')):
+            add_seen_questions(
+                user_id,
+                [test_result.question_id for test_result in user_results]
+            )
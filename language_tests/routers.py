@@ -0,0 +1,86 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+PRIMARY_DATABASE = 'default'
+PRIMARY_READS_KEY_PREFIX = 'language_tests:primary_reads'
+
+_read_database: ContextVar[Optional[str]] = ContextVar(
+    'read_database',
+    default=None
+)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads made inside ``replica_reads`` to one of
+    ``settings.DATABASE_REPLICAS``, everything else uses the primary.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints) -> str:
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        databases = {PRIMARY_DATABASE, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+@contextmanager
+def replica_reads(user_id: Optional[int] = None) -> Iterator[None]:
+    token = _read_database.set(_choose_read_database(user_id))
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+def pin_reads_to_primary(user_id: Optional[int] = None) -> None:
+    """
+    Keeps the reads of the user, or of everybody without ``user_id``, on the
+    primary for ``settings.REPLICA_STICKINESS`` seconds, so the replicas can
+    catch up with the write.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return
+
+    key = _get_primary_reads_key(user_id)
+    cache.set(key, True, timeout=settings.REPLICA_STICKINESS)
+    # the window has to start after the commit, not at the write
+    transaction.on_commit(
+        lambda: cache.set(key, True, timeout=settings.REPLICA_STICKINESS)
+    )
+
+
+def _choose_read_database(user_id: Optional[int]) -> Optional[str]:
+    if not settings.DATABASE_REPLICAS:
+        return None
+
+    keys = [_get_primary_reads_key(None)]
+    if user_id is not None:
+        keys.append(_get_primary_reads_key(user_id))
+    if cache.get_many(keys):
+        return None
+
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def _get_primary_reads_key(user_id: Optional[int]) -> str:
+    if user_id is None:
+        return PRIMARY_READS_KEY_PREFIX
+    return f'{PRIMARY_READS_KEY_PREFIX}:{user_id}'
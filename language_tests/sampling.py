@@ -0,0 +1,183 @@
+import math
+from array import array
+from random import Random
+from typing import Container, Optional, Sequence
+
+from django.db import connections, router
+
+from .models import Question
+
+
+# how many more rows than needed are requested from the database
+SAMPLE_OVERSAMPLING = 4
+
+_random = Random()
+
+
+def seed(value: Optional[int] = None) -> None:
+    _random.seed(value)
+
+
+def sample_ids(
+        ids: Sequence[int],
+        limit: int,
+        exclude: Container[int] = frozenset(),
+        rng: Optional[Random] = None
+) -> list[int]:
+    rng = rng or _random
+    size = len(ids)
+    if limit <= 0:
+        return []
+    if not exclude:
+        # random.sample picks positions from a range without copying it
+        return [ids[i] for i in rng.sample(range(size), min(limit, size))]
+
+    # partial Fisher-Yates shuffle over the positions of ``ids``: only the
+    # swapped positions are stored, so the sequence itself is never copied
+    # and the cost is O(limit) plus one step per excluded id that was hit
+    randrange = rng.randrange
+    swaps = {}
+    result = []
+    for position in range(size):
+        random_position = randrange(position, size)
+        index = swaps.get(random_position, random_position)
+        swaps[random_position] = swaps.get(position, position)
+        question_id = ids[index]
+        if question_id not in exclude:
+            result.append(question_id)
+            if len(result) >= limit:
+                break
+
+    return result
+
+
+class AliasTable:
+    """
+    Alias table of Walker of the weights of positions: a position is
+    sampled with the probability of its weight with one random number, the
+    table is built in O(n).
+    """
+    __slots__ = ('probabilities', 'aliases')
+
+    def __init__(self, weights: Sequence[float]):
+        size = len(weights)
+        total = sum(weights)
+        if size and total <= 0:
+            raise ValueError('The sum of the weights must be positive.')
+
+        # the weights scaled so that their mean is 1
+        scaled = [weight * size / total for weight in weights]
+        self.probabilities = array('d', [1.0]) * size
+        self.aliases = array('q', range(size))
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            position = small.pop()
+            alias = large[-1]
+            self.probabilities[position] = scaled[position]
+            self.aliases[position] = alias
+            scaled[alias] -= 1 - scaled[position]
+            if scaled[alias] < 1:
+                small.append(large.pop())
+        # the positions left are 1 up to the rounding errors
+
+    def sample(self, rng: Random) -> int:
+        value = rng.random() * len(self.probabilities)
+        position = int(value)
+        if value - position < self.probabilities[position]:
+            return position
+        return self.aliases[position]
+
+    def __len__(self) -> int:
+        return len(self.probabilities)
+
+
+def sample_weighted_ids(
+        ids: Sequence[int],
+        table: AliasTable,
+        limit: int,
+        exclude: Container[int] = frozenset(),
+        rng: Optional[Random] = None
+) -> list[int]:
+    """
+    Samples ids without repetitions by the weights of their positions in the
+    table. The ids are drawn at most ``SAMPLE_OVERSAMPLING`` times per id,
+    when the weights are concentrated on the repeated and the excluded ids
+    the rest is sampled uniformly.
+    """
+    rng = rng or _random
+    if limit <= 0 or not ids:
+        return []
+
+    result = []
+    seen = set()
+    for _ in range(limit * SAMPLE_OVERSAMPLING):
+        question_id = ids[table.sample(rng)]
+        if question_id in seen:
+            continue
+        seen.add(question_id)
+        if question_id not in exclude:
+            result.append(question_id)
+            if len(result) >= limit:
+                return result
+
+    for question_id in sample_ids(ids, limit, exclude, rng):
+        if question_id not in seen:
+            result.append(question_id)
+            if len(result) >= limit:
+                break
+
+    return result
+
+
+def sample_ids_from_database(
+        test_type_id: int,
+        pool_size: int,
+        limit: int,
+        exclude: Container[int] = frozenset(),
+        rng: Optional[Random] = None
+) -> list[int]:
+    # used for the pools that are too big to be kept in memory
+    if pool_size == 0:
+        return []
+
+    database = router.db_for_read(Question)
+    if connections[database].vendor != 'postgresql':
+        ids = Question.objects.using(
+            database
+        ).filter(
+            test_type_id=test_type_id,
+            is_published=True
+        ).order_by(
+            '?'
+        ).values_list(
+            'id',
+            flat=True
+        )[:limit * SAMPLE_OVERSAMPLING]
+        return sample_ids(list(ids), limit, exclude, rng)
+
+    percent = 100 * SAMPLE_OVERSAMPLING * limit / pool_size
+    while True:
+        percent = min(percent, 100)
+        ids = _get_table_sample(database, test_type_id, percent)
+        result = sample_ids(ids, limit, exclude, rng)
+        if len(result) >= limit or percent == 100:
+            return result
+        percent *= SAMPLE_OVERSAMPLING
+
+
+def _get_table_sample(
+        database: str,
+        test_type_id: int,
+        percent: float
+) -> list[int]:
+    opts = Question._meta
+    sql = (
+        f'SELECT "{opts.pk.column}" FROM "{opts.db_table}" '
+        f'TABLESAMPLE SYSTEM (%s) '
+        f'WHERE "{opts.get_field("test_type").column}" = %s '
+        f'AND "{opts.get_field("is_published").column}"'
+    )
+    with connections[database].cursor() as cursor:
+        cursor.execute(sql, [math.ceil(percent * 1000) / 1000, test_type_id])
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,103 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+from django.db import transaction
+
+from .models import TestResult, UserSeenQuestions
+
+
+class SeenQuestionSet:
+    """
+    Sorted ids of the questions a user has already answered.
+    """
+    __slots__ = ('ids',)
+
+    def __init__(self, ids: array):
+        self.ids = ids
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> 'SeenQuestionSet':
+        return cls(array('q', sorted(set(ids))))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SeenQuestionSet':
+        ids = array('q')
+        ids.frombytes(data)
+        return cls(ids)
+
+    def to_bytes(self) -> bytes:
+        return self.ids.tobytes()
+
+    def add(self, question_ids: Iterable[int]) -> bool:
+        added = False
+        for question_id in question_ids:
+            index = bisect_left(self.ids, question_id)
+            if index == len(self.ids) or self.ids[index] != question_id:
+                self.ids.insert(index, question_id)
+                added = True
+
+        return added
+
+    def __contains__(self, question_id: int) -> bool:
+        index = bisect_left(self.ids, question_id)
+        return index < len(self.ids) and self.ids[index] == question_id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def get_seen_questions(user_id: int) -> SeenQuestionSet:
+    question_ids = UserSeenQuestions.objects.filter(
+        user_id=user_id
+    ).values_list(
+        'question_ids',
+        flat=True
+    ).first()
+    if question_ids is not None:
+        return SeenQuestionSet.from_bytes(question_ids)
+
+    # the set of a user who answered before the sets were introduced is
+    # built from the test results once
+    seen_questions = _get_seen_questions_from_results(user_id)
+    UserSeenQuestions.objects.get_or_create(
+        user_id=user_id,
+        defaults={'question_ids': seen_questions.to_bytes()}
+    )
+
+    return seen_questions
+
+
+def add_seen_questions(user_id: int, question_ids: Iterable[int]) -> None:
+    # must run after the test results of ``question_ids`` are saved, a
+    # missing set is then built from the results including the new ones
+    with transaction.atomic():
+        queryset = UserSeenQuestions.objects.select_for_update()
+        user_seen_questions, created = queryset.get_or_create(
+            user_id=user_id,
+            defaults={
+                'question_ids': lambda: _get_seen_questions_from_results(
+                    user_id
+                ).to_bytes()
+            }
+        )
+        if created:
+            return
+
+        seen_questions = SeenQuestionSet.from_bytes(
+            user_seen_questions.question_ids
+        )
+        if seen_questions.add(question_ids):
+            user_seen_questions.question_ids = seen_questions.to_bytes()
+            user_seen_questions.save(update_fields=('question_ids',))
+
+
+def _get_seen_questions_from_results(user_id: int) -> SeenQuestionSet:
+    question_ids = TestResult.objects.filter(
+        user_id=user_id
+    ).values_list(
+        'question_id',
+        flat=True
+    ).distinct()
+
+    return SeenQuestionSet.from_ids(question_ids.iterator())
@@ -1,14 +1,56 @@
-from typing import OrderedDict
+from functools import partial
+from typing import Any, Callable, Mapping, Optional, OrderedDict
 
+from django.conf import settings
+from django.db import IntegrityError
 from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
 
+from .answer_index import get_question_answers
+from .loaders import save_questions
 from .models import (
     Answer,
     LanguageTestType,
     Question,
-    QuestionAnswer,
-    TestResult
+    TestResult,
+    UserTestTypeStats
 )
+from .results import save_test_results
+from .routers import pin_reads_to_primary
+from .validators import validate_question_answers
+from .write_behind import get_test_result_writer
+
+
+# representations of the values of the simple fields
+FAST_FIELD_REPRESENTATIONS = {
+    serializers.BooleanField: bool,
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+}
+
+
+class FastRepresentationMixin:
+    """
+    Read-only serializers which represent dicts of the values of their
+    fields, as given by ``.values()`` (``test_type__name`` for the source
+    ``test_type.name``, the pk for a related field), without model
+    instances and the field objects of DRF. The representation is the same
+    as the one of ``to_representation()``.
+    """
+
+    @classmethod
+    def to_fast_representation(cls, values: Mapping[str, Any]) -> dict:
+        fields = cls.__dict__.get('_fast_fields')
+        if fields is None:
+            fields = cls._fast_fields = _get_fast_fields(cls())
+
+        return {
+            field_name: (
+                None if (value := values[key]) is None
+                else to_representation(value)
+            )
+            for field_name, key, to_representation in fields
+        }
 
 
 class LanguageTestTypeSerializer(serializers.ModelSerializer):
@@ -18,7 +60,10 @@ class LanguageTestTypeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class LanguageTestTypeReadOnlySerializer(serializers.ModelSerializer):
+class LanguageTestTypeReadOnlySerializer(
+        FastRepresentationMixin,
+        serializers.ModelSerializer
+):
 
     class Meta:
         model = LanguageTestType
@@ -33,7 +78,7 @@ class AnswerSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AnswerReadOnlySerializer(serializers.ModelSerializer):
+class AnswerReadOnlySerializer(FastRepresentationMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Answer
@@ -51,7 +96,7 @@ class QuestionAnswerReadOnlySerializer(serializers.Serializer):
     answer_id = serializers.IntegerField(min_value=1, required=False)
 
 
-class QuestionReadOnlySerializer(serializers.ModelSerializer):
+class QuestionReadOnlySerializer(FastRepresentationMixin, serializers.ModelSerializer):
     answers = AnswerReadOnlySerializer(read_only=True, many=True)
 
     class Meta:
@@ -60,85 +105,150 @@ class QuestionReadOnlySerializer(serializers.ModelSerializer):
         read_only_fields = ('question',)
 
 
+class QuestionListSerializer(serializers.ListSerializer):
+
+    def validate(self, attrs: list[OrderedDict]) -> list[OrderedDict]:
+        questions = [question.get('question') for question in attrs]
+        if len(questions) != len(set(questions)):
+            raise serializers.ValidationError(
+                'Invalid data. Got duplicate questions.'
+            )
+        return attrs
+
+    def save(self, **kwargs) -> None:
+        _save_questions(self.validated_data)
+
+
 class QuestionSerializer(serializers.ModelSerializer):
     answers = QuestionAnswerSerializer(many=True)
 
     class Meta:
         model = Question
         fields = '__all__'
+        list_serializer_class = QuestionListSerializer
 
     @staticmethod
     def validate_answers(answers: list[OrderedDict]) -> list[OrderedDict]:
-        _answers = {
-            answer.get('answer'): answer.get('is_right_answer')
-            for answer in answers
-        }
-        if len(_answers) != 4:
-            raise serializers.ValidationError(
-                'Invalid data. The question must have 4 answers.'
-            )
-        if sum(is_right_answer for is_right_answer in _answers.values()) != 1:
-            raise serializers.ValidationError(
-                'Invalid data. The question must have 1 correct answer. '
-            )
+        validate_question_answers(
+            {
+                answer.get('answer'): answer.get('is_right_answer')
+                for answer in answers
+            }
+        )
         return answers
 
     def save(self, **kwargs) -> None:
-        self._save_question()
-        self._save_answers()
-        self._save_question_answers()
-
-    def _save_question(self) -> None:
-        question = self.validated_data.get('question')
-        is_published = self.validated_data.get('is_published')
-        test_type = self.validated_data.get('test_type')
-        Question.objects.create(
-            question=question,
-            is_published=is_published,
-            test_type=test_type
-        )
-
-    def _save_answers(self) -> None:
-        answers = {
-            answer.get('answer'): answer.get('is_right_answer')
-            for answer in self.validated_data.get('answers')
-        }
-        db_answers = Answer.objects.values('answer').filter(
-            answer__in=answers.keys()
-        )
-        for answer in db_answers:
-            answers.pop(answer['answer'])
-        if answers:
-            new_answers = [Answer(answer=answer) for answer in answers.keys()]
-            Answer.objects.bulk_create(new_answers)
-
-    def _save_question_answers(self) -> None:
-        question = self.validated_data.get('question')
-        answers = {
-            answer.get('answer'): answer.get('is_right_answer')
-            for answer in self.validated_data.get('answers')
-        }
-        db_question = Question.objects.get(question=question)
-        db_answers = Answer.objects.filter(answer__in=answers.keys())
-        question_answers = []
-        for answer, is_right_answer in answers.items():
-            for db_answer in db_answers:
-                if db_answer.answer == answer:
-                    question_answers.append(
-                        QuestionAnswer(
-                            question=db_question,
-                            answer=db_answer,
-                            is_right_answer=is_right_answer
-                        )
-                    )
-                    break
-        QuestionAnswer.objects.bulk_create(question_answers)
+        _save_questions([self.validated_data])
 
 
 class LanguageTestSerializer(LanguageTestTypeReadOnlySerializer):
     questions = QuestionReadOnlySerializer(read_only=True, many=True)
 
 
+class UserTestTypeStatsSerializer(
+        FastRepresentationMixin,
+        serializers.ModelSerializer
+):
+    test_type_name = serializers.CharField(source='test_type.name', read_only=True)
+
+    class Meta:
+        model = UserTestTypeStats
+        fields = (
+            'test_type',
+            'test_type_name',
+            'attempted',
+            'correct',
+            'last_activity',
+        )
+
+
+class LanguageTestQuerySerializer(serializers.Serializer):
+    difficulty = serializers.ChoiceField(
+        choices=tuple(settings.QUESTION_DIFFICULTY['BANDS']),
+        required=False
+    )
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.LEADERBOARD['MAX_LIMIT'],
+        default=10
+    )
+
+
+def _get_fast_fields(
+        serializer: serializers.Serializer
+) -> list[tuple[str, str, Callable[[Any], Any]]]:
+    fields = []
+    for field in serializer._readable_fields:
+        if field.source == '*':
+            raise TypeError(
+                f'{type(serializer).__name__}.{field.field_name} has no '
+                f'value of its own.'
+            )
+
+        if (
+                isinstance(field, serializers.ListSerializer)
+                and isinstance(field.child, FastRepresentationMixin)
+        ):
+            to_representation = partial(
+                _to_fast_representations,
+                type(field.child).to_fast_representation
+            )
+        elif isinstance(field, FastRepresentationMixin):
+            to_representation = type(field).to_fast_representation
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            to_representation = partial(_to_related_representation, field)
+        else:
+            to_representation = FAST_FIELD_REPRESENTATIONS.get(
+                type(field),
+                field.to_representation
+            )
+        fields.append(
+            (field.field_name, '__'.join(field.source_attrs), to_representation)
+        )
+
+    return fields
+
+
+def _to_fast_representations(
+        to_fast_representation: Callable[[Mapping], dict],
+        values: list[Mapping]
+) -> list[dict]:
+    return [to_fast_representation(i) for i in values]
+
+
+def _to_related_representation(
+        field: serializers.PrimaryKeyRelatedField,
+        pk: Any
+) -> Any:
+    return field.to_representation(PKOnlyObject(pk=pk))
+
+
+def _save_questions(questions: list[OrderedDict]) -> None:
+    try:
+        save_questions(
+            [
+                {
+                    'question': question.get('question'),
+                    'is_published': question.get('is_published', True),
+                    'test_type_id': getattr(question.get('test_type'), 'pk', None),
+                    'answers': {
+                        answer.get('answer'): answer.get('is_right_answer')
+                        for answer in question.get('answers')
+                    },
+                }
+                for question in questions
+            ]
+        )
+    except IntegrityError:
+        # a concurrent request has saved the same question after validation
+        raise serializers.ValidationError(
+            {'question': ['Question with this question already exists.']}
+        ) from None
+
+
 class TestResultSerializer(serializers.Serializer):
     user_id = serializers.IntegerField(min_value=1, required=False)
     user_answers = QuestionAnswerReadOnlySerializer(many=True)
@@ -159,17 +269,11 @@ class TestResultSerializer(serializers.Serializer):
             for key, value in all_questions.items()
             if value is not None
         }
-        question_answers = Question.objects.select_related(
-            'answers'
-        ).filter(
-            id__in=filled_questions.keys()
-        ).values(
-            'id',
-            'answers__id'
-        )
+        question_answers = get_question_answers(filled_questions.keys())
         valid_answers_count = sum(
-            question_answer['answers__id'] == filled_questions[question_answer['id']]
-            for question_answer in question_answers
+            question_id in question_answers
+            and answer_id in question_answers[question_id].answer_ids
+            for question_id, answer_id in filled_questions.items()
         )
         if len(filled_questions) != valid_answers_count:
             raise serializers.ValidationError(
@@ -178,9 +282,11 @@ class TestResultSerializer(serializers.Serializer):
 
         return user_answers
 
-    def save(self) -> None:
+    def save(self, request_user_id: Optional[int] = None) -> None:
         user_id = self.validated_data.get('user_id', None)
-        if user_id is not None:
+        # only the authenticated user saves their results, the statistics
+        # and the leaderboards can not be filled in the name of another user
+        if user_id is not None and user_id == request_user_id:
             user_answers = self.validated_data.get('user_answers')
             self._save_user_answers(user_id, user_answers)
 
@@ -197,4 +303,11 @@ class TestResultSerializer(serializers.Serializer):
                         answer_id=answer_id
                     )
                 )
-        TestResult.objects.bulk_create(valid_answers)
+
+        # the next test of the user excludes the questions seen just now
+        pin_reads_to_primary(user_id)
+        writer = get_test_result_writer()
+        if writer is not None:
+            writer.submit(valid_answers)
+        else:
+            save_test_results(valid_answers)
@@ -1,67 +1,80 @@
-from random import randint
-from typing import Union
+from random import Random
+from typing import Container, Optional, Union
 
 from django.contrib.auth.models import AnonymousUser, User
-from django.db.models import QuerySet
 
-from .models import Question, TestResult
+from .difficulty import get_question_difficulty
+from .fragments import get_question_fragments
+from .pools import get_question_pool
+from .sampling import sample_ids, sample_ids_from_database, sample_weighted_ids
+from .seen_questions import get_seen_questions
 
 
 def generate_questions_list(
         test_type_id: int,
         user: Union[AnonymousUser, User],
-        questions_limit: int = 10
-) -> QuerySet:
-    if not user.is_anonymous:
-        prev_used_questions = TestResult.objects.values(
-            'question__id'
-        ).filter(
-            user_id=user.pk
-        ).distinct()
-    else:
-        prev_used_questions = []
-
-    ids = _get_ids_list(test_type_id, prev_used_questions)
-    if len(ids) < questions_limit:
-        ids = _get_ids_list(test_type_id, [])
-
-    random_ids = _get_random_ids(ids, questions_limit)
-
-    unused_questions = Question.objects.prefetch_related(
-        'answers'
-    ).filter(
-        id__in=random_ids
-    ).only(
-        'id',
-        'question'
+        questions_limit: int = 10,
+        rng: Optional[Random] = None,
+        difficulty: Optional[str] = None
+) -> list[dict]:
+    question_ids = generate_question_ids(
+        test_type_id,
+        user,
+        questions_limit,
+        rng,
+        difficulty
     )
 
-    return unused_questions
+    return get_question_fragments(question_ids)
 
 
-def _get_ids_list(
+def generate_question_ids(
         test_type_id: int,
-        questions: Union[list, QuerySet]
-) -> QuerySet:
-    ids = Question.objects.values(
-        'id'
-    ).filter(
-        test_type_id=test_type_id,
-        is_published=True
-    ).exclude(
-        id__in=questions
+        user: Union[AnonymousUser, User],
+        questions_limit: int = 10,
+        rng: Optional[Random] = None,
+        difficulty: Optional[str] = None
+) -> list[int]:
+    if not user.is_anonymous:
+        prev_used_questions = get_seen_questions(user.pk)
+    else:
+        prev_used_questions = frozenset()
+
+    random_ids = _get_random_ids(
+        test_type_id,
+        questions_limit,
+        prev_used_questions,
+        rng,
+        difficulty
     )
+    if len(random_ids) < questions_limit and prev_used_questions:
+        random_ids = _get_random_ids(
+            test_type_id,
+            questions_limit,
+            rng=rng,
+            difficulty=difficulty
+        )
 
-    return ids
+    return random_ids
 
 
-def _get_random_ids(ids: QuerySet, limit: int) -> list[int]:
-    values = [i['id'] for i in ids]
-    result = []
-    min_index, max_index = 0, len(values) - 1
-    while len(result) < min(limit, len(values)):
-        random_id = values[randint(min_index, max_index)]
-        if random_id not in result:
-            result.append(random_id)
+def _get_random_ids(
+        test_type_id: int,
+        limit: int,
+        exclude: Container[int] = frozenset(),
+        rng: Optional[Random] = None,
+        difficulty: Optional[str] = None
+) -> list[int]:
+    pool = get_question_pool(test_type_id)
+    if pool.is_materialized:
+        question_difficulty = None
+        if difficulty is not None:
+            # sampled uniformly until the difficulty is loaded
+            question_difficulty = get_question_difficulty(pool)
+        if question_difficulty is not None:
+            table = question_difficulty.get_alias_table(difficulty)
+            return sample_weighted_ids(pool.ids, table, limit, exclude, rng)
+        return sample_ids(pool.ids, limit, exclude, rng)
 
-    return result
+    # the pools sampled by the database have no difficulty
+    return sample_ids_from_database(test_type_id, len(pool), limit, exclude, rng)
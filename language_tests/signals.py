@@ -0,0 +1,126 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+
+from .answer_index import invalidate_question_answer_index
+from .catalog import invalidate_catalog
+from .fragments import (
+    invalidate_question_fragments,
+    invalidate_test_type_fragment,
+    load_sort_key
+)
+from .metrics import record_query
+from .models import Answer, LanguageTestType, Question, QuestionAnswer
+from .partitions import create_partitions, is_partitioned
+from .pools import invalidate_question_pools
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_pool_state(sender, instance: Question, raw: bool, **kwargs):
+    previous_state = None
+    if instance.pk is not None and not raw:
+        previous_state = Question.objects.filter(
+            pk=instance.pk
+        ).values_list(
+            'test_type_id',
+            'is_published'
+        ).first()
+    instance._previous_pool_state = previous_state
+
+
+@receiver(post_save, sender=Question)
+def invalidate_question_pool_on_save(sender, instance: Question, **kwargs):
+    previous_state = getattr(instance, '_previous_pool_state', None)
+    current_state = (instance.test_type_id, instance.is_published)
+    if previous_state == current_state:
+        return
+
+    previous_test_type_id = previous_state[0] if previous_state else None
+    invalidate_question_pools(previous_test_type_id, instance.test_type_id)
+
+
+@receiver(post_delete, sender=Question)
+def invalidate_question_pool_on_delete(sender, instance: Question, **kwargs):
+    invalidate_question_pools(instance.test_type_id)
+
+
+@receiver(post_delete, sender=LanguageTestType)
+def invalidate_test_type_question_pool(
+        sender,
+        instance: LanguageTestType,
+        **kwargs
+):
+    # questions of a deleted test type are detached by SET NULL without
+    # sending any signals
+    invalidate_question_pools(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_fragment(sender, instance: Question, **kwargs):
+    invalidate_question_fragments(instance.pk)
+
+
+@receiver(post_save, sender=QuestionAnswer)
+@receiver(post_delete, sender=QuestionAnswer)
+def invalidate_question_answer_fragment(
+        sender,
+        instance: QuestionAnswer,
+        **kwargs
+):
+    invalidate_question_fragments(instance.question_id)
+
+
+@receiver(post_save, sender=QuestionAnswer)
+@receiver(post_delete, sender=QuestionAnswer)
+def invalidate_question_answers(sender, instance: QuestionAnswer, **kwargs):
+    invalidate_question_answer_index()
+
+
+@receiver(post_save, sender=Answer)
+def invalidate_answer_fragments(
+        sender,
+        instance: Answer,
+        created: bool,
+        **kwargs
+):
+    if created:
+        return
+
+    question_ids = QuestionAnswer.objects.filter(
+        answer_id=instance.pk
+    ).values_list(
+        'question_id',
+        flat=True
+    )
+    invalidate_question_fragments(*question_ids)
+
+
+@receiver(post_save, sender=LanguageTestType)
+@receiver(post_delete, sender=LanguageTestType)
+def invalidate_test_type(sender, instance: LanguageTestType, **kwargs):
+    invalidate_test_type_fragment(instance.pk)
+    invalidate_catalog()
+
+
+@receiver(post_migrate)
+def create_test_result_partitions(sender, using: str, **kwargs):
+    if sender.name == 'language_tests' and is_partitioned(using):
+        create_partitions(using=using)
+
+
+@receiver(connection_created)
+def add_query_recorder(sender, connection, **kwargs):
+    # the first wrapper, the ones of execute_wrapper() are popped from the end
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(connection_created)
+def load_fragment_sort_key(sender, connection, **kwargs):
+    load_sort_key(connection)
@@ -0,0 +1,343 @@
+from typing import Iterable, Sequence
+
+from django.db import connection, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    IntegerField,
+    Max,
+    OuterRef,
+    Q,
+    QuerySet,
+    Sum,
+    When
+)
+
+from .answer_index import get_question_answers
+from .leaderboards import invalidate_leaderboards, update_leaderboards
+from .loaders import UPSERT_BATCH_SIZE
+from .models import (
+    Question,
+    QuestionAnswer,
+    QuestionStats,
+    TestResult,
+    UserTestTypeStats
+)
+
+
+def update_user_stats(test_results: Sequence[TestResult]) -> None:
+    """
+    Adds saved test results to the statistics of their users, must run in
+    the transaction which saves the results.
+    """
+    question_ids = {test_result.question_id for test_result in test_results}
+    question_answers = get_question_answers(question_ids)
+    test_type_ids = dict(
+        Question.objects.filter(
+            id__in=question_ids
+        ).order_by().values_list(
+            'id',
+            'test_type_id'
+        )
+    )
+
+    stats = {}
+    for test_result in test_results:
+        test_type_id = test_type_ids.get(test_result.question_id)
+        if test_type_id is None:
+            continue
+
+        answers = question_answers.get(test_result.question_id)
+        is_right_answer = (
+            answers is not None
+            and answers.right_answer_id == test_result.answer_id
+        )
+        key = (test_result.user_id, test_type_id)
+        attempted, correct, last_activity = stats.get(
+            key,
+            (0, 0, test_result.solution_date)
+        )
+        stats[key] = (
+            attempted + 1,
+            correct + is_right_answer,
+            max(last_activity, test_result.solution_date)
+        )
+
+    # sorted, so concurrent writers lock the rows in the same order
+    scores = _upsert_user_stats(
+        (user_id, test_type_id, *values)
+        for (user_id, test_type_id), values in sorted(stats.items())
+    )
+    transaction.on_commit(lambda: update_leaderboards(scores))
+
+
+def update_question_stats(test_results: Sequence[TestResult]) -> None:
+    """
+    Adds saved test results to the numbers of the answers of their
+    questions, must run in the transaction which saves the results.
+    """
+    question_answers = get_question_answers(
+        {test_result.question_id for test_result in test_results}
+    )
+    stats = {}
+    for test_result in test_results:
+        answers = question_answers.get(test_result.question_id)
+        is_right_answer = (
+            answers is not None
+            and answers.right_answer_id == test_result.answer_id
+        )
+        attempted, correct = stats.get(test_result.question_id, (0, 0))
+        stats[test_result.question_id] = (attempted + 1, correct + is_right_answer)
+
+    # sorted, so concurrent writers lock the rows in the same order
+    _upsert_question_stats(
+        (question_id, *values)
+        for question_id, values in sorted(stats.items())
+    )
+
+
+def rebuild_user_stats(user_ids: Iterable[int]) -> int:
+    """
+    Replaces the statistics of the users with the ones computed from their
+    test results, returns the number of saved rows.
+    """
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        last_activities = {
+            (user_id, test_type_id): last_activity
+            for user_id, test_type_id, last_activity in (
+                UserTestTypeStats.objects.filter(
+                    user_id__in=user_ids
+                ).values_list(
+                    'user_id',
+                    'test_type_id',
+                    'last_activity'
+                )
+            )
+        }
+        for i in _count_user_results(user_ids):
+            last_activities[(i['user_id'], i['question__test_type_id'])] = (
+                i['last_activity']
+            )
+        # the rows are locked (and the missing ones created) in the order
+        # of update_user_stats() before the results are counted, so results
+        # saved concurrently are either counted here or added after the commit
+        _upsert_user_stats(
+            (user_id, test_type_id, 0, 0, last_activity)
+            for (user_id, test_type_id), last_activity in sorted(last_activities.items())
+        )
+
+        stats = _count_user_results(user_ids)
+        stale_stats = Q()
+        for user_id, test_type_id in last_activities.keys() - {
+            (i['user_id'], i['question__test_type_id']) for i in stats
+        }:
+            stale_stats |= Q(user_id=user_id, test_type_id=test_type_id)
+        if stale_stats:
+            UserTestTypeStats.objects.filter(stale_stats).delete()
+        _upsert_user_stats(
+            (
+                (
+                    i['user_id'],
+                    i['question__test_type_id'],
+                    i['attempted'],
+                    i['correct'],
+                    i['last_activity']
+                )
+                for i in stats
+            ),
+            replace=True
+        )
+        invalidate_leaderboards()
+
+    return len(stats)
+
+
+def rebuild_question_stats(question_ids: Iterable[int]) -> int:
+    """
+    Replaces the numbers of the answers of the questions with the ones
+    computed from their test results, returns the number of saved rows.
+    """
+    question_ids = list(question_ids)
+    with transaction.atomic():
+        locked_question_ids = set(
+            QuestionStats.objects.filter(
+                question_id__in=question_ids
+            ).values_list(
+                'question_id',
+                flat=True
+            )
+        )
+        locked_question_ids.update(
+            i['question_id'] for i in _count_question_results(question_ids)
+        )
+        # the rows are locked first, as in rebuild_user_stats()
+        _upsert_question_stats(
+            (question_id, 0, 0) for question_id in sorted(locked_question_ids)
+        )
+
+        stats = _count_question_results(question_ids)
+        QuestionStats.objects.filter(
+            question_id__in=locked_question_ids - {i['question_id'] for i in stats}
+        ).delete()
+        _upsert_question_stats(
+            ((i['question_id'], i['attempted'], i['correct']) for i in stats),
+            replace=True
+        )
+
+    return len(stats)
+
+
+def _count_user_results(user_ids: list[int]) -> list[dict]:
+    return list(
+        TestResult.objects.filter(
+            user_id__in=user_ids,
+            question__test_type__isnull=False
+        ).order_by().values(
+            'user_id',
+            'question__test_type_id'
+        ).annotate(
+            attempted=Count('id'),
+            # Count(filter=Exists(...)) breaks on sqlite in django 3.2
+            correct=Sum(
+                Case(
+                    When(Exists(_get_right_answers()), then=1),
+                    default=0,
+                    output_field=IntegerField()
+                )
+            ),
+            last_activity=Max('solution_date')
+        ).order_by(
+            'user_id',
+            'question__test_type_id'
+        )
+    )
+
+
+def _count_question_results(question_ids: list[int]) -> list[dict]:
+    return list(
+        TestResult.objects.filter(
+            question_id__in=question_ids
+        ).order_by().values(
+            'question_id'
+        ).annotate(
+            attempted=Count('id'),
+            correct=Sum(
+                Case(
+                    When(Exists(_get_right_answers()), then=1),
+                    default=0,
+                    output_field=IntegerField()
+                )
+            )
+        ).order_by(
+            'question_id'
+        )
+    )
+
+
+def _get_right_answers() -> QuerySet:
+    return QuestionAnswer.objects.filter(
+        question_id=OuterRef('question_id'),
+        answer_id=OuterRef('answer_id'),
+        is_right_answer=True
+    )
+
+
+def _upsert_question_stats(
+        rows: Iterable[tuple[int, int, int]],
+        replace: bool = False
+) -> None:
+    # the numbers are added to the saved ones, or replace them
+    rows = list(rows)
+    opts = QuestionStats._meta
+    quote_name = connection.ops.quote_name
+    table = quote_name(opts.db_table)
+    question_column = quote_name(opts.get_field('question').column)
+    attempted_column = quote_name(opts.get_field('attempted').column)
+    correct_column = quote_name(opts.get_field('correct').column)
+
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[i:i + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} '
+                f'({question_column}, {attempted_column}, {correct_column}) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT ({question_column}) DO UPDATE SET '
+                f'{attempted_column} = '
+                f'{_get_update_value(table, attempted_column, replace)}, '
+                f'{correct_column} = '
+                f'{_get_update_value(table, correct_column, replace)}',
+                [value for row in batch for value in row]
+            )
+
+
+def _upsert_user_stats(
+        rows: Iterable[tuple],
+        replace: bool = False
+) -> list[tuple[int, int, int]]:
+    # postgres and sqlite share the syntax of the upsert, returns the user
+    # ids, the test type ids and the new numbers of the right answers
+    rows = list(rows)
+    opts = UserTestTypeStats._meta
+    quote_name = connection.ops.quote_name
+    table = quote_name(opts.db_table)
+    user_column = quote_name(opts.get_field('user').column)
+    test_type_column = quote_name(opts.get_field('test_type').column)
+    attempted_column = quote_name(opts.get_field('attempted').column)
+    correct_column = quote_name(opts.get_field('correct').column)
+    last_activity_column = quote_name(opts.get_field('last_activity').column)
+    columns = (
+        user_column,
+        test_type_column,
+        attempted_column,
+        correct_column,
+        last_activity_column,
+    )
+
+    if replace:
+        last_activity_value = f'EXCLUDED.{last_activity_column}'
+    else:
+        last_activity_value = (
+            f'CASE WHEN EXCLUDED.{last_activity_column} > '
+            f'{table}.{last_activity_column} '
+            f'THEN EXCLUDED.{last_activity_column} '
+            f'ELSE {table}.{last_activity_column} END'
+        )
+
+    scores = []
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[i:i + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT ({user_column}, {test_type_column}) DO UPDATE SET '
+                f'{attempted_column} = '
+                f'{_get_update_value(table, attempted_column, replace)}, '
+                f'{correct_column} = '
+                f'{_get_update_value(table, correct_column, replace)}, '
+                f'{last_activity_column} = {last_activity_value} '
+                f'RETURNING {user_column}, {test_type_column}, {correct_column}',
+                [
+                    value
+                    for user_id, test_type_id, attempted, correct, last_activity in batch
+                    for value in (
+                        user_id,
+                        test_type_id,
+                        attempted,
+                        correct,
+                        connection.ops.adapt_datetimefield_value(last_activity),
+                    )
+                ]
+            )
+            scores.extend(cursor.fetchall())
+
+    return scores
+
+
+def _get_update_value(table: str, column: str, replace: bool) -> str:
+    if replace:
+        return f'EXCLUDED.{column}'
+    return f'{table}.{column} + EXCLUDED.{column}'
@@ -0,0 +1,456 @@
+import gzip
+import json
+import tempfile
+from datetime import date, datetime, timezone
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Max, Sum
+from django.test import TestCase
+
+from ..models import (
+    Answer,
+    LanguageTestType,
+    Question,
+    QuestionAnswer,
+    QuestionStats,
+    TestResult,
+    UserTestTypeStats
+)
+from ..partitions import (
+    MONTHS_AHEAD,
+    add_months,
+    create_partition,
+    get_month,
+    get_partitions
+)
+from ..pools import get_question_pool
+from ..results import save_test_results
+from ..validators import validate_question, validate_question_answers
+from .utils import LanguageTestMixin
+
+
+class ImportQuestionsTest(LanguageTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_file(self, name: str, content: str) -> str:
+        path = Path(self.directory.name) / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def call_command(self, *args, **kwargs) -> tuple[str, str]:
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_questions',
+            *args,
+            stdout=stdout,
+            stderr=stderr,
+            **kwargs
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_csv(self):
+        path = self.write_file(
+            'questions.csv',
+            'question,test_type,is_published,answer_1,answer_2,answer_3,'
+            'answer_4,right_answer\n'
+            'imported ___ 1,1,true,answer_1,new_answer_1,new_answer_2,'
+            'new_answer_3,2\n'
+            'imported ___ 2,2,false,answer_1,answer_2,answer_3,answer_4,1\n'
+            'imported ___ 2,2,false,answer_1,answer_2,answer_3,answer_4,1\n'
+            'question ___ 1,1,true,answer_1,answer_2,answer_3,answer_4,1\n'
+            'invalid,1,true,answer_1,answer_2,answer_3,answer_4,1\n'
+            'imported ___ 3,1,true,answer_1,answer_1,answer_3,answer_4,1\n'
+            'imported ___ 4,99,true,answer_1,answer_2,answer_3,answer_4,1\n'
+        )
+        pool = get_question_pool(1)
+        stdout, stderr = self.call_command(path, chunk_size=1)
+
+        self.assertIn('Imported 2 questions, 3 invalid rows', stdout)
+        self.assertEqual(len(stderr.splitlines()), 3)
+        question = Question.objects.get(question='imported ___ 1')
+        self.assertTrue(question.is_published)
+        self.assertEqual(question.test_type_id, 1)
+        self.assertEqual(
+            dict(
+                QuestionAnswer.objects.filter(
+                    question=question
+                ).values_list(
+                    'answer__answer',
+                    'is_right_answer'
+                )
+            ),
+            {
+                'answer_1': False,
+                'new_answer_1': True,
+                'new_answer_2': False,
+                'new_answer_3': False,
+            }
+        )
+        self.assertFalse(
+            Question.objects.get(question='imported ___ 2').is_published
+        )
+        self.assertIn(question.pk, get_question_pool(1))
+        self.assertEqual(len(get_question_pool(1)), len(pool) + 1)
+
+    def test_import_jsonl(self):
+        question = {
+            'question': 'imported ___ 1',
+            'test_type': 1,
+            'answers': [
+                {'answer': 'answer_1', 'is_right_answer': True},
+                {'answer': 'answer_2', 'is_right_answer': False},
+                {'answer': 'answer_3', 'is_right_answer': False},
+                {'answer': 'answer_4', 'is_right_answer': False},
+            ],
+        }
+        path = self.write_file(
+            'questions.jsonl',
+            f'{json.dumps(question)}\n\nnot json\n'
+        )
+        stdout, stderr = self.call_command(path)
+
+        self.assertIn('Imported 1 questions, 1 invalid rows', stdout)
+        self.assertIn('Line 3', stderr)
+        self.assertEqual(
+            QuestionAnswer.objects.filter(
+                question__question='imported ___ 1'
+            ).count(),
+            4
+        )
+
+    def test_unknown_format(self):
+        with self.assertRaises(CommandError):
+            self.call_command(self.write_file('questions.txt', ''))
+
+
+class RebuildUserStatsTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [
+            User.objects.create_user(**user)
+            for user in cls.users.values()
+        ]
+
+    def get_stats(self) -> list[tuple]:
+        return list(
+            UserTestTypeStats.objects.order_by(
+                'user_id',
+                'test_type_id'
+            ).values_list(
+                'user_id',
+                'test_type_id',
+                'attempted',
+                'correct',
+                'last_activity'
+            )
+        )
+
+    def test_rebuild_user_stats(self):
+        question_answers = QuestionAnswer.objects.filter(
+            question__test_type_id__in=(1, 2)
+        ).order_by('question_id', 'answer_id')
+        save_test_results(
+            [
+                TestResult(
+                    user=user,
+                    question_id=question_answer.question_id,
+                    answer_id=question_answer.answer_id
+                )
+                for user in self.users[1:]
+                for question_answer in question_answers
+            ]
+        )
+        stats = self.get_stats()
+        self.assertEqual(len(stats), 4)
+        self.assertEqual(
+            [row[2:4] for row in stats],
+            [(self.default_number_questions * self.default_number_answers,
+              self.default_number_questions)] * 4
+        )
+
+        UserTestTypeStats.objects.update(attempted=0, correct=0)
+        stdout = StringIO()
+        call_command('rebuild_user_stats', batch_size=2, stdout=stdout)
+        self.assertIn('Rebuilt 4 statistics of 3 users.', stdout.getvalue())
+        self.assertEqual(self.get_stats(), stats)
+
+
+class RebuildQuestionStatsTest(LanguageTestMixin, TestCase):
+
+    def test_rebuild_question_stats(self):
+        user = get_user_model().objects.create_user(**self.users['active_user'])
+        save_test_results(
+            [
+                TestResult(
+                    user=user,
+                    question_id=question_answer.question_id,
+                    answer_id=question_answer.answer_id
+                )
+                for question_answer in QuestionAnswer.objects.filter(
+                    question__test_type_id=1
+                )
+            ]
+        )
+        stats = list(QuestionStats.objects.order_by('question_id').values_list())
+        self.assertEqual(len(stats), self.default_number_questions)
+
+        QuestionStats.objects.all().delete()
+        stdout = StringIO()
+        call_command('rebuild_question_stats', batch_size=50, stdout=stdout)
+        self.assertIn(
+            f'Rebuilt the statistics of {self.default_number_questions} '
+            f'answered questions of {self.number_questions} questions.',
+            stdout.getvalue()
+        )
+        self.assertEqual(
+            list(QuestionStats.objects.order_by('question_id').values_list()),
+            stats
+        )
+
+
+class GenerateDatasetTest(LanguageTestMixin, TestCase):
+    options = {
+        'test_types': 3,
+        'questions': 50,
+        'answers': 20,
+        'users': 10,
+        'results': 300,
+        'months': 3,
+        'seed': 1,
+        'end_date': '2021-06-30',
+        'chunk_size': 40,
+    }
+
+    def generate(self) -> dict:
+        User = get_user_model()
+        first_ids = {
+            model: (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+            for model in (LanguageTestType, Answer, Question, User)
+        }
+        stdout = StringIO()
+        call_command('generate_dataset', stdout=stdout, **self.options)
+        self.assertIn(
+            'Generated 50 questions and 300 test results',
+            stdout.getvalue()
+        )
+
+        test_results = TestResult.objects.filter(
+            user_id__gte=first_ids[User]
+        )
+        return {
+            'first_ids': first_ids,
+            'test_types': list(
+                LanguageTestType.objects.filter(
+                    id__gte=first_ids[LanguageTestType]
+                ).order_by('id').values_list('id', 'name', 'is_published')
+            ),
+            'questions': list(
+                Question.objects.filter(
+                    id__gte=first_ids[Question]
+                ).order_by('id').values_list(
+                    'id',
+                    'question',
+                    'is_published',
+                    'test_type_id'
+                )
+            ),
+            'question_answers': list(
+                QuestionAnswer.objects.filter(
+                    question_id__gte=first_ids[Question]
+                ).order_by('question_id', 'answer_id').values_list(
+                    'question_id',
+                    'answer_id',
+                    'is_right_answer'
+                )
+            ),
+            'test_results': list(
+                test_results.order_by(
+                    'user_id',
+                    'solution_date',
+                    'question_id'
+                ).values_list(
+                    'user_id',
+                    'question_id',
+                    'answer_id',
+                    'solution_date'
+                )
+            ),
+            'stats': list(
+                UserTestTypeStats.objects.filter(
+                    user_id__gte=first_ids[User]
+                ).order_by('user_id', 'test_type_id').values_list(
+                    'user_id',
+                    'test_type_id',
+                    'attempted',
+                    'correct'
+                )
+            ),
+        }
+
+    def delete(self, dataset: dict) -> None:
+        first_ids = dataset['first_ids']
+        get_user_model().objects.filter(
+            id__gte=first_ids[get_user_model()]
+        ).delete()
+        Question.objects.filter(id__gte=first_ids[Question]).delete()
+        Answer.objects.filter(id__gte=first_ids[Answer]).delete()
+        LanguageTestType.objects.filter(
+            id__gte=first_ids[LanguageTestType]
+        ).delete()
+
+    def test_generate_dataset(self):
+        dataset = self.generate()
+        self.assertEqual(len(dataset['test_types']), 3)
+        self.assertEqual(len(dataset['questions']), 50)
+        self.assertEqual(len(dataset['test_results']), 300)
+        for _, question, _, _ in dataset['questions']:
+            validate_question(question)
+
+        answers = {}
+        for question_id, answer_id, is_right_answer in dataset['question_answers']:
+            answers.setdefault(question_id, {})[answer_id] = is_right_answer
+        self.assertEqual(len(answers), 50)
+        for question_answers in answers.values():
+            validate_question_answers(question_answers)
+
+        # only published questions of published test types are answered
+        published_test_type_ids = {
+            test_type_id
+            for test_type_id, _, is_published in dataset['test_types']
+            if is_published
+        }
+        published_question_ids = {
+            question_id
+            for question_id, _, is_published, test_type_id in dataset['questions']
+            if is_published and test_type_id in published_test_type_ids
+        }
+        end_date = datetime(2021, 6, 30, tzinfo=timezone.utc)
+        for user_id, question_id, answer_id, solution_date in dataset['test_results']:
+            self.assertIn(question_id, published_question_ids)
+            self.assertIn(answer_id, answers[question_id])
+            self.assertLessEqual(solution_date, end_date)
+
+        self.assertEqual(
+            sum(row[2] for row in dataset['stats']),
+            len(dataset['test_results'])
+        )
+        right_answers = sum(
+            answers[question_id][answer_id]
+            for _, question_id, answer_id, _ in dataset['test_results']
+        )
+        self.assertEqual(sum(row[3] for row in dataset['stats']), right_answers)
+        question_stats = QuestionStats.objects.aggregate(
+            attempted=Sum('attempted'),
+            correct=Sum('correct')
+        )
+        self.assertEqual(
+            question_stats,
+            {'attempted': len(dataset['test_results']), 'correct': right_answers}
+        )
+
+        self.delete(dataset)
+        self.assertEqual(self.generate(), dataset)
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', answers=3, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', end_date='2021-06', stdout=StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgresql only')
+class TestResultPartitionsTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            **cls.users['active_user']
+        )
+
+    def create_test_result(self, solution_date: datetime) -> TestResult:
+        test_result = TestResult.objects.create(
+            user=self.user,
+            question_id=1,
+            answer_id=1
+        )
+        TestResult.objects.filter(
+            pk=test_result.pk
+        ).update(
+            solution_date=solution_date
+        )
+        return test_result
+
+    def get_partition_ids(self, partition: str) -> list[int]:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM {connection.ops.quote_name(partition)}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_create_partitions(self):
+        current_month = get_month(datetime.now(tz=timezone.utc))
+        stdout = StringIO()
+        call_command(
+            'create_test_result_partitions',
+            months_ahead=MONTHS_AHEAD + 1,
+            stdout=stdout
+        )
+        self.assertIn('Created 1 partitions.', stdout.getvalue())
+        partitions = get_partitions()
+        for number in range(MONTHS_AHEAD + 2):
+            self.assertIn(add_months(current_month, number), partitions)
+
+    def test_rows_moved_from_default_partition(self):
+        test_result = self.create_test_result(
+            datetime(2100, 1, 15, tzinfo=timezone.utc)
+        )
+        self.assertIn(
+            test_result.pk,
+            self.get_partition_ids('language_tests_testresult_default')
+        )
+
+        partition = create_partition(date(2100, 1, 1))
+        self.assertEqual(self.get_partition_ids(partition), [test_result.pk])
+        self.assertFalse(
+            self.get_partition_ids('language_tests_testresult_default')
+        )
+        self.assertTrue(TestResult.objects.filter(pk=test_result.pk).exists())
+
+    def test_archive_test_results(self):
+        create_partition(date(2000, 1, 1))
+        test_result = self.create_test_result(
+            datetime(2000, 1, 15, tzinfo=timezone.utc)
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        stdout = StringIO()
+        call_command(
+            'archive_test_results',
+            before='2000-02',
+            output_dir=directory.name,
+            stdout=stdout
+        )
+        self.assertIn('language_tests_testresult_p200001 (1 rows)', stdout.getvalue())
+        self.assertFalse(TestResult.objects.filter(pk=test_result.pk).exists())
+        self.assertNotIn(date(2000, 1, 1), get_partitions())
+
+        path = Path(directory.name) / 'language_tests_testresult_p200001.csv.gz'
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f'{test_result.pk},'))
+
+    def test_archive_invalid_month(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_test_results', before='2000')
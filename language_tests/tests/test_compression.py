@@ -0,0 +1,78 @@
+import gzip
+from unittest import skipUnless
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from ..compression import (
+    brotli,
+    encode_response,
+    get_content_encoding,
+    get_encoded_contents
+)
+
+
+class CompressionTest(SimpleTestCase):
+
+    def get_content_encoding(self, accept_encoding: str, encodings=('br', 'gzip')):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return get_content_encoding(request, encodings)
+
+    def test_get_content_encoding(self):
+        self.assertIsNone(self.get_content_encoding(''))
+        self.assertIsNone(self.get_content_encoding('identity, deflate'))
+        self.assertEqual(self.get_content_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(self.get_content_encoding('GZIP'), 'gzip')
+        self.assertEqual(self.get_content_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(self.get_content_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertIsNone(self.get_content_encoding('gzip;q=0, br;q=0.0'))
+        self.assertIsNone(self.get_content_encoding('gzip;q=x'))
+        self.assertEqual(self.get_content_encoding('*'), 'br')
+        self.assertEqual(self.get_content_encoding('*;q=0.5, br;q=0'), 'gzip')
+        self.assertIsNone(self.get_content_encoding('br', encodings=('gzip',)))
+
+    def test_encode_response(self):
+        content = b'{"questions":[' + b'{"id":1},' * 100 + b'{"id":1}]}'
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = HttpResponse(content)
+        response['ETag'] = '"1"'
+
+        response = encode_response(request, response)
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"1"')
+
+        # too small, not successful and already encoded responses
+        for response in (
+                HttpResponse(b'{}'),
+                HttpResponse(content, status=404),
+                HttpResponse(content, headers={'Content-Encoding': 'br'}),
+        ):
+            encoded_response = encode_response(request, response)
+            self.assertEqual(encoded_response['Vary'], 'Accept-Encoding')
+            self.assertNotEqual(encoded_response.get('Content-Encoding'), 'gzip')
+
+    def test_encoded_contents(self):
+        content = b'[' + b'{"id":1,"name":"test_type"},' * 20 + b'{}]'
+        encoded_contents = get_encoded_contents(content)
+        self.assertEqual(encoded_contents['identity'], content)
+        self.assertEqual(gzip.decompress(encoded_contents['gzip']), content)
+        # the same bytes for every worker
+        self.assertEqual(get_encoded_contents(content), encoded_contents)
+        self.assertEqual(get_encoded_contents(b'[]'), {'identity': b'[]'})
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = encode_response(
+            request,
+            HttpResponse(content),
+            {'identity': content, 'gzip': b'gzipped'}
+        )
+        self.assertEqual(response.content, b'gzipped')
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli(self):
+        content = b'[' + b'{"id":1,"name":"test_type"},' * 20 + b'{}]'
+        encoded_contents = get_encoded_contents(content)
+        self.assertEqual(brotli.decompress(encoded_contents['br']), content)
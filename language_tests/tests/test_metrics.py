@@ -0,0 +1,214 @@
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.urls import path, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .. import metrics
+from ..async_views import run_in_thread_pool
+from ..metrics import MetricsRegistry, RequestMetrics, render_metrics
+from ..views import LanguageTestView
+from .utils import LanguageTestMixin, User
+
+
+class MetricsMixin:
+
+    def setUp(self):
+        super().setUp()
+        # every test starts with empty metrics
+        metrics._registry = None
+        self.addCleanup(setattr, metrics, '_registry', None)
+
+
+class MetricsViewTest(MetricsMixin, LanguageTestMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.active_user = User.objects.create_user(**cls.users['active_user'])
+        cls.admin = User.objects.create_user(**cls.users['admin'])
+        cls.active_user_token = Token.objects.create(user=cls.active_user)
+        cls.admin_token = Token.objects.create(user=cls.admin)
+
+    def get_metrics(self) -> str:
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_admin_only(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 401)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_request_metrics(self):
+        self.client.get(reverse('language_test', kwargs={'pk': 1}))
+        self.client.get(reverse('language_test', kwargs={'pk': 1000}))
+        self.client.get('/unknown/')
+
+        lines = self.get_metrics().splitlines()
+        labels = 'view="language_test",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', lines)
+        self.assertIn(f'http_requests_total{{{labels},status="404"}} 1', lines)
+        self.assertIn(
+            'http_requests_total{view="unresolved",method="GET",status="404"} 1',
+            lines
+        )
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2',
+            lines
+        )
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', lines)
+        self.assertIn(
+            f'http_response_size_bytes_bucket{{{labels},le="+Inf"}} 2',
+            lines
+        )
+        queries = get_value(lines, f'http_request_db_queries_sum{{{labels}}}')
+        self.assertGreater(queries, 0)
+        self.assertEqual(
+            get_value(lines, 'http_request_db_queries_sum{view="unresolved",method="GET"}'),
+            0
+        )
+
+    def test_metrics_of_workers_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS={'DIRECTORY': directory, 'FLUSH_INTERVAL': 0}):
+                self.client.get(reverse('language_test', kwargs={'pk': 1}))
+                self.assertEqual(len(list(Path(directory).glob('*.json'))), 1)
+
+                # another worker which has exited
+                worker = MetricsRegistry(directory)
+                worker.pid = get_exited_pid()
+                worker.path = Path(directory) / f'{worker.pid}_worker.json'
+                worker.observe_request('language_test', 'GET', 200, 0.2, 2, 0.1, 1000)
+                snapshot = worker.get_snapshot()
+                snapshot['gauges'].append(['db_pool_size', [['database', 'default']], 5])
+                worker.path.write_text(json.dumps(snapshot))
+
+                lines = self.get_metrics().splitlines()
+
+        self.assertIn(
+            'http_requests_total{view="language_test",method="GET",status="200"} 2',
+            lines
+        )
+        # the gauges of the exited workers are dropped
+        self.assertFalse(
+            [line for line in lines if line.startswith('db_pool_size')]
+        )
+
+
+class AsyncViewMetricsTest(MetricsMixin, LanguageTestMixin, TransactionTestCase):
+
+    def test_queries_of_pool_threads_recorded(self):
+        view = run_in_thread_pool(LanguageTestView.as_view())
+        request_metrics = RequestMetrics()
+        token = metrics._request_metrics.set(request_metrics)
+        try:
+            response = async_to_sync(view)(RequestFactory().get('/api/tests/1/'), pk=1)
+        finally:
+            metrics._request_metrics.reset(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(request_metrics.queries, 0)
+        self.assertGreater(request_metrics.db_duration, 0)
+
+
+async def sleeping_view(request):
+    start_time = time.monotonic()
+    await asyncio.sleep(0.2)
+    request_intervals.append((start_time, time.monotonic()))
+    return HttpResponse()
+
+
+request_intervals = []
+urlpatterns = [path('sleep/', sleeping_view, name='sleep')]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncMiddlewareTest(MetricsMixin, SimpleTestCase):
+
+    def test_concurrent_requests(self):
+        request_intervals.clear()
+
+        async def send_requests():
+            client = AsyncClient()
+            return await asyncio.gather(*(client.get('/sleep/') for _ in range(4)))
+
+        responses = async_to_sync(send_requests)()
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+        # the requests are handled at the same time, not one by one
+        self.assertLess(
+            max(start_time for start_time, _ in request_intervals),
+            min(end_time for _, end_time in request_intervals)
+        )
+        lines = render_metrics([metrics.get_metrics_registry().get_snapshot()]).splitlines()
+        self.assertIn(
+            'http_requests_total{view="sleep",method="GET",status="200"} 4',
+            lines
+        )
+
+
+class RenderMetricsTest(TestCase):
+
+    def test_render_metrics(self):
+        registry = MetricsRegistry()
+        registry.observe_request('test_result', 'POST', 201, 0.03, 4, 0.01, 50)
+        registry.observe_request('test_result', 'POST', 201, 20.0, 120, 1.5, 50)
+        registry.observe_request('test"result', 'POST', 400, 0.001, 0, 0.0, 10)
+        text = render_metrics([registry.get_snapshot()])
+        lines = text.splitlines()
+        labels = 'view="test_result",method="POST"'
+
+        self.assertTrue(text.endswith('\n'))
+        self.assertIn('# TYPE http_requests_total counter', lines)
+        self.assertIn(f'http_requests_total{{{labels},status="201"}} 2', lines)
+        self.assertIn(
+            'http_requests_total{view="test\\"result",method="POST",status="400"} 1',
+            lines
+        )
+        # the buckets are cumulative
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="0.025"}} 0', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="0.05"}} 1', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="10.0"}} 1', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', lines)
+        self.assertIn(f'http_request_duration_seconds_sum{{{labels}}} 20.03', lines)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="5"}} 1', lines)
+        self.assertIn(f'http_request_db_queries_sum{{{labels}}} 124', lines)
+        self.assertIn(f'http_request_db_queries_count{{{labels}}} 2', lines)
+
+
+def get_value(lines: list[str], sample: str) -> float:
+    values = [
+        float(line.rsplit(' ', 1)[1])
+        for line in lines
+        if line.rsplit(' ', 1)[0] == sample
+    ]
+    assert len(values) == 1, sample
+    return values[0]
+
+
+def get_exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
@@ -9,7 +9,8 @@ from ..models import (
     LanguageTestType,
     Question,
     QuestionAnswer,
-    TestResult
+    TestResult,
+    UserSeenQuestions
 )
 from ..validators import validate_question
 from .utils import LanguageTestMixin
@@ -305,3 +306,28 @@ class TestResultTest(LanguageTestModelsTestCase):
                 'Ответ - "answer_1"'
             )
         )
+
+
+class UserSeenQuestionsTest(LanguageTestModelsTestCase):
+
+    def test_object_creation(self):
+        seen_questions = UserSeenQuestions.objects.create(user=self.new_user)
+        self.assertEqual(bytes(seen_questions.question_ids), b'')
+
+    def test_user(self):
+        field = UserSeenQuestions._meta.get_field('user')
+        self.assertTrue(field.one_to_one)
+        self.assertTrue(field.primary_key)
+
+    def test_meta(self):
+        self.assertEqual(
+            UserSeenQuestions._meta.verbose_name,
+            'Пройденные вопросы'
+        )
+
+    def test_str_method(self):
+        seen_questions = UserSeenQuestions.objects.create(user=self.new_user)
+        self.assertEqual(
+            str(seen_questions),
+            'Пользователь - "test_user_1"'
+        )
@@ -0,0 +1,179 @@
+import json
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..answer_index import get_question_answers
+from ..fragments import get_question_fragments, get_test_type_fragment
+from ..leaderboards import get_leaderboard
+from ..models import LanguageTestType, Question, QuestionAnswer, TestResult
+from ..pools import get_question_pool
+from ..results import save_test_results
+from ..sampling import sample_ids_from_database
+from ..seen_questions import add_seen_questions, get_seen_questions
+from ..views import user_test_type_stats
+from .utils import LanguageTestMixin
+
+
+# plan nodes which mean that a hot query reads a whole table or sorts rows
+# instead of using an index
+FORBIDDEN_NODE_TYPES = {'Seq Scan', 'Sort', 'Incremental Sort'}
+INDEX_NODE_TYPES = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+
+@skipUnless(connection.vendor == 'postgresql', 'requires postgresql')
+class QueryPlanTest(LanguageTestMixin, TestCase):
+    """
+    Explains the queries of the hot paths and fails when one of them can't be
+    served by an index. The fixtures are tiny, so the planner is told to
+    avoid sequential scans and sorts whenever an index allows it.
+    """
+    test_type_id = 1
+    number_users = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(**cls.users['active_user'])
+        other_users = User.objects.bulk_create(
+            [
+                User(username=f'user_{i}', email=f'user_{i}@example.com')
+                for i in range(cls.number_users)
+            ]
+        )
+        question_answers = QuestionAnswer.objects.filter(
+            is_right_answer=True
+        )
+        save_test_results(
+            [
+                TestResult(
+                    user=user,
+                    question_id=question_answer.question_id,
+                    answer_id=question_answer.answer_id
+                )
+                for user in (cls.user, *other_users)
+                for question_answer in question_answers
+            ]
+        )
+        cls.question_ids = list(
+            Question.objects.filter(
+                test_type_id=cls.test_type_id
+            ).values_list(
+                'id',
+                flat=True
+            )
+        )
+        # the plans depend on the statistics, which the fixtures don't have
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexedQueries(self, func, *args, whole_tables=(), **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            func(*args, **kwargs)
+
+        queries = [
+            query['sql']
+            for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+        ]
+        self.assertTrue(queries)
+        for sql in queries:
+            with self.subTest(sql=sql):
+                problems = self.get_problems(self.explain(sql), whole_tables)
+                self.assertFalse(problems, sql)
+
+    @staticmethod
+    def explain(sql: str) -> dict:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            # the hot queries read a few rows, which are joined by index
+            # lookups, a merge or hash join would walk a whole index
+            cursor.execute('SET LOCAL enable_mergejoin = off')
+            cursor.execute('SET LOCAL enable_hashjoin = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    @classmethod
+    def get_problems(cls, node: dict, whole_tables=()) -> list[str]:
+        problems = []
+        node_type = node['Node Type']
+        reads_whole_table = node.get('Relation Name') in whole_tables
+        if node_type in FORBIDDEN_NODE_TYPES and not (
+            reads_whole_table and node_type == 'Seq Scan'
+        ):
+            problems.append(f'{node_type} on {node.get("Relation Name")}')
+        # an index walked from end to end is no better than a sequential scan
+        elif (
+            node_type in INDEX_NODE_TYPES
+            and 'Index Cond' not in node
+            and not reads_whole_table
+        ):
+            problems.append(
+                f'{node_type} of {node["Index Name"]} without a condition'
+            )
+
+        for child in node.get('Plans', ()):
+            problems.extend(cls.get_problems(child, whole_tables))
+
+        return problems
+
+    def test_question_pool(self):
+        self.assertIndexedQueries(get_question_pool, self.test_type_id)
+
+    @override_settings(QUESTION_POOL_MAX_SIZE=1)
+    def test_big_question_pool(self):
+        self.assertIndexedQueries(get_question_pool, self.test_type_id)
+
+    def test_sample_ids_from_database(self):
+        self.assertIndexedQueries(
+            sample_ids_from_database,
+            self.test_type_id,
+            len(self.question_ids),
+            self.default_number_test_questions
+        )
+
+    def test_seen_questions(self):
+        self.assertIndexedQueries(get_seen_questions, self.user.pk)
+        self.assertIndexedQueries(get_seen_questions, self.user.pk)
+
+    def test_add_seen_questions(self):
+        self.assertIndexedQueries(
+            add_seen_questions,
+            self.user.pk,
+            self.question_ids[:1]
+        )
+
+    def test_question_answers(self):
+        self.assertIndexedQueries(get_question_answers, self.question_ids)
+
+    def test_question_fragments(self):
+        self.assertIndexedQueries(get_question_fragments, self.question_ids)
+
+    def test_test_type_fragment(self):
+        self.assertIndexedQueries(get_test_type_fragment, self.test_type_id)
+
+    def test_leaderboard(self):
+        self.assertIndexedQueries(get_leaderboard, self.test_type_id)
+
+    def test_test_type_list(self):
+        # the list shows the whole catalog of the test types
+        self.assertIndexedQueries(
+            self.client.get,
+            reverse('language_test_type_list'),
+            whole_tables=(LanguageTestType._meta.db_table,)
+        )
+
+    def test_user_test_type_stats(self):
+        request = APIRequestFactory().get(reverse('user_test_type_stats'))
+        force_authenticate(request, self.user)
+        self.assertIndexedQueries(user_test_type_stats, request)
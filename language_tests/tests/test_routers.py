@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.db import router
+from django.test import TestCase, override_settings
+
+from ..models import Question, TestResult
+from ..routers import ReplicaRouter, pin_reads_to_primary, replica_reads
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKINESS=60)
+class ReplicaRouterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_outside_replica_reads(self):
+        self.assertEqual(router.db_for_read(Question), 'default')
+
+    def test_replica_reads(self):
+        with replica_reads(1):
+            self.assertEqual(router.db_for_read(Question), 'replica')
+            self.assertEqual(router.db_for_write(TestResult), 'default')
+        self.assertEqual(router.db_for_read(Question), 'default')
+
+    def test_user_reads_pinned_to_primary(self):
+        pin_reads_to_primary(1)
+        with replica_reads(1):
+            self.assertEqual(router.db_for_read(TestResult), 'default')
+        with replica_reads(2):
+            self.assertEqual(router.db_for_read(TestResult), 'replica')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(TestResult), 'replica')
+
+    def test_all_reads_pinned_to_primary(self):
+        pin_reads_to_primary()
+        for user_id in (None, 1,):
+            with replica_reads(user_id):
+                self.assertEqual(router.db_for_read(Question), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        with replica_reads(1):
+            self.assertEqual(router.db_for_read(Question), 'default')
+
+    def test_allow_migrate(self):
+        replica_router = ReplicaRouter()
+        self.assertFalse(replica_router.allow_migrate('replica', 'language_tests'))
+        self.assertIsNone(replica_router.allow_migrate('default', 'language_tests'))
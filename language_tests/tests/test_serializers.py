@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import SimpleTestCase, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from ..fragments import _render_question_fragments
+from ..models import Answer, LanguageTestType, Question, UserTestTypeStats
+from ..renderers import FastJSONRenderer
+from ..serializers import (
+    LanguageTestTypeReadOnlySerializer,
+    QuestionReadOnlySerializer,
+    UserTestTypeStatsSerializer
+)
+from .utils import LanguageTestMixin
+
+
+class FastRepresentationTest(LanguageTestMixin, TestCase):
+
+    def assertSameJSON(self, data, fast_data):
+        self.assertEqual(
+            FastJSONRenderer().render(fast_data),
+            JSONRenderer().render(data)
+        )
+
+    def test_language_test_types(self):
+        test_types = LanguageTestType.objects.all()
+        self.assertSameJSON(
+            LanguageTestTypeReadOnlySerializer(test_types, many=True).data,
+            [
+                LanguageTestTypeReadOnlySerializer.to_fast_representation(i)
+                for i in test_types.values('id', 'name')
+            ]
+        )
+
+    def test_questions(self):
+        questions = Question.objects.prefetch_related(
+            Prefetch('answers', queryset=Answer.objects.order_by('answer'))
+        ).order_by('id')
+        question_ids = list(questions.values_list('id', flat=True))
+        self.assertSameJSON(
+            QuestionReadOnlySerializer(questions, many=True).data,
+            sorted(_render_question_fragments(question_ids), key=lambda x: x['id'])
+        )
+
+    def test_user_test_type_stats(self):
+        user = get_user_model().objects.create_user(**self.users['active_user'])
+        UserTestTypeStats.objects.bulk_create(
+            [
+                UserTestTypeStats(
+                    user=user,
+                    test_type_id=test_type_id,
+                    attempted=10,
+                    correct=test_type_id,
+                    last_activity=datetime(2021, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+                )
+                for test_type_id in (1, 2)
+            ]
+        )
+        stats = UserTestTypeStats.objects.order_by('test_type_id')
+        self.assertSameJSON(
+            UserTestTypeStatsSerializer(stats.select_related('test_type'), many=True).data,
+            [
+                UserTestTypeStatsSerializer.to_fast_representation(i)
+                for i in stats.values(
+                    'test_type',
+                    'test_type__name',
+                    'attempted',
+                    'correct',
+                    'last_activity'
+                )
+            ]
+        )
+
+    def test_none(self):
+        self.assertEqual(
+            LanguageTestTypeReadOnlySerializer.to_fast_representation(
+                {'id': 1, 'name': None}
+            ),
+            {'id': 1, 'name': None}
+        )
+
+
+class FastJSONRendererTest(SimpleTestCase):
+
+    def assertSameJSON(self, data, *args):
+        self.assertEqual(
+            FastJSONRenderer().render(data, *args),
+            JSONRenderer().render(data, *args)
+        )
+
+    def test_same_json(self):
+        self.assertSameJSON(
+            {
+                'question': 'Ёлка ___ "quoted" \\ \n\t \x00 \u2028 \u2029 \U0001f600',
+                'numbers': [0, -1, 2 ** 63 - 1, 0.5, True, False, None],
+                'date': datetime(2021, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+                'naive_date': datetime(2021, 6, 1),
+                'decimal': Decimal('1.50'),
+                'set': {1},
+                'nested': [{'a': ()}],
+            }
+        )
+
+    def test_fallbacks(self):
+        self.assertSameJSON(None)
+        self.assertSameJSON({1: 2 ** 70})
+        self.assertSameJSON({'a': [1]}, 'application/json; indent=4')
@@ -0,0 +1,867 @@
+import locale
+from random import Random
+from threading import Event, Thread, Timer
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.utils import timezone
+
+from ..answer_index import QuestionAnswers, get_question_answers
+from ..difficulty import get_question_difficulty, load_question_difficulty
+from ..fragments import (
+    _get_sort_key,
+    get_question_fragments,
+    get_test_type_fragment,
+    load_sort_key
+)
+from ..leaderboards import Leaderboard, get_leaderboard
+from ..loaders import upsert_answers
+from ..models import (
+    Answer,
+    LanguageTestType,
+    Question,
+    QuestionAnswer,
+    QuestionStats,
+    TestResult,
+    UserSeenQuestions,
+    UserTestTypeStats
+)
+from ..pools import get_question_pool, invalidate_question_pools
+from ..results import save_test_results
+from ..sampling import (
+    AliasTable,
+    sample_ids,
+    sample_ids_from_database,
+    sample_weighted_ids
+)
+from ..seen_questions import (
+    SeenQuestionSet,
+    add_seen_questions,
+    get_seen_questions
+)
+from ..services import generate_question_ids, generate_questions_list
+from ..stats import rebuild_question_stats, rebuild_user_stats
+from ..write_behind import TestResultWriter
+from .utils import LanguageTestMixin
+
+
+User = get_user_model()
+
+
+class QuestionPoolTest(LanguageTestMixin, TestCase):
+
+    def test_pool_contains_published_questions(self):
+        pool = get_question_pool(1)
+        published_ids = Question.objects.filter(
+            test_type_id=1,
+            is_published=True
+        ).values_list('id', flat=True)
+        self.assertEqual(list(pool.ids), sorted(published_ids))
+        self.assertIn(pool.ids[0], pool)
+        self.assertNotIn(0, pool)
+
+    def test_pool_is_cached(self):
+        pool = get_question_pool(1)
+        with self.assertNumQueries(0):
+            self.assertIs(get_question_pool(1), pool)
+
+    def test_pool_invalidation_on_publication_change(self):
+        pool = get_question_pool(1)
+        question = Question.objects.get(id=pool.ids[0])
+        question.is_published = False
+        question.save()
+        self.assertNotIn(question.id, get_question_pool(1))
+
+    def test_pool_invalidation_on_test_type_change(self):
+        question = Question.objects.get(id=get_question_pool(1).ids[0])
+        question.test_type_id = 2
+        question.save()
+        self.assertNotIn(question.id, get_question_pool(1))
+        self.assertIn(question.id, get_question_pool(2))
+
+    def test_pool_is_kept_on_question_text_change(self):
+        pool = get_question_pool(1)
+        question = Question.objects.get(id=pool.ids[0])
+        question.question = 'changed question ___ 1'
+        question.save()
+        self.assertIs(get_question_pool(1), pool)
+
+    def test_pool_invalidation_on_new_question(self):
+        question = Question.objects.create(
+            question='question ___ 0',
+            test_type_id=1
+        )
+        self.assertIn(question.id, get_question_pool(1))
+
+    def test_pool_invalidation_on_test_type_delete(self):
+        get_question_pool(1)
+        LanguageTestType.objects.filter(id=1).delete()
+        self.assertEqual(len(get_question_pool(1)), 0)
+
+    @override_settings(QUESTION_POOL_MAX_SIZE=5)
+    def test_big_pool_is_not_materialized(self):
+        pool = get_question_pool(1)
+        self.assertFalse(pool.is_materialized)
+        self.assertEqual(
+            len(pool),
+            Question.objects.filter(test_type_id=1, is_published=True).count()
+        )
+
+
+class SampleIdsTest(SimpleTestCase):
+    ids = tuple(range(1, 101))
+
+    def test_sample(self):
+        result = sample_ids(self.ids, 10, rng=Random(1))
+        self.assertEqual(len(result), 10)
+        self.assertEqual(len(set(result)), 10)
+        self.assertTrue(set(result) <= set(self.ids))
+
+    def test_sample_is_reproducible(self):
+        self.assertEqual(
+            sample_ids(self.ids, 10, rng=Random(1)),
+            sample_ids(self.ids, 10, rng=Random(1))
+        )
+
+    def test_sample_whole_pool(self):
+        result = sample_ids(self.ids, len(self.ids) + 1, rng=Random(1))
+        self.assertEqual(sorted(result), list(self.ids))
+
+    def test_sample_with_exclude(self):
+        exclude = set(self.ids[:-5])
+        result = sample_ids(self.ids, 10, exclude, rng=Random(1))
+        self.assertEqual(sorted(result), list(self.ids[-5:]))
+
+    def test_sample_is_uniform(self):
+        rng = Random(1)
+        counts = dict.fromkeys(self.ids[:10], 0)
+        for _ in range(10000):
+            for i in sample_ids(self.ids[:10], 3, rng=rng):
+                counts[i] += 1
+        for count in counts.values():
+            self.assertAlmostEqual(count / 30000, 0.1, delta=0.01)
+
+
+class AliasTableTest(SimpleTestCase):
+
+    def test_sample_by_weights(self):
+        weights = (1, 2, 0, 3, 4)
+        table = AliasTable(weights)
+        rng = Random(1)
+        counts = [0] * len(weights)
+        for _ in range(50000):
+            counts[table.sample(rng)] += 1
+        self.assertEqual(counts[2], 0)
+        for count, weight in zip(counts, weights):
+            self.assertAlmostEqual(count / 50000, weight / 10, delta=0.01)
+
+    def test_invalid_weights(self):
+        self.assertEqual(len(AliasTable([])), 0)
+        with self.assertRaises(ValueError):
+            AliasTable([0, 0])
+
+
+class SampleWeightedIdsTest(SimpleTestCase):
+    ids = tuple(range(1, 101))
+
+    def test_sample(self):
+        table = AliasTable([1.0] * 10 + [0.0] * 90)
+        result = sample_weighted_ids(self.ids, table, 5, {1}, rng=Random(1))
+        self.assertEqual(len(set(result)), 5)
+        self.assertTrue(set(result) <= set(self.ids[1:10]))
+        self.assertEqual(
+            result,
+            sample_weighted_ids(self.ids, table, 5, {1}, rng=Random(1))
+        )
+
+    def test_sample_out_of_weights(self):
+        # too few ids have weights, the rest is sampled uniformly
+        table = AliasTable([1.0] * 3 + [0.0] * 97)
+        result = sample_weighted_ids(self.ids, table, 10, {1}, rng=Random(1))
+        self.assertEqual(len(set(result)), 10)
+        self.assertTrue({2, 3} <= set(result))
+        self.assertNotIn(1, result)
+
+
+class SampleIdsFromDatabaseTest(LanguageTestMixin, TestCase):
+
+    def test_sample(self):
+        pool_ids = set(get_question_pool(1).ids)
+        result = sample_ids_from_database(1, len(pool_ids), 10, rng=Random(1))
+        self.assertEqual(len(result), 10)
+        self.assertEqual(len(set(result)), 10)
+        self.assertTrue(set(result) <= pool_ids)
+
+
+class SeenQuestionSetTest(SimpleTestCase):
+
+    def test_add(self):
+        seen_questions = SeenQuestionSet.from_ids((5, 1, 3, 1))
+        self.assertEqual(list(seen_questions.ids), [1, 3, 5])
+        self.assertTrue(seen_questions.add((4, 3, 6)))
+        self.assertFalse(seen_questions.add((1, 6)))
+        self.assertEqual(list(seen_questions.ids), [1, 3, 4, 5, 6])
+        self.assertIn(4, seen_questions)
+        self.assertNotIn(2, seen_questions)
+        self.assertEqual(len(seen_questions), 5)
+
+    def test_bytes(self):
+        seen_questions = SeenQuestionSet.from_ids((1, 2, 2 ** 40))
+        self.assertEqual(
+            list(SeenQuestionSet.from_bytes(seen_questions.to_bytes()).ids),
+            [1, 2, 2 ** 40]
+        )
+
+
+class LeaderboardTest(SimpleTestCase):
+
+    def test_ranks(self):
+        leaderboard = Leaderboard(1, 1, {1: 5, 2: 7, 3: 5, 4: 0}, 0)
+        self.assertEqual(
+            leaderboard.get_top(10),
+            [(1, 2, 7), (2, 1, 5), (2, 3, 5), (4, 4, 0)]
+        )
+        self.assertEqual(leaderboard.get_top(1), [(1, 2, 7)])
+        self.assertEqual(leaderboard.get_rank(3), (2, 5))
+        self.assertEqual(leaderboard.get_rank(4), (4, 0))
+        self.assertIsNone(leaderboard.get_rank(5))
+
+    def test_set_score(self):
+        leaderboard = Leaderboard(1, 1, {1: 5, 2: 7}, 0)
+        leaderboard.set_score(1, 8)
+        leaderboard.set_score(3, 7)
+        self.assertEqual(
+            leaderboard.get_top(10),
+            [(1, 1, 8), (2, 2, 7), (2, 3, 7)]
+        )
+        self.assertEqual(leaderboard.get_rank(2), (2, 7))
+        self.assertEqual(len(leaderboard), 3)
+
+
+class LeaderboardsTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**cls.users['active_user'])
+        cls.admin = User.objects.create_user(**cls.users['admin'])
+
+    def save_test_results(self, user: User, answer_id: int) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            save_test_results(
+                [
+                    TestResult(user=user, question_id=i, answer_id=answer_id)
+                    for i in range(1, 4)
+                ]
+            )
+
+    def test_scores_of_saved_results(self):
+        self.save_test_results(self.user, 4)
+        leaderboard = get_leaderboard(1)
+        self.assertEqual(leaderboard.get_rank(self.user.pk), (1, 0))
+
+        self.save_test_results(self.admin, 1)
+        with self.assertNumQueries(0):
+            self.assertIs(get_leaderboard(1), leaderboard)
+        self.assertEqual(
+            leaderboard.get_top(10),
+            [(1, self.admin.pk, 3), (2, self.user.pk, 0)]
+        )
+
+    @override_settings(LEADERBOARD={'REFRESH_INTERVAL': 0, 'MAX_LIMIT': 100})
+    def test_refresh(self):
+        self.assertEqual(len(get_leaderboard(1)), 0)
+        # saved by another process
+        UserTestTypeStats.objects.create(
+            user=self.user,
+            test_type_id=1,
+            attempted=2,
+            correct=1,
+            last_activity=timezone.now()
+        )
+        self.assertEqual(get_leaderboard(1).get_rank(self.user.pk), (1, 1))
+
+    def test_rebuild_reloads_leaderboards(self):
+        self.assertEqual(len(get_leaderboard(1)), 0)
+        self.create_test_results(
+            [TestResult(user=self.user, question_id=1, answer_id=1)]
+        )
+        rebuild_user_stats([self.user.pk])
+        self.assertEqual(get_leaderboard(1).get_rank(self.user.pk), (1, 1))
+
+
+class QuestionStatsTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**cls.users['active_user'])
+
+    def get_stats(self) -> list[tuple]:
+        return list(
+            QuestionStats.objects.order_by('question_id').values_list(
+                'question_id',
+                'attempted',
+                'correct'
+            )
+        )
+
+    def test_saved_results(self):
+        question_answers = QuestionAnswer.objects.filter(question_id__in=(1, 2))
+        for _ in range(2):
+            save_test_results(
+                [
+                    TestResult(
+                        user=self.user,
+                        question_id=question_answer.question_id,
+                        answer_id=question_answer.answer_id
+                    )
+                    for question_answer in question_answers
+                ]
+            )
+        stats = self.get_stats()
+        number_answers = 2 * self.default_number_answers
+        self.assertEqual(stats, [(1, number_answers, 2), (2, number_answers, 2)])
+
+        QuestionStats.objects.update(attempted=0, correct=0)
+        self.assertEqual(rebuild_question_stats([1, 2, 3]), 2)
+        self.assertEqual(self.get_stats(), stats)
+
+
+class RebuildStatsTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**cls.users['active_user'])
+
+    def test_rebuild_user_stats(self):
+        self.create_test_results(
+            [
+                TestResult(user=self.user, question_id=1, answer_id=1),
+                TestResult(user=self.user, question_id=2, answer_id=2),
+            ]
+        )
+        UserTestTypeStats.objects.bulk_create(
+            [
+                UserTestTypeStats(
+                    user=self.user,
+                    test_type_id=test_type_id,
+                    attempted=10,
+                    correct=10,
+                    last_activity=timezone.now()
+                )
+                for test_type_id in (1, 2)
+            ]
+        )
+        self.assertEqual(rebuild_user_stats([self.user.pk]), 1)
+        # the statistics of the test type without results are deleted
+        self.assertEqual(
+            list(
+                UserTestTypeStats.objects.values_list(
+                    'test_type_id',
+                    'attempted',
+                    'correct'
+                )
+            ),
+            [(1, 2, 1)]
+        )
+
+    def test_rebuild_question_stats(self):
+        self.create_test_results(
+            [TestResult(user=self.user, question_id=1, answer_id=1)]
+        )
+        QuestionStats.objects.create(question_id=2, attempted=10, correct=10)
+        self.assertEqual(rebuild_question_stats([1, 2]), 1)
+        self.assertEqual(
+            list(QuestionStats.objects.values_list()),
+            [(1, 1, 1)]
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgresql only')
+class ConcurrentRebuildStatsTest(LanguageTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(**self.users['active_user'])
+        # the statistics of the saved results are missing
+        self.create_test_results(
+            [TestResult(user=self.user, question_id=1, answer_id=1)]
+        )
+
+    def rebuild_during_save(self, rebuild) -> None:
+        saved, commit = Event(), Event()
+
+        def save():
+            try:
+                with transaction.atomic():
+                    save_test_results(
+                        [TestResult(user=self.user, question_id=1, answer_id=2)]
+                    )
+                    saved.set()
+                    commit.wait(5)
+            finally:
+                connection.close()
+
+        thread = Thread(target=save)
+        thread.start()
+        self.assertTrue(saved.wait(5))
+        # the rebuild waits for the rows of the uncommitted results
+        Timer(0.2, commit.set).start()
+        rebuild()
+        thread.join()
+
+    def test_rebuild_user_stats(self):
+        self.rebuild_during_save(lambda: rebuild_user_stats([self.user.pk]))
+        self.assertEqual(
+            list(UserTestTypeStats.objects.values_list('attempted', 'correct')),
+            [(2, 1)]
+        )
+
+    def test_rebuild_question_stats(self):
+        self.rebuild_during_save(lambda: rebuild_question_stats([1]))
+        self.assertEqual(
+            list(QuestionStats.objects.values_list('attempted', 'correct')),
+            [(2, 1)]
+        )
+
+
+class QuestionDifficultyTest(LanguageTestMixin, TestCase):
+
+    def set_stats(self, question_ids, correct: int) -> None:
+        QuestionStats.objects.bulk_create(
+            [
+                QuestionStats(question_id=i, attempted=50, correct=correct)
+                for i in question_ids
+            ]
+        )
+
+    def test_questions_of_band(self):
+        pool = get_question_pool(1)
+        hard_ids = set(pool.ids[:10])
+        self.set_stats(hard_ids, 5)
+        self.set_stats(pool.ids[10:], 45)
+        load_question_difficulty(pool)
+
+        for seed in range(10):
+            question_ids = generate_question_ids(
+                1,
+                AnonymousUser(),
+                questions_limit=5,
+                rng=Random(seed),
+                difficulty='hard'
+            )
+            self.assertEqual(len(set(question_ids)), 5)
+            self.assertTrue(set(question_ids) <= hard_ids)
+
+        # the shares of the questions without answers are in the middle
+        rates = get_question_difficulty(pool).rates
+        self.assertAlmostEqual(rates[0], 6 / 52)
+        self.assertAlmostEqual(rates[-1], 46 / 52)
+
+    def test_load_in_background(self):
+        pool = get_question_pool(1)
+        with mock.patch('language_tests.difficulty.Thread') as thread:
+            # the questions are sampled uniformly until the difficulty is loaded
+            question_ids = generate_question_ids(
+                1,
+                AnonymousUser(),
+                questions_limit=5,
+                difficulty='hard'
+            )
+            self.assertEqual(len(set(question_ids)), 5)
+            self.assertIsNone(get_question_difficulty(pool))
+            thread.assert_called_once()
+            with self.assertNumQueries(1), \
+                    mock.patch('language_tests.difficulty.connection'):
+                thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+
+        with self.assertNumQueries(0):
+            difficulty = get_question_difficulty(pool)
+        self.assertEqual(difficulty.version, pool.version)
+
+    def test_reload(self):
+        difficulty = load_question_difficulty(get_question_pool(1))
+        with self.assertNumQueries(0):
+            self.assertIs(get_question_difficulty(get_question_pool(1)), difficulty)
+
+        invalidate_question_pools(1)
+        pool = get_question_pool(1)
+        with mock.patch('language_tests.difficulty.Thread') as thread:
+            # the difficulty of the old version is not served
+            self.assertIsNone(get_question_difficulty(pool))
+            self.assertIsNone(get_question_difficulty(pool))
+            thread.assert_called_once()
+
+    def test_refresh(self):
+        pool = get_question_pool(1)
+        difficulty = load_question_difficulty(pool)
+        with override_settings(
+                QUESTION_DIFFICULTY={
+                    **settings.QUESTION_DIFFICULTY,
+                    'REFRESH_INTERVAL': 0
+                }
+        ), mock.patch('language_tests.difficulty.Thread') as thread:
+            # the loaded difficulty is served while it is refreshed
+            with self.assertNumQueries(0):
+                self.assertIs(get_question_difficulty(pool), difficulty)
+            thread.assert_called_once()
+            # the thread closes its own connection
+            with mock.patch('language_tests.difficulty.connection'):
+                thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+
+        self.assertIsNot(get_question_difficulty(pool), difficulty)
+
+
+class SeenQuestionsTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**cls.users['active_user'])
+        cls.create_test_results(
+            [
+                TestResult(user=cls.user, question_id=i, answer_id=1)
+                for i in (1, 2, 2, 3)
+            ]
+        )
+
+    def test_set_is_built_from_results(self):
+        self.assertEqual(list(get_seen_questions(self.user.pk).ids), [1, 2, 3])
+        self.assertTrue(
+            UserSeenQuestions.objects.filter(user=self.user).exists()
+        )
+        with self.assertNumQueries(1):
+            get_seen_questions(self.user.pk)
+
+    def test_add_seen_questions(self):
+        self.create_test_results(
+            [TestResult(user=self.user, question_id=4, answer_id=1)]
+        )
+        add_seen_questions(self.user.pk, (4,))
+        self.assertEqual(
+            list(get_seen_questions(self.user.pk).ids),
+            [1, 2, 3, 4]
+        )
+        add_seen_questions(self.user.pk, (5, 1))
+        self.assertEqual(
+            list(get_seen_questions(self.user.pk).ids),
+            [1, 2, 3, 4, 5]
+        )
+
+
+class FragmentsTest(LanguageTestMixin, TestCase):
+
+    def test_question_fragments(self):
+        fragments = get_question_fragments((2, 1))
+        self.assertEqual([fragment['id'] for fragment in fragments], [1, 2])
+        self.assertEqual(fragments[0]['question'], 'question ___ 1')
+        self.assertEqual(
+            [answer['answer'] for answer in fragments[0]['answers']],
+            ['answer_1', 'answer_2', 'answer_3', 'answer_4']
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(get_question_fragments((1, 2)), fragments)
+
+    def test_question_fragments_order(self):
+        texts = ('b ___', 'B ___', 'a ___', 'é ___', 'e ___')
+        for i, text in enumerate(texts, start=1):
+            Question.objects.filter(id=i).update(question=text)
+            Answer.objects.filter(id=i).update(answer=text)
+        question = Question.objects.get(id=1)
+        question.answers.add(5)
+        ids = range(1, len(texts) + 1)
+
+        # sorted as Meta.ordering sorted them by the database
+        fragments = get_question_fragments(ids)
+        question_ids = [fragment['id'] for fragment in fragments]
+        self.assertEqual(
+            question_ids,
+            list(Question.objects.filter(id__in=ids).values_list('id', flat=True))
+        )
+        self.assertEqual(
+            [answer['id'] for answer in fragments[question_ids.index(1)]['answers']],
+            list(question.answers.values_list('id', flat=True))
+        )
+        # and so are the cached fragments
+        self.assertEqual(get_question_fragments(reversed(ids)), fragments)
+
+    def test_sort_key_of_collation(self):
+        connection = mock.MagicMock(vendor='postgresql')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        with mock.patch('language_tests.fragments._sort_key', None):
+            cursor.fetchone.return_value = ('C',)
+            load_sort_key(connection)
+            self.assertIs(_get_sort_key(), str)
+
+        with mock.patch('language_tests.fragments._sort_key', None):
+            cursor.fetchone.return_value = ('unknown_locale.UTF-8',)
+            with self.assertLogs('language_tests.fragments', 'WARNING'):
+                load_sort_key(connection)
+            self.assertIs(_get_sort_key(), str)
+
+        with mock.patch('language_tests.fragments._sort_key', None), \
+                mock.patch('language_tests.fragments.locale.setlocale') as setlocale:
+            cursor.fetchone.return_value = ('en_US.UTF-8',)
+            load_sort_key(connection)
+            setlocale.assert_called_once_with(locale.LC_COLLATE, 'en_US.UTF-8')
+            self.assertIs(_get_sort_key(), locale.strxfrm)
+
+    def test_question_fragment_invalidation(self):
+        get_question_fragments((1,))
+        question = Question.objects.get(id=1)
+        question.question = 'changed question ___ 1'
+        question.save()
+        self.assertEqual(
+            get_question_fragments((1,))[0]['question'],
+            'changed question ___ 1'
+        )
+
+        answer = Answer.objects.get(id=1)
+        answer.answer = 'changed_answer_1'
+        answer.save()
+        self.assertIn(
+            'changed_answer_1',
+            [i['answer'] for i in get_question_fragments((1,))[0]['answers']]
+        )
+
+        QuestionAnswer.objects.filter(question_id=1, answer_id=4).delete()
+        self.assertEqual(len(get_question_fragments((1,))[0]['answers']), 3)
+
+    def test_test_type_fragment(self):
+        self.assertEqual(
+            get_test_type_fragment(1),
+            {'id': 1, 'name': 'test_type_1'}
+        )
+        self.assertIsNone(
+            get_test_type_fragment(self.number_published_test_types + 1)
+        )
+        with self.assertNumQueries(0):
+            get_test_type_fragment(1)
+            get_test_type_fragment(self.number_published_test_types + 1)
+
+    def test_test_type_fragment_invalidation(self):
+        get_test_type_fragment(1)
+        LanguageTestType.objects.filter(id=1).update(is_published=False)
+        test_type = LanguageTestType.objects.get(id=1)
+        test_type.save()
+        self.assertIsNone(get_test_type_fragment(1))
+
+
+class UpsertAnswersTest(LanguageTestMixin, TestCase):
+
+    def test_upsert_answers(self):
+        existing_answers = dict(
+            Answer.objects.filter(id__in=(1, 2)).values_list('answer', 'id')
+        )
+        answer_ids = upsert_answers([*existing_answers, 'new_answer', 'new_answer'])
+        self.assertEqual(
+            answer_ids,
+            {
+                **existing_answers,
+                'new_answer': Answer.objects.get(answer='new_answer').id,
+            }
+        )
+        self.assertEqual(
+            upsert_answers(['new_answer']),
+            {'new_answer': answer_ids['new_answer']}
+        )
+
+
+class QuestionAnswerIndexTest(LanguageTestMixin, TestCase):
+
+    def get_question_answers(self, question_id: int) -> QuestionAnswers:
+        question_answers = QuestionAnswer.objects.filter(question_id=question_id)
+        return QuestionAnswers(
+            frozenset(question_answers.values_list('answer_id', flat=True)),
+            question_answers.filter(is_right_answer=True).values_list(
+                'answer_id',
+                flat=True
+            ).first()
+        )
+
+    def test_question_answers(self):
+        missing_id = Question.objects.count() + 1
+        question_answers = get_question_answers((1, 2, missing_id))
+        self.assertEqual(
+            question_answers,
+            {1: self.get_question_answers(1), 2: self.get_question_answers(2)}
+        )
+        self.assertEqual(question_answers[1].right_answer_id, 1)
+        with self.assertNumQueries(0):
+            get_question_answers((1, 2))
+
+    def test_question_answers_invalidation(self):
+        get_question_answers((1,))
+        QuestionAnswer.objects.filter(
+            question_id=1,
+            is_right_answer=False
+        ).first().delete()
+        self.assertEqual(
+            get_question_answers((1,))[1],
+            self.get_question_answers(1)
+        )
+
+        question_answer = QuestionAnswer.objects.get(
+            question_id=1,
+            is_right_answer=True
+        )
+        question_answer.is_right_answer = False
+        question_answer.save()
+        self.assertIsNone(get_question_answers((1,))[1].right_answer_id)
+
+
+class GenerateQuestionsListTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**cls.users['active_user'])
+
+    def test_anonymous_user(self):
+        questions = generate_questions_list(1, AnonymousUser())
+        ids = [question['id'] for question in questions]
+        self.assertEqual(len(ids), self.default_number_test_questions)
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(i in get_question_pool(1) for i in ids))
+
+    @override_settings(QUESTION_POOL_MAX_SIZE=5)
+    def test_big_pool(self):
+        questions = generate_questions_list(1, AnonymousUser())
+        self.assertEqual(len(questions), self.default_number_test_questions)
+
+    def test_questions_are_reproducible(self):
+        self.assertEqual(
+            list(generate_questions_list(1, AnonymousUser(), rng=Random(1))),
+            list(generate_questions_list(1, AnonymousUser(), rng=Random(1)))
+        )
+
+    def test_user_gets_unused_questions(self):
+        pool = get_question_pool(1)
+        used_ids = pool.ids[:len(pool) - self.default_number_test_questions]
+        self.create_test_results(
+            [
+                TestResult(user=self.user, question_id=i, answer_id=1)
+                for i in used_ids
+            ]
+        )
+        questions = generate_questions_list(1, self.user)
+        ids = {question['id'] for question in questions}
+        self.assertEqual(len(ids), self.default_number_test_questions)
+        self.assertFalse(ids & set(used_ids))
+
+    def test_user_gets_used_questions_if_pool_is_exhausted(self):
+        pool = get_question_pool(1)
+        self.create_test_results(
+            [
+                TestResult(user=self.user, question_id=i, answer_id=1)
+                for i in pool.ids
+            ]
+        )
+        questions = generate_questions_list(1, self.user)
+        self.assertEqual(len(questions), self.default_number_test_questions)
+
+
+class TestResultWriterTest(LanguageTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**cls.users['active_user'])
+
+    def get_test_results(self, number: int) -> list[TestResult]:
+        return [
+            TestResult(user=self.user, question_id=i, answer_id=1)
+            for i in range(1, number + 1)
+        ]
+
+    def test_results_are_buffered(self):
+        writer = TestResultWriter(max_size=10, autostart=False)
+        writer.submit(self.get_test_results(5))
+        self.assertFalse(TestResult.objects.exists())
+        self.assertEqual(writer.get_stats()['buffered_results'], 5)
+
+        writer.flush()
+        stats = writer.get_stats()
+        self.assertEqual(TestResult.objects.count(), 5)
+        self.assertEqual(
+            list(get_seen_questions(self.user.pk).ids),
+            [1, 2, 3, 4, 5]
+        )
+        self.assertEqual(stats['buffered_results'], 0)
+        self.assertEqual(stats['flushed_batches'], 1)
+        self.assertEqual(stats['flushed_results'], 5)
+        self.assertGreaterEqual(stats['flush_latency_seconds_max'], 0)
+
+    def test_results_are_saved_if_buffer_is_full(self):
+        writer = TestResultWriter(max_size=4, autostart=False)
+        writer.submit(self.get_test_results(5))
+        self.assertEqual(TestResult.objects.count(), 5)
+        self.assertEqual(writer.get_stats()['synchronous_results'], 5)
+
+    def test_stop(self):
+        writer = TestResultWriter(max_size=10, autostart=False)
+        writer.submit(self.get_test_results(5))
+        writer.stop()
+        self.assertEqual(TestResult.objects.count(), 5)
+        writer.submit(self.get_test_results(1))
+        self.assertEqual(TestResult.objects.count(), 6)
+
+    def test_results_are_flushed_in_batches(self):
+        writer = TestResultWriter(max_size=10, batch_size=2, autostart=False)
+        writer.submit(self.get_test_results(5))
+        writer.flush()
+        stats = writer.get_stats()
+        self.assertEqual(TestResult.objects.count(), 5)
+        self.assertEqual(stats['flushed_batches'], 3)
+        self.assertEqual(stats['flushed_results'], 5)
+
+    def test_invalid_results_are_dropped(self):
+        def save(test_results):
+            if any(test_result.question_id == 3 for test_result in test_results):
+                raise IntegrityError
+            save_test_results(test_results)
+
+        writer = TestResultWriter(max_size=10, autostart=False)
+        writer.submit(self.get_test_results(5))
+        with mock.patch('language_tests.write_behind.save_test_results', save), \
+                self.assertLogs('language_tests.write_behind', 'ERROR'):
+            writer.flush()
+        stats = writer.get_stats()
+        self.assertEqual(
+            list(TestResult.objects.order_by('question_id').values_list('question_id', flat=True)),
+            [1, 2, 4, 5]
+        )
+        self.assertEqual(stats['dropped_results'], 1)
+        self.assertEqual(stats['buffered_results'], 0)
+
+    def test_failed_batch_is_requeued(self):
+        writer = TestResultWriter(max_size=10, batch_size=5, autostart=False)
+
+        def save(test_results):
+            # the buffer is filled up while the batch is being saved
+            writer.submit(self.get_test_results(8))
+            raise OperationalError
+
+        writer.submit(self.get_test_results(5))
+        with mock.patch('language_tests.write_behind.save_test_results', save):
+            with self.assertRaises(OperationalError):
+                writer.flush()
+        stats = writer.get_stats()
+        self.assertEqual(stats['buffered_results'], 10)
+        self.assertEqual(stats['failed_flushes'], 1)
+        self.assertEqual(stats['dropped_results'], 3)
+
+    def test_stop_does_not_raise(self):
+        writer = TestResultWriter(max_size=10, autostart=False)
+        writer.submit(self.get_test_results(5))
+        with mock.patch(
+                'language_tests.write_behind.save_test_results',
+                side_effect=OperationalError
+        ), self.assertLogs('language_tests.write_behind', 'ERROR'):
+            writer.stop()
+        self.assertFalse(TestResult.objects.exists())
@@ -0,0 +1,132 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .. import metrics, throttling
+from ..metrics import render_metrics
+from ..throttling import CacheBucketStore, LocalBucketStore, take_token
+from .utils import LanguageTestMixin, User
+
+
+RATES = {
+    'language_test_anon': '2/min',
+    'language_test_user': '3/min',
+    'test_result_anon': '2/min',
+    'test_result_user': '3/min',
+}
+
+
+class TokenBucketTest(SimpleTestCase):
+
+    def test_take_token(self):
+        # 3 tokens, a token every 10 seconds
+        full_at = None
+        for now in (0, 0, 0):
+            full_at, wait = take_token(full_at, now, 10, 30)
+            self.assertEqual(wait, 0)
+        self.assertEqual(full_at, 30)
+
+        self.assertEqual(take_token(full_at, 5, 10, 30), (30, 5))
+        self.assertEqual(take_token(full_at, 10, 10, 30), (40, 0))
+        # a bucket full again
+        self.assertEqual(take_token(full_at, 100, 10, 30), (110, 0))
+
+    def test_stores(self):
+        for store in (LocalBucketStore(max_size=10), CacheBucketStore(cache)):
+            cache.clear()
+            self.assertEqual(store.take('a', 0, 10, 20), 0)
+            self.assertEqual(store.take('a', 0, 10, 20), 0)
+            self.assertEqual(store.take('a', 0, 10, 20), 10)
+            self.assertEqual(store.take('b', 0, 10, 20), 0)
+            self.assertEqual(store.take('a', 10, 10, 20), 0)
+
+    def test_local_store_max_size(self):
+        store = LocalBucketStore(max_size=2)
+        for key in ('a', 'b', 'a', 'c'):
+            store.take(key, 0, 10, 10)
+        # the least recently used bucket is dropped
+        self.assertEqual(list(store._buckets), ['a', 'c'])
+
+
+@override_settings(
+    THROTTLING={'RATES': RATES, 'CACHE': 'default', 'MAX_LOCAL_BUCKETS': 10}
+)
+class ThrottlingViewsTest(LanguageTestMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.active_user = User.objects.create_user(**cls.users['active_user'])
+        cls.active_user_token = Token.objects.create(user=cls.active_user)
+
+    def setUp(self):
+        super().setUp()
+        metrics._registry = None
+        self.addCleanup(setattr, metrics, '_registry', None)
+        throttling._local_store = None
+        self.addCleanup(setattr, throttling, '_local_store', None)
+
+    def get_language_test(self, **extra):
+        return self.client.get(reverse('language_test', kwargs={'pk': 1}), **extra)
+
+    def test_anonymous(self):
+        for _ in range(2):
+            self.assertEqual(self.get_language_test().status_code, 200)
+        response = self.get_language_test()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # an other address and the authenticated user have own buckets
+        response = self.get_language_test(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        self.assertEqual(self.get_language_test().status_code, 200)
+
+        lines = render_metrics(metrics.get_metrics_registry().collect()).splitlines()
+        self.assertIn(
+            'http_throttled_requests_total{view="language_test",'
+            'scope="language_test_anon"} 1',
+            lines
+        )
+
+    def test_user(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        statuses = [
+            self.get_language_test(REMOTE_ADDR=f'10.0.0.{i}').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_test_result(self):
+        statuses = [
+            self.client.post(
+                reverse('test_result'),
+                {'test_type_id': 1, 'user_answers': []},
+                format='json'
+            ).status_code
+            for _ in range(3)
+        ]
+        self.assertNotEqual(statuses[1], 429)
+        self.assertEqual(statuses[2], 429)
+
+    def test_local_store(self):
+        with self.settings(
+                THROTTLING={'RATES': RATES, 'CACHE': '', 'MAX_LOCAL_BUCKETS': 10}
+        ):
+            statuses = [self.get_language_test().status_code for _ in range(3)]
+            cache.clear()
+            # the buckets are not in the cache
+            statuses.append(self.get_language_test().status_code)
+        self.assertEqual(statuses, [200, 200, 429, 429])
+
+    def test_not_throttled(self):
+        with self.settings(
+                THROTTLING={'RATES': {}, 'CACHE': 'default', 'MAX_LOCAL_BUCKETS': 10}
+        ):
+            for _ in range(5):
+                self.assertEqual(self.get_language_test().status_code, 200)
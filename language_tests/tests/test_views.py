@@ -1,10 +1,28 @@
+import gzip
 import json
+from unittest import mock
 
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TransactionTestCase, override_settings
 from django.urls import reverse
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
+from ..async_views import run_in_thread_pool
+from ..catalog import invalidate_catalog
+from ..fragments import get_question_fragments
+from ..models import (
+    Answer,
+    LanguageTestType,
+    Question,
+    QuestionAnswer,
+    UserTestTypeStats
+)
+from ..pools import get_question_pool
+from ..seen_questions import get_seen_questions
+from ..views import LanguageTestTypeListView, LanguageTestView
+from ..write_behind import TestResultWriter
 from .utils import LanguageTestMixin
 
 
@@ -119,6 +137,54 @@ class LanguageTestTest(LanguageTestViewsMixin, APITestCase):
             sorted(language_test['questions'], key=lambda x: x['id'])
         )
 
+    def test_questions_are_cached(self):
+        url = reverse(self.path_name, kwargs={'pk': 1})
+        get_question_fragments(get_question_pool(1).ids)
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_compressed(self):
+        url = reverse(self.path_name, kwargs={'pk': 1})
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        language_test = json.loads(gzip.decompress(response.content))
+        self.assertEqual(
+            len(language_test['questions']),
+            self.default_number_test_questions
+        )
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(response.content)['questions']), 10)
+
+    def test_difficulty(self):
+        url = reverse(self.path_name, kwargs={'pk': 1})
+        get_question_fragments(get_question_pool(1).ids)
+        with mock.patch('language_tests.difficulty.Thread') as thread:
+            response = self.client.get(url, {'difficulty': 'hard'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(response.json()['questions']),
+                self.default_number_test_questions
+            )
+            # the difficulty of the questions is loaded in the background
+            thread.assert_called_once()
+            with mock.patch('language_tests.difficulty.connection'):
+                thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'difficulty': 'hard'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, {'difficulty': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
 
 class LanguageTestTypeListTest(LanguageTestViewsMixin, APITestCase):
     path_name = 'language_test_type_list'
@@ -136,7 +202,109 @@ class LanguageTestTypeListTest(LanguageTestViewsMixin, APITestCase):
         url = reverse(self.path_name)
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), self.number_published_test_types)
+        self.assertEqual(len(response.json()), self.number_published_test_types)
+
+    def test_conditional_get(self):
+        url = reverse(self.path_name)
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            not_modified_response = self.client.get(
+                url,
+                HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(not_modified_response.status_code, 304)
+
+        not_modified_response = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(not_modified_response.status_code, 304)
+
+    # the catalog of the fixtures is smaller than the default MIN_SIZE
+    @override_settings(
+        RESPONSE_COMPRESSION={'GZIP_LEVEL': 6, 'BROTLI_QUALITY': 5, 'MIN_SIZE': 0}
+    )
+    def test_compressed_once_per_version(self):
+        url = reverse(self.path_name)
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertFalse(response['ETag'].startswith('W/'))
+
+        with mock.patch('language_tests.compression.compress') as compress:
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(
+            len(json.loads(gzip.decompress(response.content))),
+            self.number_published_test_types
+        )
+
+        not_modified_response = self.client.get(
+            url,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified_response.status_code, 304)
+
+        LanguageTestType.objects.filter(id=1).update(name='new_name')
+        invalidate_catalog()
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content))[0]['name'],
+            'new_name'
+        )
+
+    def test_etag_changes_with_test_types(self):
+        url = reverse(self.path_name)
+        etag = self.client.get(url)['ETag']
+        test_type = LanguageTestType.objects.get(id=1)
+        test_type.is_published = False
+        test_type.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            len(response.json()),
+            self.number_published_test_types - 1
+        )
+
+
+class AsyncViewsTest(LanguageTestMixin, TransactionTestCase):
+
+    def test_language_test_type_list(self):
+        view = run_in_thread_pool(LanguageTestTypeListView.as_view())
+        request = RequestFactory().get('/api/tests/')
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(json.loads(response.content)),
+            self.number_published_test_types
+        )
+
+    def test_language_test(self):
+        view = run_in_thread_pool(LanguageTestView.as_view())
+        response = async_to_sync(view)(RequestFactory().get('/api/tests/1/'), pk=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(json.loads(response.content)['questions']),
+            self.default_number_test_questions
+        )
+
+        response = async_to_sync(view)(
+            RequestFactory().get('/api/tests/1000/'),
+            pk=1000
+        )
+        self.assertEqual(response.status_code, 404)
 
 
 class LanguageTestTypeTest(LanguageTestViewsMixin, APITestCase):
@@ -266,6 +434,59 @@ class QuestionTest(LanguageTestViewsMixin, APITestCase):
         self.assertTrue(login)
         self.assertEqual(response.status_code, 403)
 
+    def test_create_list_of_questions(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.admin_token.key
+        )
+        new_questions = [
+            {**self.new_question, 'question': f'new question ___ {i}'}
+            for i in range(1, 4)
+        ]
+        new_questions[2]['answers'] = [
+            {'answer': 'new_answer_1', 'is_right_answer': False, },
+            {'answer': 'answer_2', 'is_right_answer': True, },
+            {'answer': 'answer_3', 'is_right_answer': False, },
+            {'answer': 'answer_4', 'is_right_answer': False, },
+        ]
+        number_answers = Answer.objects.count()
+        response = self.client.post(
+            reverse(self.path_name),
+            new_questions,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), new_questions)
+        self.assertEqual(Answer.objects.count(), number_answers + 1)
+        for new_question in new_questions:
+            question = Question.objects.get(question=new_question['question'])
+            self.assertEqual(
+                sorted(
+                    question.questionanswer_set.values_list(
+                        'answer__answer',
+                        'is_right_answer'
+                    )
+                ),
+                sorted(
+                    (answer['answer'], answer['is_right_answer'])
+                    for answer in new_question['answers']
+                )
+            )
+            self.assertIn(question.pk, get_question_pool(1))
+
+    def test_HTTP400_for_duplicate_questions(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.admin_token.key
+        )
+        response = self.client.post(
+            reverse(self.path_name),
+            [self.new_question, self.new_question],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(
+            Question.objects.filter(question=self.new_question['question'])
+        )
+
 
 class TestResultTest(LanguageTestViewsMixin, APITestCase):
     path_name = 'test_result'
@@ -328,6 +549,46 @@ class TestResultTest(LanguageTestViewsMixin, APITestCase):
             self.assertEqual(response.status_code, 201)
             self.assertEqual(right_answers, _right_answers)
 
+    def test_cached_answers_without_queries(self):
+        user_answers, right_answers = self.get_answers('wrong')
+        self.client.post(reverse(self.path_name), user_answers, format='json')
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                reverse(self.path_name),
+                user_answers,
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(response.json()['right_answers'], key=lambda x: x['question_id']),
+            right_answers
+        )
+
+    def test_right_answers_order(self):
+        user_answers, _ = self.get_answers('correct')
+        response = self.client.post(
+            reverse(self.path_name),
+            user_answers,
+            format='json'
+        )
+        # ordered by the question texts as the QuestionAnswer queryset was
+        right_answers = QuestionAnswer.objects.filter(
+            question_id__in=range(1, self.default_number_test_questions + 1),
+            is_right_answer=True
+        ).order_by(
+            'question__question',
+            'question_id'
+        ).values(
+            'question_id',
+            'answer_id'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['right_answers'], list(right_answers))
+        self.assertNotEqual(
+            response.json()['right_answers'],
+            sorted(response.json()['right_answers'], key=lambda x: x['question_id'])
+        )
+
     def test_correct_answers_in_response(self):
         self.client.credentials(
             HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
@@ -349,3 +610,262 @@ class TestResultTest(LanguageTestViewsMixin, APITestCase):
         self.assertTrue(login)
         self.assertEqual(response.status_code, 201)
         self.assertEqual(right_answers, _right_answers)
+
+    def test_user_answers_are_saved(self):
+        user_answers, _ = self.get_answers('correct')
+        user_answers = {'user_id': self.active_user.pk, **user_answers}
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        response = self.client.post(
+            reverse(self.path_name),
+            user_answers,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.active_user.testresult_set.count(),
+            self.default_number_test_questions
+        )
+        self.assertEqual(
+            list(get_seen_questions(self.active_user.pk).ids),
+            list(range(1, self.default_number_test_questions + 1))
+        )
+
+    def test_answers_of_other_users_are_not_saved(self):
+        user_answers, _ = self.get_answers('correct')
+        user_answers = {'user_id': self.active_user.pk, **user_answers}
+        response = self.client.post(
+            reverse(self.path_name),
+            user_answers,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.admin_token.key
+        )
+        response = self.client.post(
+            reverse(self.path_name),
+            user_answers,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(self.active_user.testresult_set.exists())
+
+    @override_settings(
+        TEST_RESULTS_WRITE_BEHIND={
+            'ENABLED': True,
+            'MAX_SIZE': 100,
+            'BATCH_SIZE': 100,
+            'FLUSH_INTERVAL': 1,
+        }
+    )
+    def test_user_answers_are_saved_with_write_behind(self):
+        writer = TestResultWriter(autostart=False)
+        user_answers, right_answers = self.get_answers('wrong')
+        user_answers = {'user_id': self.active_user.pk, **user_answers}
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        with mock.patch('language_tests.write_behind._writer', writer):
+            response = self.client.post(
+                reverse(self.path_name),
+                user_answers,
+                format='json'
+            )
+        _right_answers = sorted(
+            response.json()['right_answers'],
+            key=lambda x: x['question_id']
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(right_answers, _right_answers)
+        self.assertFalse(self.active_user.testresult_set.exists())
+
+        writer.flush()
+        self.assertEqual(
+            self.active_user.testresult_set.count(),
+            self.default_number_test_questions
+        )
+
+
+class UserTestTypeStatsTest(LanguageTestViewsMixin, APITestCase):
+    path_name = 'user_test_type_stats'
+
+    def save_answers(self, answer_id: int) -> None:
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        response = self.client.post(
+            reverse('test_result'),
+            {
+                'user_id': self.active_user.pk,
+                'user_answers': [
+                    {'question_id': i, 'answer_id': answer_id, }
+                    for i in range(1, self.default_number_test_questions + 1)
+                ]
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_view_url_exists_at_desired_location(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        response = self.client.get('/api/tests/stats/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_user(self):
+        response = self.client.get(reverse(self.path_name))
+        self.assertEqual(response.status_code, 401)
+
+    def test_stats_are_updated_with_results(self):
+        self.save_answers(1)
+        self.save_answers(4)
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        # the token and the statistics
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse(self.path_name))
+
+        stats = UserTestTypeStats.objects.get(user=self.active_user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    'test_type': stats.test_type_id,
+                    'test_type_name': stats.test_type.name,
+                    'attempted': 2 * self.default_number_test_questions,
+                    'correct': self.default_number_test_questions,
+                    'last_activity': response.json()[0]['last_activity'],
+                },
+            ]
+        )
+        self.assertEqual(
+            stats.last_activity,
+            self.active_user.testresult_set.latest('solution_date').solution_date
+        )
+
+    def test_stats_of_other_users_are_hidden(self):
+        self.save_answers(1)
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.admin_token.key
+        )
+        response = self.client.get(reverse(self.path_name))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+
+class LeaderboardTest(LanguageTestViewsMixin, APITestCase):
+    path_name = 'leaderboard'
+
+    def save_answers(self, user: User, answer_id: int, token: Token) -> None:
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        response = self.post_answers(user, answer_id)
+        self.client.credentials()
+        self.assertEqual(response.status_code, 201)
+
+    def post_answers(self, user: User, answer_id: int):
+        return self.client.post(
+            reverse('test_result'),
+            {
+                'user_id': user.pk,
+                'user_answers': [
+                    {'question_id': i, 'answer_id': answer_id, }
+                    for i in range(1, self.default_number_test_questions + 1)
+                ]
+            },
+            format='json'
+        )
+
+    def test_view_url_exists_at_desired_location(self):
+        response = self.client.get('/api/tests/1/leaderboard/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_test_type(self):
+        response = self.client.get(reverse(self.path_name, kwargs={'pk': 99}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_limit(self):
+        for limit in ('0', '1000', 'x'):
+            response = self.client.get(
+                reverse(self.path_name, kwargs={'pk': 1}),
+                {'limit': limit}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_top_and_rank(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.save_answers(self.active_user, 4, self.active_user_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.save_answers(self.admin, 1, self.admin_token)
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        response = self.client.get(
+            reverse(self.path_name, kwargs={'pk': 1}),
+            {'limit': 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                'test_type': 1,
+                'size': 2,
+                'top': [
+                    {
+                        'rank': 1,
+                        'user_id': self.admin.pk,
+                        'username': self.admin.username,
+                        'score': self.default_number_test_questions,
+                    },
+                ],
+                'me': {'rank': 2, 'score': 0},
+            }
+        )
+
+    def test_anonymous_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.save_answers(self.admin, 1, self.admin_token)
+        response = self.client.get(reverse(self.path_name, kwargs={'pk': 1}))
+        self.assertEqual(response.status_code, 200)
+        # the users are not disclosed
+        self.assertEqual(
+            response.json(),
+            {
+                'test_type': 1,
+                'size': 1,
+                'top': [{'rank': 1, 'score': self.default_number_test_questions}],
+                'me': None,
+            }
+        )
+
+    def test_answers_in_the_name_of_other_users(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.save_answers(self.active_user, 4, self.active_user_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.save_answers(self.admin, 1, self.admin_token)
+        url = reverse(self.path_name, kwargs={'pk': 1})
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        self.assertEqual(self.client.get(url).json()['me'], {'rank': 2, 'score': 0})
+
+        # an anonymous caller and another user post right answers for the user
+        self.client.credentials()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_answers(self.active_user, 1)
+        self.assertEqual(response.status_code, 201)
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.admin_token.key
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_answers(self.active_user, 1)
+        self.assertEqual(response.status_code, 201)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.active_user_token.key
+        )
+        self.assertEqual(self.client.get(url).json()['me'], {'rank': 2, 'score': 0})
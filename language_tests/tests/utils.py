@@ -2,6 +2,8 @@ from datetime import datetime
 from typing import Sequence
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
 from django.utils import timezone
 
 from ..models import TestResult
@@ -55,6 +57,17 @@ class LanguageTestMixin:
         'question_answers',
     ]
 
+    def setUp(self):
+        super().setUp()
+        # in-process caches are versioned through the django cache, which
+        # is not rolled back together with the test transaction
+        cache.clear()
+        # the replicas are test mirrors, which do not see the data of the
+        # test transaction
+        replicas_override = override_settings(DATABASE_REPLICAS=[])
+        replicas_override.enable()
+        self.addCleanup(replicas_override.disable)
+
     @staticmethod
     def create_test_results(
             test_results: Sequence[TestResult]
@@ -0,0 +1,177 @@
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Union
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from rest_framework.throttling import SimpleRateThrottle
+
+from .metrics import UNRESOLVED_VIEW, get_metrics_registry
+
+
+THROTTLE_KEY_PREFIX = 'language_tests:throttle'
+
+
+def take_token(
+        full_at: Optional[float],
+        now: float,
+        interval: float,
+        duration: float
+) -> tuple[float, float]:
+    """
+    Takes a token of a bucket of ``duration / interval`` tokens which gets a
+    token every ``interval`` seconds. The bucket is kept as the time when it
+    is full again, ``None`` for a full bucket.
+
+    Returns the new time when the bucket is full and the seconds to wait for
+    a token, 0 when the token is taken. The bucket is not changed without a
+    token.
+    """
+    new_full_at = max(full_at or now, now) + interval
+    wait = new_full_at - now - duration
+    if wait > 0:
+        return full_at, wait
+
+    return new_full_at, 0.0
+
+
+class LocalBucketStore:
+    """
+    Buckets of one process, the least recently used ones are dropped above
+    ``max_size``.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._buckets: OrderedDict[str, float] = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key: str, now: float, interval: float, duration: float) -> float:
+        with self._lock:
+            full_at, wait = take_token(self._buckets.get(key), now, interval, duration)
+            # the buckets of the throttled clients are used too
+            self._buckets[key] = full_at
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+
+class CacheBucketStore:
+    """
+    Buckets shared by the processes which use the cache. A bucket is read and
+    written without a lock, concurrent requests of one client may take the
+    same token, as with the throttles of DRF.
+    """
+
+    def __init__(self, cache: BaseCache):
+        self.cache = cache
+
+    def take(self, key: str, now: float, interval: float, duration: float) -> float:
+        full_at, wait = take_token(self.cache.get(key), now, interval, duration)
+        if not wait:
+            # the bucket is full at this time, then the key is not needed
+            self.cache.set(key, full_at, timeout=math.ceil(full_at - now))
+
+        return wait
+
+
+_local_store: Optional[LocalBucketStore] = None
+_local_store_lock = Lock()
+
+
+def get_bucket_store() -> Union[LocalBucketStore, CacheBucketStore]:
+    options = settings.THROTTLING
+    if options['CACHE']:
+        return CacheBucketStore(caches[options['CACHE']])
+
+    global _local_store
+
+    if _local_store is None:
+        with _local_store_lock:
+            if _local_store is None:
+                _local_store = LocalBucketStore(options['MAX_LOCAL_BUCKETS'])
+
+    return _local_store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Throttle of the ``throttle_scope`` of a view with the rates of
+    ``THROTTLING['RATES']``: the rate "N/period" allows bursts of N requests
+    and a request every period / N on average. A request takes constant time,
+    the rejected ones are counted by the metrics.
+    """
+    # added to the throttle_scope of the view
+    scope_suffix = ''
+    timer = time.time
+
+    def __init__(self):
+        # the rate depends on the view
+        pass
+
+    def get_rate(self) -> Optional[str]:
+        return settings.THROTTLING['RATES'].get(self.scope)
+
+    def allow_request(self, request, view) -> bool:
+        self.scope = f'{view.throttle_scope}_{self.scope_suffix}'
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        ident = self.get_client_ident(request)
+        if ident is None:
+            return True
+
+        self.wait_time = get_bucket_store().take(
+            f'{THROTTLE_KEY_PREFIX}:{self.scope}:{ident}',
+            self.timer(),
+            self.duration / self.num_requests,
+            self.duration
+        )
+        if not self.wait_time:
+            return True
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        get_metrics_registry().observe_throttled(
+            view=resolver_match.view_name if resolver_match else UNRESOLVED_VIEW,
+            scope=self.scope
+        )
+        return False
+
+    def get_client_ident(self, request) -> Optional[str]:
+        raise NotImplementedError
+
+    def wait(self) -> float:
+        return self.wait_time
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttles the anonymous requests by the ip address.
+    """
+    scope_suffix = 'anon'
+
+    def get_client_ident(self, request) -> Optional[str]:
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttles the requests of the authenticated users by the user.
+    """
+    scope_suffix = 'user'
+
+    def get_client_ident(self, request) -> Optional[str]:
+        if request.user and request.user.is_authenticated:
+            return str(request.user.pk)
+        return None
+
+
+THROTTLE_CLASSES = (AnonTokenBucketThrottle, UserTokenBucketThrottle)
@@ -24,3 +24,16 @@ def validate_question(question: str) -> None:
             'пробелов или знаков препинания.',
             code='invalid_question_text'
         )
+
+
+def validate_question_answers(answers: dict[str, bool]) -> None:
+    if len(answers) != 4:
+        raise ValidationError(
+            'Invalid data. The question must have 4 answers.',
+            code='invalid_number_answers'
+        )
+    if sum(is_right_answer for is_right_answer in answers.values()) != 1:
+        raise ValidationError(
+            'Invalid data. The question must have 1 correct answer. ',
+            code='invalid_number_right_answers'
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .routers import pin_reads_to_primary
+
+
+VERSION_KEY_PREFIX = 'language_tests:version'
+
+
+def get_version(name: str) -> int:
+    key = _get_version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # a lost counter restarts from the current time, so a version that
+        # was handed out before the cache was flushed is never reused
+        cache.add(key, _get_initial_version(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_version(name: str) -> int:
+    # the version is bumped again after the commit, otherwise data read by
+    # other processes before the commit would be cached as the new version
+    transaction.on_commit(lambda: _increment_version(name))
+    # the data cached under the new version must not come from a lagging
+    # replica
+    pin_reads_to_primary()
+
+    return _increment_version(name)
+
+
+def _increment_version(name: str) -> int:
+    key = _get_version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _get_initial_version(), timeout=None)
+        return cache.get(key)
+
+
+def _get_version_key(name: str) -> str:
+    return f'{VERSION_KEY_PREFIX}:{name}'
+
+
+def _get_initial_version() -> int:
+    return time.time_ns() // 1000
@@ -1,82 +1,226 @@
 from typing import OrderedDict
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Prefetch, QuerySet
-from django.http import Http404
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, HttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 
-from .models import Answer, LanguageTestType, Question, QuestionAnswer
+from .answer_index import get_question_answers
+from .async_views import run_in_thread_pool
+from .catalog import (
+    get_catalog_contents,
+    get_catalog_etag,
+    get_catalog_last_modified
+)
+from .compression import encode_response
+from .fragments import get_question_fragments, get_test_type_fragment
+from .leaderboards import get_leaderboard
+from .metrics import get_metrics_registry, render_metrics
+from .models import Answer, LanguageTestType, Question, UserTestTypeStats
+from .renderers import FastJSONRenderer, JSON_RENDERER_CLASSES, PrometheusRenderer
+from .routers import replica_reads
 from .serializers import (
     AnswerSerializer,
+    LanguageTestQuerySerializer,
     LanguageTestSerializer,
     LanguageTestTypeReadOnlySerializer,
     LanguageTestTypeSerializer,
+    LeaderboardQuerySerializer,
     QuestionSerializer,
-    TestResultSerializer
+    TestResultSerializer,
+    UserTestTypeStatsSerializer
 )
 from .services import generate_questions_list
+from .throttling import THROTTLE_CLASSES
 
 
 class AnswerView(generics.CreateAPIView):
     queryset = Answer.objects.all()
     permission_classes = (permissions.IsAdminUser,)
+    renderer_classes = JSON_RENDERER_CLASSES
     serializer_class = AnswerSerializer
 
 
+@method_decorator(
+    cache_control(public=True, max_age=settings.TEST_TYPES_CACHE_MAX_AGE),
+    name='get'
+)
+@method_decorator(vary_on_headers('Accept', 'Accept-Encoding'), name='get')
+@method_decorator(
+    condition(
+        etag_func=get_catalog_etag,
+        last_modified_func=get_catalog_last_modified
+    ),
+    name='get'
+)
 class LanguageTestTypeListView(generics.ListAPIView):
     queryset = LanguageTestType.objects.filter(is_published=True)
     permission_classes = (permissions.AllowAny,)
+    renderer_classes = JSON_RENDERER_CLASSES
     serializer_class = LanguageTestTypeReadOnlySerializer
 
+    def get(self, request, *args, **kwargs):
+        with replica_reads(request.user.pk):
+            return super().get(request, *args, **kwargs)
+
+    def get_test_types(self) -> list[dict]:
+        test_types = self.get_queryset().values('id', 'name')
+        return [
+            LanguageTestTypeReadOnlySerializer.to_fast_representation(i)
+            for i in test_types
+        ]
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, FastJSONRenderer):
+            return Response(self.get_test_types())
+
+        # the json is cached with its compressed encodings by catalog version
+        contents = get_catalog_contents(
+            lambda: renderer.render(self.get_test_types())
+        )
+        response = HttpResponse(
+            contents['identity'],
+            content_type=renderer.media_type
+        )
+        response['ETag'] = get_catalog_etag(request)
+
+        return encode_response(request, response, contents)
+
 
 class LanguageTestTypeView(generics.CreateAPIView):
     queryset = LanguageTestType.objects.all()
     permission_classes = (permissions.IsAdminUser,)
+    renderer_classes = JSON_RENDERER_CLASSES
     serializer_class = LanguageTestTypeSerializer
 
 
 class LanguageTestView(generics.RetrieveAPIView):
+    queryset = LanguageTestType.objects.filter(is_published=True)
     permission_classes = (permissions.AllowAny,)
+    renderer_classes = JSON_RENDERER_CLASSES
     serializer_class = LanguageTestSerializer
+    throttle_classes = THROTTLE_CLASSES
+    throttle_scope = 'language_test'
 
     def get(self, request, *args, **kwargs):
-        try:
-            LanguageTestType.objects.get(pk=kwargs['pk'], is_published=True)
-        except ObjectDoesNotExist:
-            raise Http404 from None
-        setattr(request, 'test_type_id', kwargs['pk'])
-
-        return super().get(request, *args, **kwargs)
-
-    def get_queryset(self) -> QuerySet:
-        test_type_id, user = self.request.test_type_id, self.request.user
-        questions = generate_questions_list(test_type_id, user)
-        prefetch = Prefetch('questions', queryset=questions)
-        language_test = LanguageTestType.objects.only(
-            'id',
-            'name'
-        ).prefetch_related(
-            prefetch
+        query = LanguageTestQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        # the response is assembled from the cached fragments, so neither
+        # the ORM nor the serializers are used for the questions
+        with replica_reads(request.user.pk):
+            language_test = get_test_type_fragment(kwargs['pk'])
+            if language_test is None:
+                raise Http404
+            questions = generate_questions_list(
+                language_test['id'],
+                request.user,
+                difficulty=query.validated_data.get('difficulty')
+            )
+
+        return Response({**language_test, 'questions': questions})
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # the tests are random, so they are compressed on every request
+        response.add_post_render_callback(
+            lambda rendered_response: encode_response(request, rendered_response)
         )
+        return response
+
 
-        return language_test
+class LeaderboardView(generics.GenericAPIView):
+    # used by the schema generation, the leaderboards are in memory
+    queryset = LanguageTestType.objects.filter(is_published=True)
+    permission_classes = (permissions.AllowAny,)
+    renderer_classes = JSON_RENDERER_CLASSES
+    serializer_class = LeaderboardQuerySerializer
+
+    def get(self, request, *args, **kwargs):
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        with replica_reads(request.user.pk):
+            language_test = get_test_type_fragment(kwargs['pk'])
+            if language_test is None:
+                raise Http404
+            leaderboard = get_leaderboard(language_test['id'])
+            top = leaderboard.get_top(query.validated_data['limit'])
+            # the anonymous users see only the ranks and the scores
+            if request.user.is_authenticated:
+                usernames = dict(
+                    get_user_model().objects.filter(
+                        pk__in=[user_id for _, user_id, _ in top]
+                    ).values_list(
+                        'pk',
+                        'username'
+                    )
+                )
+                top = [
+                    {
+                        'rank': rank,
+                        'user_id': user_id,
+                        'username': usernames.get(user_id),
+                        'score': score,
+                    }
+                    for rank, user_id, score in top
+                ]
+            else:
+                top = [{'rank': rank, 'score': score} for rank, _, score in top]
+
+        me = None
+        if request.user.is_authenticated:
+            rank = leaderboard.get_rank(request.user.pk)
+            if rank is not None:
+                me = {'rank': rank[0], 'score': rank[1]}
+
+        return Response(
+            {
+                'test_type': language_test['id'],
+                'size': len(leaderboard),
+                'top': top,
+                'me': me,
+            }
+        )
+
+
+class MetricsView(generics.GenericAPIView):
+    permission_classes = (permissions.IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+    swagger_schema = None
+
+    def get(self, request, *args, **kwargs):
+        return Response(render_metrics(get_metrics_registry().collect()))
 
 
 class QuestionView(generics.CreateAPIView):
     queryset = Question.objects.all()
     permission_classes = (permissions.IsAdminUser,)
+    renderer_classes = JSON_RENDERER_CLASSES
     serializer_class = QuestionSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        # a list of questions is saved with the same number of queries
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
 
 class TestResultView(generics.CreateAPIView):
     permission_classes = (permissions.AllowAny,)
+    renderer_classes = JSON_RENDERER_CLASSES
     serializer_class = TestResultSerializer
+    throttle_classes = THROTTLE_CLASSES
+    throttle_scope = 'test_result'
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(request.user.pk)
 
         user_answers = serializer.data.get('user_answers')
         right_answers = self._get_right_question_answers(user_answers)
@@ -88,20 +232,60 @@ class TestResultView(generics.CreateAPIView):
             user_answers: list[OrderedDict]
     ) -> dict[str, list[dict]]:
         question_ids = [i.get('question_id') for i in user_answers]
-        right_answers = QuestionAnswer.objects.values(
-            'question_id',
-            'answer_id'
-        ).filter(
-            question_id__in=question_ids,
-            is_right_answer=True
+        question_answers = get_question_answers(question_ids)
+        # ordered by the question texts of the cached fragments, as the
+        # QuestionAnswer queryset was by Meta.ordering
+        right_answers = []
+        for fragment in get_question_fragments(question_ids):
+            answers = question_answers.get(fragment['id'])
+            if answers is not None and answers.right_answer_id is not None:
+                right_answers.append(
+                    {'question_id': fragment['id'], 'answer_id': answers.right_answer_id}
+                )
+
+        return {'right_answers': right_answers}
+
+
+class UserTestTypeStatsView(generics.ListAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = JSON_RENDERER_CLASSES
+    serializer_class = UserTestTypeStatsSerializer
+
+    def get_queryset(self):
+        # the statistics are kept up to date by the saving of the results
+        return UserTestTypeStats.objects.filter(
+            user=self.request.user
+        ).order_by(
+            'test_type_id'
         )
 
-        return {'right_answers': list(right_answers)}
+    def get(self, request, *args, **kwargs):
+        with replica_reads(request.user.pk):
+            return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        stats = self.get_queryset().values(
+            'test_type',
+            'test_type__name',
+            'attempted',
+            'correct',
+            'last_activity'
+        )
+        return Response(
+            [UserTestTypeStatsSerializer.to_fast_representation(i) for i in stats]
+        )
 
 
 answer = AnswerView.as_view()
 language_test = LanguageTestView.as_view()
 language_test_type = LanguageTestTypeView.as_view()
 language_test_type_list = LanguageTestTypeListView.as_view()
+leaderboard = LeaderboardView.as_view()
+metrics = MetricsView.as_view()
 question = QuestionView.as_view()
 test_result = TestResultView.as_view()
+user_test_type_stats = UserTestTypeStatsView.as_view()
+
+if settings.ASYNC_VIEWS['ENABLED']:
+    language_test = run_in_thread_pool(language_test)
+    language_test_type_list = run_in_thread_pool(language_test_type_list)
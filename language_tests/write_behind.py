@@ -0,0 +1,189 @@
+import atexit
+import logging
+import time
+from threading import Condition, Lock, Thread
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, connection
+
+from .models import TestResult
+from .results import save_test_results
+
+
+logger = logging.getLogger(__name__)
+
+
+class TestResultWriter:
+    """
+    Buffers test results and saves them in batches from a background
+    thread.
+
+    The buffer holds at most ``max_size`` results, results which do not fit
+    are saved synchronously by the submitting thread.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 10000,
+            batch_size: int = 1000,
+            flush_interval: float = 1.0,
+            autostart: bool = True
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self._buffer: list[tuple[float, TestResult]] = []
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+        self._stopped = False
+        self._stats = {
+            'flushed_batches': 0,
+            'flushed_results': 0,
+            'synchronous_results': 0,
+            'failed_flushes': 0,
+            'dropped_results': 0,
+            'flush_latency_seconds_sum': 0.0,
+            'flush_latency_seconds_max': 0.0,
+        }
+
+    def submit(self, test_results: Sequence[TestResult]) -> None:
+        if self.autostart:
+            self._start()
+
+        with self._condition:
+            if self._stopped or len(self._buffer) + len(test_results) > self.max_size:
+                self._stats['synchronous_results'] += len(test_results)
+                buffered = False
+            else:
+                now = time.monotonic()
+                self._buffer.extend((now, i) for i in test_results)
+                buffered = True
+                if len(self._buffer) >= self.batch_size:
+                    self._condition.notify()
+
+        if not buffered:
+            save_test_results(test_results)
+
+    def flush(self) -> None:
+        """
+        Saves the buffered results in batches of ``batch_size``. The rows
+        which can not be saved are logged and dropped, on other errors the
+        batch goes back to the buffer as far as it fits.
+        """
+        with self._condition:
+            number_results = len(self._buffer)
+        # the results submitted meanwhile are left for the next flush
+        while number_results > 0:
+            with self._condition:
+                batch = self._buffer[:min(self.batch_size, number_results)]
+                del self._buffer[:len(batch)]
+            if not batch:
+                return
+            number_results -= len(batch)
+
+            try:
+                self._save(batch)
+            except Exception:
+                with self._condition:
+                    free = max(self.max_size - len(self._buffer), 0)
+                    self._buffer[:0] = batch[:free]
+                    self._stats['failed_flushes'] += 1
+                    self._stats['dropped_results'] += len(batch) - len(batch[:free])
+                raise
+
+            latency = time.monotonic() - batch[0][0]
+            with self._condition:
+                self._stats['flushed_batches'] += 1
+                self._stats['flushed_results'] += len(batch)
+                self._stats['flush_latency_seconds_sum'] += latency
+                self._stats['flush_latency_seconds_max'] = max(
+                    self._stats['flush_latency_seconds_max'],
+                    latency
+                )
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception(
+                'Test results flush failed, %d results are lost.',
+                len(self._buffer)
+            )
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            return {**self._stats, 'buffered_results': len(self._buffer)}
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._condition:
+            if self._thread is None and not self._stopped:
+                self._thread = Thread(
+                    target=self._run,
+                    name='test-result-writer',
+                    daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _save(self, batch: list[tuple[float, TestResult]]) -> None:
+        try:
+            save_test_results([test_result for _, test_result in batch])
+        except (DataError, IntegrityError):
+            # e.g. the question or the user was deleted after the validation,
+            # the batch is halved until the invalid rows are found
+            if len(batch) == 1:
+                logger.exception('Test result %r is dropped.', batch[0][1].__dict__)
+                with self._condition:
+                    self._stats['dropped_results'] += 1
+                return
+            middle = len(batch) // 2
+            self._save(batch[:middle])
+            self._save(batch[middle:])
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._condition:
+                    if not self._stopped and len(self._buffer) < self.batch_size:
+                        self._condition.wait(self.flush_interval)
+                    if self._stopped:
+                        return
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('Test results flush failed.')
+                    time.sleep(self.flush_interval)
+        finally:
+            connection.close()
+
+
+_writer: Optional[TestResultWriter] = None
+_writer_lock = Lock()
+
+
+def get_test_result_writer() -> Optional[TestResultWriter]:
+    global _writer
+
+    options = settings.TEST_RESULTS_WRITE_BEHIND
+    if not options['ENABLED']:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = TestResultWriter(
+                max_size=options['MAX_SIZE'],
+                batch_size=options['BATCH_SIZE'],
+                flush_interval=options['FLUSH_INTERVAL']
+            )
+
+    return _writer
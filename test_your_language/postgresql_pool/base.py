@@ -0,0 +1,166 @@
+import os
+from threading import Lock
+
+from django.db.backends.postgresql.base import (
+    Database,
+    DatabaseWrapper as PostgresDatabaseWrapper
+)
+from django.db.backends.postgresql.creation import (
+    DatabaseCreation as PostgresDatabaseCreation
+)
+from psycopg2 import extensions
+
+from .pool import ConnectionPool, PoolTimeout
+
+
+DEFAULT_POOL_OPTIONS = {
+    'MAX_SIZE': 10,
+    'IDLE_TIMEOUT': 300.0,  # (seconds)
+    'PRE_PING': True,
+    'WAIT_TIMEOUT': 5.0,  # (seconds)
+}
+
+_pools: dict[tuple, ConnectionPool] = {}
+_pools_lock = Lock()
+# pools inherited from the parent process are kept referenced, a collected
+# connection would terminate the session of the parent on its socket
+_inherited_pools: list[ConnectionPool] = []
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # the pooled connections would keep the test database in use
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    """
+    The postgresql backend with connections kept in a process-wide pool.
+
+    ``close()`` gives the connection back to the pool, so with
+    ``CONN_MAX_AGE = 0`` a request checks a connection out instead of opening
+    one. The pool is configured by the ``POOL`` key of the database settings.
+    """
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection = self.pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                )
+            )
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc)) from exc
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level',
+            connection.isolation_level
+        )
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                if self.in_atomic_block:
+                    # close() keeps the connection of an atomic block until
+                    # its end, so it must not be handed out meanwhile
+                    self.pool.discard(self.connection)
+                else:
+                    self.pool.release(self.connection)
+
+
+def get_pool(alias: str, settings_dict: dict) -> ConnectionPool:
+    # the test runner renames the database of an alias
+    key = (
+        alias,
+        settings_dict['NAME'],
+        settings_dict['USER'],
+        settings_dict['HOST'],
+        settings_dict['PORT'],
+    )
+    pool = _pools.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _inherited_pools.append(pool)
+            options = {**DEFAULT_POOL_OPTIONS, **settings_dict.get('POOL', {})}
+            pool = ConnectionPool(
+                max_size=options['MAX_SIZE'],
+                idle_timeout=options['IDLE_TIMEOUT'],
+                wait_timeout=options['WAIT_TIMEOUT'],
+                check=_ping if options['PRE_PING'] else None,
+                reset=_reset
+            )
+            _pools[key] = pool
+
+    return pool
+
+
+def close_pools(database_name: str) -> None:
+    for key, pool in list(_pools.items()):
+        if key[1] == database_name and pool.pid == os.getpid():
+            pool.close_idle()
+
+
+def get_pool_stats() -> dict[str, dict]:
+    return {
+        key[0]: pool.get_stats()
+        for key, pool in _pools.items()
+        if pool.pid == os.getpid()
+    }
+
+
+def _ping(connection) -> bool:
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except Database.Error:
+        return False
+
+    return True
+
+
+def _reset(connection) -> bool:
+    if connection.closed:
+        return False
+
+    status = connection.info.transaction_status
+    if status in (
+        extensions.TRANSACTION_STATUS_INTRANS,
+        extensions.TRANSACTION_STATUS_INERROR,
+    ):
+        try:
+            connection.rollback()
+        except Database.Error:
+            return False
+        status = connection.info.transaction_status
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        return False
+
+    # the settings, prepared statements, temporary tables and advisory locks
+    # of the session are not passed on to the next checkout
+    try:
+        with connection.cursor() as cursor:
+            # DISCARD ALL can not run in a transaction block
+            cursor.execute('DISCARD ALL' if connection.autocommit else 'RESET ALL')
+        if not connection.autocommit:
+            connection.commit()
+    except Database.Error:
+        return False
+
+    return True
@@ -0,0 +1,164 @@
+import os
+import time
+from collections import deque
+from threading import Condition
+from typing import Any, Callable, Optional
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections of one process.
+
+    ``check`` is called with a connection before it is handed out again and
+    ``reset`` when it is given back, a connection is closed when any of them
+    returns ``False``.
+    """
+
+    def __init__(
+            self,
+            max_size: int,
+            idle_timeout: float,
+            wait_timeout: float,
+            check: Optional[Callable[[Any], bool]] = None,
+            reset: Optional[Callable[[Any], bool]] = None
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.check = check
+        self.reset = reset
+        self.pid = os.getpid()
+        self._idle = deque()  # (connection, time of the release)
+        self._size = 0
+        self._condition = Condition()
+        self._stats = {
+            'checkouts': 0,
+            'created_connections': 0,
+            'reused_connections': 0,
+            'closed_connections': 0,
+            'failed_checks': 0,
+            'timeouts': 0,
+            'wait_seconds_sum': 0.0,
+            'wait_seconds_max': 0.0,
+        }
+
+    def acquire(self, connect: Callable[[], Any]) -> Any:
+        start_time = time.monotonic()
+        while True:
+            connection = self._checkout(start_time)
+            if connection is None:
+                break
+            if self.check is None or self.check(connection):
+                self._increment('reused_connections')
+                return connection
+
+            self._increment('failed_checks')
+            self._discard(connection)
+
+        try:
+            connection = connect()
+        except BaseException:
+            self._release_slot()
+            raise
+        self._increment('created_connections')
+
+        return connection
+
+    def release(self, connection: Any) -> None:
+        if self.reset is not None and not self.reset(connection):
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, connection: Any) -> None:
+        self._discard(connection)
+
+    def close_idle(self) -> None:
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def _checkout(self, start_time: float) -> Optional[Any]:
+        # returns an idle connection or reserves a slot for a new one (None)
+        expired = []
+        try:
+            with self._condition:
+                deadline = start_time + self.wait_timeout
+                while True:
+                    now = time.monotonic()
+                    # the oldest connections are on the left, the right end
+                    # is reused first, so the pool shrinks when idle
+                    while (
+                        self._idle
+                        and now - self._idle[0][1] > self.idle_timeout
+                    ):
+                        expired.append(self._idle.popleft()[0])
+                        self._size -= 1
+                    if self._idle:
+                        connection = self._idle.pop()[0]
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection = None
+                        break
+                    if now >= deadline:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No connection was released in '
+                            f'{self.wait_timeout} seconds, the pool size is '
+                            f'{self.max_size}.'
+                        )
+                    self._condition.wait(deadline - now)
+
+                wait_time = time.monotonic() - start_time
+                self._stats['checkouts'] += 1
+                self._stats['wait_seconds_sum'] += wait_time
+                self._stats['wait_seconds_max'] = max(
+                    self._stats['wait_seconds_max'],
+                    wait_time
+                )
+        finally:
+            for expired_connection in expired:
+                self._close(expired_connection)
+
+        return connection
+
+    def _discard(self, connection: Any) -> None:
+        self._close(connection)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close(self, connection: Any) -> None:
+        self._increment('closed_connections')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _increment(self, name: str) -> None:
+        with self._condition:
+            self._stats[name] += 1
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'language_tests.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,7 +72,108 @@ DATABASES = {
         'PASSWORD': env.str('DB_PASSWORD'),
         'HOST': env.str('DB_HOST'),
         'PORT': env.int('DB_PORT'),
+        # used by the test_your_language.postgresql_pool engine
+        'POOL': {
+            'MAX_SIZE': env.int('DB_POOL_MAX_SIZE', default=10),
+            'IDLE_TIMEOUT': 300.0,  # (seconds)
+            'PRE_PING': env.bool('DB_POOL_PRE_PING', default=True),
+            'WAIT_TIMEOUT': 5.0,  # (seconds)
+        },
+    }
+}
+
+# read-only requests are sent to the replicas, "host[:port]" of every replica
+DATABASE_REPLICAS = []
+for number, replica in enumerate(env.list('DB_REPLICA_HOSTS', default=[]), 1):
+    replica_host, _, replica_port = replica.partition(':')
+    DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': int(replica_port or DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_ROUTERS = ['language_tests.routers.ReplicaRouter']
+# reads of a user stay on the primary after their writes
+REPLICA_STICKINESS = env.int('REPLICA_STICKINESS', default=5)  # (seconds)
+
+# the language_tests caches keep their versions here, so it has to be shared
+# between the workers of one deployment (memcached, file based cache, etc.)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# the throttling buckets are kept apart from the cached questions
+if env.str('THROTTLING_CACHE_URL', default=''):
+    CACHES['throttling'] = env.cache('THROTTLING_CACHE_URL')
+# the local memory and the file based caches keep 300 entries by default,
+# the question fragments and answer indexes take two entries per question
+# and the throttling one per client
+for cache_settings in CACHES.values():
+    if cache_settings['BACKEND'] in (
+            'django.core.cache.backends.locmem.LocMemCache',
+            'django.core.cache.backends.filebased.FileBasedCache',
+    ):
+        cache_settings.setdefault('OPTIONS', {}).setdefault(
+            'MAX_ENTRIES',
+            env.int('CACHE_MAX_ENTRIES', default=100_000)
+        )
+
+# test types with more published questions are sampled by the database
+QUESTION_POOL_MAX_SIZE = env.int('QUESTION_POOL_MAX_SIZE', default=2_000_000)
+
+# clients and proxies may reuse the test type list without revalidation
+TEST_TYPES_CACHE_MAX_AGE = env.int('TEST_TYPES_CACHE_MAX_AGE', default=60)
+
+# the test list and the test views are async under ASGI, their ORM work is
+# done by a pool of threads of every worker
+ASYNC_VIEWS = {
+    'ENABLED': env.bool('ASYNC_VIEWS', default=False),
+    'MAX_THREADS': env.int('ASYNC_VIEWS_MAX_THREADS', default=10),
+}
+
+# test results are saved in batches by a background thread of every worker
+TEST_RESULTS_WRITE_BEHIND = {
+    'ENABLED': env.bool('TEST_RESULTS_WRITE_BEHIND', default=False),
+    'MAX_SIZE': 10000,
+    'BATCH_SIZE': 1000,
+    'FLUSH_INTERVAL': 1.0,  # (seconds)
+}
+
+# every worker keeps the leaderboards in memory, the scores saved by the
+# other workers are loaded when a leaderboard gets older than the interval
+LEADERBOARD = {
+    'REFRESH_INTERVAL': env.int('LEADERBOARD_REFRESH_INTERVAL', default=60),  # (seconds)
+    'MAX_LIMIT': 100,
+}
+
+# the tests of a difficulty band (?difficulty=) pick the questions by the
+# share of their right answers: the questions of the band and, less and less
+# often, the ones within a few SPREAD of it. Every worker reloads the shares
+# when they get older than the interval
+QUESTION_DIFFICULTY = {
+    'BANDS': {
+        'easy': (0.7, 1.0),
+        'medium': (0.4, 0.7),
+        'hard': (0.0, 0.4),
+    },
+    'SPREAD': 0.1,
+    'REFRESH_INTERVAL': env.int('QUESTION_DIFFICULTY_REFRESH_INTERVAL', default=600),  # (seconds)
+}
+
+# the test catalog and the tests are compressed by the app (brotli when the
+# brotli package is installed), the catalog once per version
+RESPONSE_COMPRESSION = {
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'MIN_SIZE': 200,  # (bytes)
+}
+
+# every worker writes its request metrics to a file of the directory, they
+# are merged by /metrics. Without a directory only the metrics of the worker
+# which serves /metrics are shown
+METRICS = {
+    'DIRECTORY': env.str('METRICS_DIR', default=''),
+    'FLUSH_INTERVAL': 5.0,  # (seconds)
 }
 
 
@@ -126,6 +228,9 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # the client address of the throttles is the X-Forwarded-For address
+    # added by the last of the proxies
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=1),
 }
 
 DJOSER = {
@@ -136,6 +241,30 @@ DJOSER = {
     'SERIALIZERS': {},
 }
 
+# token bucket throttling of the random tests and of the test results by
+# the ip address of the anonymous clients and by the user: "N/period" allows
+# bursts of N requests. The buckets are kept in the cache of the CACHE alias
+# (THROTTLING_CACHE_URL), in every process without it
+THROTTLING = {
+    'RATES': {
+        'language_test_anon': '30/min',
+        'language_test_user': '60/min',
+        'test_result_anon': '30/min',
+        'test_result_user': '60/min',
+    },
+    'CACHE': 'throttling' if 'throttling' in CACHES else '',
+    'MAX_LOCAL_BUCKETS': 100_000,
+}
+
+# the ui pages load the cached schema, served by nginx in production
+SWAGGER_SETTINGS = {
+    'SPEC_URL': '/swagger.json',
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': '/swagger.json',
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -0,0 +1,141 @@
+import time
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase
+
+from ..postgresql_pool.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def create_pool(self, **kwargs) -> ConnectionPool:
+        options = {'max_size': 2, 'idle_timeout': 60, 'wait_timeout': 0.01}
+        return ConnectionPool(**{**options, **kwargs})
+
+    def test_connections_reused(self):
+        pool = self.create_pool()
+        first_connection = pool.acquire(FakeConnection)
+        pool.release(first_connection)
+        self.assertIs(pool.acquire(FakeConnection), first_connection)
+        stats = pool.get_stats()
+        self.assertEqual(stats['created_connections'], 1)
+        self.assertEqual(stats['reused_connections'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['size'], 1)
+
+    def test_max_size(self):
+        pool = self.create_pool()
+        pool.acquire(FakeConnection)
+        second_connection = pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.get_stats()['timeouts'], 1)
+
+        pool.discard(second_connection)
+        self.assertTrue(second_connection.closed)
+        pool.acquire(FakeConnection)
+        self.assertEqual(pool.get_stats()['size'], 2)
+
+    def test_idle_timeout(self):
+        pool = self.create_pool(idle_timeout=0)
+        first_connection = pool.acquire(FakeConnection)
+        pool.release(first_connection)
+        time.sleep(0.001)
+        self.assertIsNot(pool.acquire(FakeConnection), first_connection)
+        self.assertTrue(first_connection.closed)
+        self.assertEqual(pool.get_stats()['size'], 1)
+
+    def test_failed_check(self):
+        pool = self.create_pool(check=lambda connection: False)
+        first_connection = pool.acquire(FakeConnection)
+        pool.release(first_connection)
+        self.assertIsNot(pool.acquire(FakeConnection), first_connection)
+        self.assertEqual(pool.get_stats()['failed_checks'], 1)
+
+    def test_failed_reset(self):
+        pool = self.create_pool(reset=lambda connection: False)
+        first_connection = pool.acquire(FakeConnection)
+        pool.release(first_connection)
+        self.assertTrue(first_connection.closed)
+        self.assertEqual(pool.get_stats()['size'], 0)
+
+    def test_failed_connect(self):
+        pool = self.create_pool()
+
+        def connect():
+            raise ConnectionError
+
+        with self.assertRaises(ConnectionError):
+            pool.acquire(connect)
+        self.assertEqual(pool.get_stats()['size'], 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgresql only')
+class PooledDatabaseWrapperTest(TestCase):
+
+    def create_connection(self):
+        connections = ConnectionHandler({
+            'default': {
+                **connection.settings_dict,
+                'ENGINE': 'test_your_language.postgresql_pool',
+                'POOL': {'MAX_SIZE': 1, 'PRE_PING': True},
+            }
+        })
+        pooled_connection = connections['default']
+        self.addCleanup(pooled_connection.pool.close_idle)
+        return pooled_connection
+
+    def test_connection_reused(self):
+        pooled_connection = self.create_connection()
+        backend_pids = []
+        for _ in range(2):
+            with pooled_connection.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                backend_pids.append(cursor.fetchone()[0])
+            pooled_connection.close()
+
+        self.assertEqual(backend_pids[0], backend_pids[1])
+        stats = pooled_connection.pool.get_stats()
+        self.assertEqual(stats['reused_connections'], 1)
+
+    def test_session_reset(self):
+        pooled_connection = self.create_connection()
+        with pooled_connection.cursor() as cursor:
+            cursor.execute("SET application_name = 'pooled'")
+            cursor.execute('SELECT pg_backend_pid()')
+            backend_pid = cursor.fetchone()[0]
+        pooled_connection.close()
+
+        with pooled_connection.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid(), current_setting(%s)', ['application_name'])
+            reused_backend_pid, application_name = cursor.fetchone()
+        pooled_connection.close()
+
+        self.assertEqual(reused_backend_pid, backend_pid)
+        self.assertNotEqual(application_name, 'pooled')
+
+    def test_connection_closed_in_atomic_block(self):
+        pooled_connection = self.create_connection()
+        pooled_connection.ensure_connection()
+        raw_connection = pooled_connection.connection
+        pooled_connection.in_atomic_block = True
+        pooled_connection.close()
+
+        # the connection stays with the wrapper until the end of the block
+        self.assertIs(pooled_connection.connection, raw_connection)
+        self.assertTrue(raw_connection.closed)
+        stats = pooled_connection.pool.get_stats()
+        self.assertEqual(stats['idle'], 0)
+        self.assertEqual(stats['size'], 0)
+        pooled_connection.in_atomic_block = False
@@ -0,0 +1,46 @@
+import gzip
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import yasg
+
+
+class SchemaViewTest(SimpleTestCase):
+
+    def setUp(self):
+        for function in (yasg.generate_schema, yasg.get_schema, yasg.get_schema_contents):
+            function.cache_clear()
+
+    def test_schema(self):
+        with mock.patch.object(
+                yasg.OpenAPISchemaGenerator,
+                'get_schema',
+                autospec=True,
+                side_effect=yasg.OpenAPISchemaGenerator.get_schema
+        ) as get_schema:
+            response = self.client.get('/swagger.json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            schema = json.loads(response.content)
+            self.assertIn('/api/tests/', schema['paths'])
+            self.assertNotIn('host', schema)
+
+            etag = response['ETag']
+            response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            response = self.client.get('/swagger.json', HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(json.loads(gzip.decompress(response.content)), schema)
+            self.assertEqual(response['ETag'], 'W/' + etag)
+
+        # generated once for all the requests
+        self.assertEqual(get_schema.call_count, 1)
+
+    def test_ui(self):
+        for url in ('/swagger/', '/redoc/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, '/swagger.json')
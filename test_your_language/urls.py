@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from language_tests.views import metrics
 from .yasg import urlpatterns as doc_urlpatterns
 
 
@@ -10,6 +11,7 @@ urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
     path('auth/', include('djoser.urls.jwt')),
     path('api/tests/', include('language_tests.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 urlpatterns += doc_urlpatterns
@@ -1,23 +1,75 @@
-from django.urls import path
+import hashlib
+from functools import lru_cache
+
+from django.http import HttpRequest, HttpResponse
+from django.urls import path, re_path
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
 from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import SwaggerJSONRenderer, SwaggerYAMLRenderer
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from language_tests.compression import encode_response, get_encoded_contents
+
+
+info = openapi.Info(
+   title='test_your_language',
+   default_version='v1',
+   description='API description',
+   license=openapi.License(name='GPL-3.0 License'),
+)
 
 schema_view = get_schema_view(
-   openapi.Info(
-      title='test_your_language',
-      default_version='v1',
-      description='API description',
-      license=openapi.License(name='GPL-3.0 License'),
-   ),
+   info,
    public=True,
    permission_classes=(permissions.AllowAny,),
 )
 
+SCHEMA_RENDERERS = {
+   renderer_class.format: renderer_class
+   for renderer_class in (SwaggerJSONRenderer, SwaggerYAMLRenderer)
+}
+
+
+@lru_cache(maxsize=None)
+def generate_schema() -> openapi.Swagger:
+   # without a request the schema has no host, the clients use the host
+   # which serves it
+   return OpenAPISchemaGenerator(info).get_schema(request=None, public=True)
+
+
+@lru_cache(maxsize=None)
+def get_schema(format: str) -> bytes:
+   """
+   Returns the rendered schema of the API. It is generated once per process,
+   the process runs a single version of the code.
+   """
+   return SCHEMA_RENDERERS[format]().render(generate_schema())
+
+
+@lru_cache(maxsize=None)
+def get_schema_contents(format: str) -> tuple[str, dict[str, bytes]]:
+   content = get_schema(format)
+   return f'"{hashlib.md5(content).hexdigest()}"', get_encoded_contents(content)
+
+
+@require_safe
+@condition(etag_func=lambda request, format: get_schema_contents(format)[0])
+def schema(request: HttpRequest, format: str) -> HttpResponse:
+   etag, encoded_contents = get_schema_contents(format)
+   response = HttpResponse(
+      encoded_contents['identity'],
+      content_type=SCHEMA_RENDERERS[format].media_type
+   )
+   response['ETag'] = etag
+   patch_cache_control(response, public=True, no_cache=True)
+   return encode_response(request, response, encoded_contents)
+
 
 urlpatterns = [
-   path('swagger(?P<format>\.json|\.yaml)', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+   re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema, name='schema-json'),
    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
@@ -8,8 +8,14 @@ done
 
 echo "Postgres is up"
 
-python manage.py makemigrations
 python manage.py migrate
 python manage.py collectstatic --noinput
+python manage.py generate_schema static/schema
+
+# the metrics files of the workers of the previous run
+if [ -n "$METRICS_DIR" ]; then
+  rm -rf "$METRICS_DIR"
+  mkdir -p "$METRICS_DIR"
+fi
 
 exec "$@"
\ No newline at end of file